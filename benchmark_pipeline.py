@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the company import pipeline scripts.
+
+Usage:
+    python benchmark_pipeline.py categorize [--sql companies_from_pdfs.sql] [--repeat 5]
+    python benchmark_pipeline.py tokenize [--sql companies_from_pdfs.sql] [--repeat 5]
+    python benchmark_pipeline.py parse [--pdf-dir .] [--repeat 5]
+    python benchmark_pipeline.py backends [--pdf-dir .] [--repeat 3]
+    python benchmark_pipeline.py suite [--sizes 10000 100000 1000000] [--json FILE] [--baseline FILE]
+    python benchmark_pipeline.py memory [--size 1000000] [--sort-buffer 100000]
+    python benchmark_pipeline.py jobs [--size 200000] [--jobs 1 2 4 8] [--stream]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import categorize_companies
+import dedup_companies
+import extract_companies
+import extract_companies_from_pdfs
+import external_sort
+import pdf_backends
+import pipeline_metrics
+import synthetic_companies
+
+# Company counts of the scaling suite
+SUITE_SIZES = [10000, 100000, 1000000]
+
+# Synthetic companies and worker counts of the categorization scaling benchmark
+JOBS_SIZE = 200000
+JOBS_COUNTS = [1, 2, 4, 8]
+
+# Slowdown of a stage rate, relative to the baseline, reported as a regression
+REGRESSION_TOLERANCE = 0.25
+
+# Company count of the memory benchmark
+MEMORY_SIZE = 1000000
+
+# ===============================================
+# Reference implementations (previous versions)
+# ===============================================
+
+def legacy_categorize_company(name, activite):
+    """Previous categorize_company: one re.search per keyword pattern"""
+    text = f"{name} {activite}".lower()
+    for category_id in [5, 2, 4, 1, 3]:
+        patterns = categorize_companies.CATEGORIES[category_id]['keywords']
+        for pattern in patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return category_id
+    return 6
+
+def legacy_extract_company_data_from_sql(sql_content):
+    """Previous extract_company_data_from_sql: character-by-character parser"""
+    insert_pattern = r'INSERT INTO "Company" \(([^)]+)\) VALUES\s*((?:\([^)]+\)(?:,\s*)?)+)'
+    inserts = re.findall(insert_pattern, sql_content, re.IGNORECASE | re.DOTALL)
+    companies = []
+    for columns_str, values_str in inserts:
+        columns = [col.strip().strip('"') for col in columns_str.split(',')]
+        values_blocks = re.findall(r'\(([^)]+)\)', values_str)
+        for block in values_blocks:
+            values = []
+            current_value = ""
+            in_quotes = False
+            escape_next = False
+            for i, char in enumerate(block):
+                if escape_next:
+                    current_value += char
+                    escape_next = False
+                elif char == "'":
+                    if i + 1 < len(block) and block[i + 1] == "'":
+                        current_value += "'"
+                        i += 1
+                    else:
+                        in_quotes = not in_quotes
+                        current_value += char
+                elif char == ',' and not in_quotes:
+                    values.append(current_value.strip())
+                    current_value = ""
+                else:
+                    current_value += char
+            if current_value:
+                values.append(current_value.strip())
+            cleaned_values = []
+            for val in values:
+                if val.startswith("'") and val.endswith("'"):
+                    val = val[1:-1]
+                val = val.replace("''", "'")
+                cleaned_values.append(val)
+            if len(cleaned_values) >= len(columns):
+                company = {}
+                for i, col in enumerate(columns):
+                    if i < len(cleaned_values):
+                        company[col] = cleaned_values[i]
+                companies.append(company)
+    return companies
+
+def legacy_extract_phone_from_end(text):
+    """Previous extract_phone_from_end: six searches one after another"""
+    # Senegalese phone patterns: 33 XXX XX XX or 7X XXX XX XX
+    patterns = [
+        r'\b(33\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+        r'\b(33\s*\d{7,})\s*$',
+        r'\b(7[0-8]\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+        r'\b(7[0-8]\s*\d{7,})\s*$',
+        r'\b(\d{2}\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+        r'\b(0\s*\d{9})\s*$',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            phone = match.group(1)
+            remaining_text = text[:match.start()].strip()
+            return phone, remaining_text
+    
+    # If no phone found, return empty and full text
+    return "", text
+
+def legacy_parse_company_line(line):
+    """Previous parse_company_line: per-keyword regexes built on every call"""
+    line = extract_companies_from_pdfs.clean_text(line)
+    
+    if not line or len(line) < 10:
+        return None
+    
+    # Skip header lines
+    if 'Ville' in line and 'Entreprise' in line:
+        return None
+    
+    # Check if line starts with a city
+    ville = None
+    for city in extract_companies_from_pdfs.SENEGALESE_CITIES:
+        if line.startswith(city + ' '):
+            ville = city
+            line = line[len(city):].strip()
+            break
+    
+    if not ville:
+        return None
+    
+    # Extract phone from the end
+    tel, remaining = legacy_extract_phone_from_end(line)
+    
+    if not remaining:
+        return None
+    
+    # Now we have: "Entreprise Activité Adresse" in remaining
+    # Strategy: Split by known address/activity keywords
+    
+    # Try to find address start
+    address_start_idx = -1
+    for keyword in extract_companies_from_pdfs.ADDRESS_KEYWORDS:
+        # Case insensitive search for keyword as a whole word
+        pattern = r'\b' + re.escape(keyword) + r'\b'
+        match = re.search(pattern, remaining, re.IGNORECASE)
+        if match:
+            address_start_idx = match.start()
+            break
+    
+    company_name = ""
+    activite = ""
+    adresse = ""
+    
+    if address_start_idx > 0:
+        # We found an address
+        adresse = remaining[address_start_idx:].strip()
+        before_address = remaining[:address_start_idx].strip()
+        
+        # Now split before_address into company name and activity
+        activity_start_idx = -1
+        for keyword in extract_companies_from_pdfs.ACTIVITY_KEYWORDS:
+            pattern = r'\b' + re.escape(keyword) + r'\b'
+            match = re.search(pattern, before_address, re.IGNORECASE)
+            if match:
+                activity_start_idx = match.start()
+                break
+        
+        if activity_start_idx > 0:
+            company_name = before_address[:activity_start_idx].strip()
+            activite = before_address[activity_start_idx:].strip()
+        else:
+            # No activity keyword found, assume first half is company, rest is activity
+            words = before_address.split()
+            if len(words) > 4:
+                split_at = len(words) // 2
+                company_name = ' '.join(words[:split_at])
+                activite = ' '.join(words[split_at:])
+            else:
+                company_name = before_address
+                activite = ""
+    else:
+        # No address found, split remaining into company and activity
+        activity_start_idx = -1
+        for keyword in extract_companies_from_pdfs.ACTIVITY_KEYWORDS:
+            pattern = r'\b' + re.escape(keyword) + r'\b'
+            match = re.search(pattern, remaining, re.IGNORECASE)
+            if match:
+                activity_start_idx = match.start()
+                break
+        
+        if activity_start_idx > 0:
+            company_name = remaining[:activity_start_idx].strip()
+            activite = remaining[activity_start_idx:].strip()
+        else:
+            # Assume all is company name if no activity keyword
+            company_name = remaining
+            activite = ""
+    
+    # Clean up company name (remove trailing dashes, etc.)
+    company_name = re.sub(r'\s*-\s*$', '', company_name).strip()
+    
+    if not company_name or len(company_name) < 2:
+        return None
+    
+    return {
+        'ville': ville,
+        'name': company_name,
+        'activite': activite,
+        'adresse': adresse,
+        'tel': tel
+    }
+
+def legacy_deduplicate_companies(companies):
+    """Previous deduplicate_companies: on company dictionaries"""
+    seen = set()
+    unique_companies = []
+    for company in companies:
+        key = (company['name'].lower(), company['ville'].lower())
+        if key not in seen:
+            seen.add(key)
+            unique_companies.append(company)
+    
+    unique_companies.sort(key=lambda x: (x['ville'], x['name']))
+    return unique_companies
+
+def legacy_generate_sql_file(companies, output_file):
+    """Previous generate_sql_file: the whole SQL text built in memory, then written"""
+    unique_companies = legacy_deduplicate_companies(companies)
+    sql_lines = extract_companies_from_pdfs.sql_header_lines(len(unique_companies))
+    
+    rows = extract_companies_from_pdfs.iter_company_values(unique_companies)
+    batch_size = extract_companies_from_pdfs.BATCH_SIZE
+    for i in range(0, len(unique_companies), batch_size):
+        count = min(batch_size, len(unique_companies) - i)
+        batch = [extract_companies_from_pdfs.format_values_line(next(rows)) for _ in range(count)]
+        sql_lines.extend(extract_companies_from_pdfs.sql_batch_lines(batch, i))
+    
+    sql_lines.extend(extract_companies_from_pdfs.sql_footer_lines(len(unique_companies)))
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sql_lines))
+    return output_file
+
+# ===============================================
+# Helpers
+# ===============================================
+
+def load_sql_rows(sql_file):
+    """Return (name, activite) pairs of every company row of a SQL file"""
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return [
+        (match.group(1).replace("''", "'"), match.group(7).replace("''", "'"))
+        for match in categorize_companies.VALUES_ROW_PATTERN.finditer(content)
+    ]
+
+def load_pdf_lines(pdf_dir):
+    """Return the raw text lines of every page of the PDF files of a directory"""
+    lines = []
+    for pdf_file in sorted(f for f in os.listdir(pdf_dir) if f.endswith('.pdf')):
+        with open(os.path.join(pdf_dir, pdf_file), 'rb') as file:
+            for page in extract_companies_from_pdfs.PyPDF2.PdfReader(file).pages:
+                lines.extend(page.extract_text().split('\n'))
+    return lines
+
+def best_time(func, repeat):
+    """Run func `repeat` times and return (best elapsed seconds, last result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def print_rate(label, count, elapsed, unit):
+    """Print one benchmark result line"""
+    print(f"  {label:<28} {elapsed:8.3f}s  {count / elapsed:12,.0f} {unit}/s")
+
+# ===============================================
+# Benchmarks
+# ===============================================
+
+def bench_categorize(args):
+    """Compare categorize_company with the per-pattern implementation"""
+    rows = load_sql_rows(args.sql)
+    print(f"Categorization benchmark on {args.sql} ({len(rows)} companies)")
+    
+    legacy_time, legacy = best_time(
+        lambda: [legacy_categorize_company(n, a) for n, a in rows], args.repeat)
+    current_time, current = best_time(
+        lambda: [categorize_companies.categorize_company(n, a) for n, a in rows], args.repeat)
+    
+    names = [name for name, _ in rows]
+    activites = [activite for _, activite in rows]
+    batch_time, (batch, _) = best_time(
+        lambda: categorize_companies.categorize_batch(names, activites), args.repeat)
+    
+    # A run of the directory rows takes a few tens of milliseconds, so the
+    # batch gain is measured on back-to-back pairs of runs and reported
+    # with its spread rather than as a ratio of two best times
+    ratios = []
+    for _ in range(args.repeat):
+        scalar_time, _ = best_time(
+            lambda: [categorize_companies.categorize_company(n, a) for n, a in rows], 1)
+        pair_time, _ = best_time(lambda: categorize_companies.categorize_batch(names, activites), 1)
+        ratios.append(scalar_time / pair_time)
+    
+    print(f"  Python {sys.version.split()[0]}, NumPy {'yes' if categorize_companies.numpy else 'no'}, "
+          f"best of {args.repeat} runs")
+    print_rate("before (re.search loop)", len(rows), legacy_time, "companies")
+    print_rate("after (compiled matcher)", len(rows), current_time, "companies")
+    print_rate("batch (categorize_batch)", len(rows), batch_time, "companies")
+    print(f"  Speedup: {legacy_time / current_time:.1f}x")
+    print(f"  Batch over the compiled matcher: {statistics.median(ratios):.1f}x "
+          f"(median of {len(ratios)} paired runs, {min(ratios):.1f}x-{max(ratios):.1f}x)")
+    
+    mismatches = sum(1 for a, b in zip(legacy, current) if a != b)
+    batch_mismatches = sum(1 for a, b in zip(current, batch) if a != b)
+    print(f"  Identical results: {'yes' if mismatches == 0 else f'NO ({mismatches} mismatches)'}")
+    print(f"  Identical batch results: {'yes' if batch_mismatches == 0 else f'NO ({batch_mismatches} mismatches)'}")
+    return mismatches == 0 and batch_mismatches == 0
+
+def bench_tokenize(args):
+    """Compare the SQL VALUES tokenizer with the character-by-character parser"""
+    with open(args.sql, 'r', encoding='utf-8') as f:
+        content = f.read()
+    print(f"SQL VALUES parsing benchmark on {args.sql} ({len(content) / 1e6:.2f} MB)")
+    
+    # The previous parser stops at the first ')' of a row, so NOW() and any
+    # parenthesis inside a quoted value break it. Time both parsers on a
+    # variant without parentheses as well.
+    simplified = re.sub(
+        r"'(?:[^']|'')*'",
+        lambda match: match.group().replace('(', '[').replace(')', ']'),
+        content,
+    ).replace('NOW()', 'NULL')
+    
+    for label, sql_content in (("original file", content), ("without parentheses", simplified)):
+        legacy_time, legacy = best_time(
+            lambda: legacy_extract_company_data_from_sql(sql_content), args.repeat)
+        current_time, current = best_time(
+            lambda: extract_companies.extract_company_data_from_sql(sql_content), args.repeat)
+        print(f"  {label}:")
+        print(f"    before (char loop)  {legacy_time:8.3f}s  {len(legacy):8} rows parsed")
+        print(f"    after (tokenizer)   {current_time:8.3f}s  {len(current):8} rows parsed"
+              f"  ({len(current) / current_time:,.0f} rows/s)")
+    
+    # Check the tokenizer against the row pattern used by categorize_companies.py
+    expected = load_sql_rows(args.sql)
+    parsed = [(row['name'], row['activite'])
+              for row in extract_companies.extract_company_data_from_sql(content)]
+    same = expected == parsed
+    print(f"  Matches categorize_companies row pattern: {'yes' if same else 'NO'}")
+    return same
+
+def bench_parse(args):
+    """Compare parse_company_line with the per-keyword implementation"""
+    lines = load_pdf_lines(args.pdf_dir)
+    print(f"Line parser benchmark on the PDFs of {os.path.abspath(args.pdf_dir)} ({len(lines)} lines)")
+    
+    legacy_time, legacy = best_time(
+        lambda: [legacy_parse_company_line(line) for line in lines], args.repeat)
+    current_time, current = best_time(
+        lambda: [extract_companies_from_pdfs.parse_company_line(line) for line in lines], args.repeat)
+    
+    print_rate("before (per-keyword regexes)", len(lines), legacy_time, "lines")
+    print_rate("after (precompiled parser)", len(lines), current_time, "lines")
+    print(f"  Speedup: {legacy_time / current_time:.1f}x")
+    print(f"  Companies parsed: {sum(1 for c in current if c)}")
+    
+    mismatches = sum(1 for a, b in zip(legacy, current) if a != b)
+    print(f"  Identical results: {'yes' if mismatches == 0 else f'NO ({mismatches} mismatches)'}")
+    return mismatches == 0
+
+def extract_backend_lines(pdf_files, backend):
+    """Return the text lines of every page of the PDF files, one list per page"""
+    pages = []
+    for pdf_file in pdf_files:
+        with pdf_backends.open_document(pdf_file, backend) as document:
+            for index in range(document.page_count):
+                pages.append(document.page_lines(index))
+    return pages
+
+def extract_backend_fragments(pdf_files, backend):
+    """Return the positioned text runs of every page of the PDF files, one list per page"""
+    pages = []
+    for pdf_file in pdf_files:
+        with pdf_backends.open_document(pdf_file, backend) as document:
+            for index in range(document.page_count):
+                pages.append(document.page_fragments(index))
+    return pages
+
+def bench_backends(args):
+    """Compare the text extraction backends and parsers on speed and parsed-line yield"""
+    pdf_files = [os.path.join(args.pdf_dir, f) for f in sorted(os.listdir(args.pdf_dir)) if f.endswith('.pdf')]
+    metrics = pipeline_metrics.METRICS
+    print(f"Text extraction backends on {len(pdf_files)} PDF files (best of {args.repeat})")
+    print(f"  {'backend':<18} {'pages/s':>9} {'lines':>7} {'parse us/line':>14} {'companies':>10} "
+          f"{'yield':>7} {'with tel':>9}")
+    
+    def report(label, pages_per_second, lines, parse_elapsed, companies):
+        with_tel = sum(1 for company in companies if company.tel)
+        print(f"  {label:<18} {pages_per_second:9,.1f} {lines:7,} {parse_elapsed / lines * 1e6:14.1f} "
+              f"{len(companies):10,} {len(companies) / lines:7.1%} {with_tel:9,}")
+        strategies = extract_companies_from_pdfs.strategy_counts()
+        print("    strategies: " + ', '.join(f"{name} {count:,}" for name, count in strategies.items()))
+    
+    for backend in sorted(pdf_backends.BACKENDS):
+        if not pdf_backends.backend_available(backend):
+            print(f"  {backend:<18} (not installed)")
+            continue
+        elapsed, pages = best_time(lambda: extract_backend_lines(pdf_files, backend), args.repeat)
+        for layout in (False, True):
+            lines = [line for page in pages
+                     for line in (extract_companies_from_pdfs.merge_wrapped_lines(page) if layout else page)
+                     if line.strip()]
+            metrics.reset()
+            started = time.perf_counter()
+            companies = [c for c in map(extract_companies_from_pdfs.parse_company_line, lines) if c]
+            report(f"{backend} (layout)" if layout else backend, len(pages) / elapsed,
+                   len(lines), time.perf_counter() - started, companies)
+        
+        elapsed, pages = best_time(lambda: extract_backend_fragments(pdf_files, backend), args.repeat)
+        metrics.reset()
+        started = time.perf_counter()
+        companies = []
+        rows = 0
+        for fragments in pages:
+            page_companies, page_rows = extract_companies_from_pdfs.parse_page_geometry(fragments)
+            companies.extend(page_companies)
+            rows += page_rows
+        report(f"{backend} (geometry)", len(pages) / elapsed, rows, time.perf_counter() - started, companies)
+    return True
+
+def run_suite_size(size, seed, pdf, work_dir):
+    """
+    Time every stage of the pipeline on `size` synthetic companies.
+    
+    Returns:
+        dict: stage name -> {'seconds', 'items', 'rate'}
+    """
+    results = {}
+    
+    def timed(stage, func, count_items):
+        started = time.perf_counter()
+        # Silence the progress messages of the pipeline functions
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        elapsed = time.perf_counter() - started
+        items = count_items(result)
+        results[stage] = {'seconds': round(elapsed, 6), 'items': items,
+                          'rate': round(items / elapsed, 1) if elapsed else None}
+        print_rate(stage, items, elapsed, "items")
+        return result
+    
+    lines = list(synthetic_companies.generate_lines(size, seed))
+    print(f"\n{size:,} companies ({len(lines):,} lines, seed {seed})")
+    
+    if pdf:
+        pdf_file = os.path.join(work_dir, f"synthetic_{size}.pdf")
+        synthetic_companies.write_pdf(lines, pdf_file)
+        timed('pdf.extract_text', lambda: extract_companies_from_pdfs.extract_companies_from_pdf(pdf_file), len)
+    
+    parsed = timed('parse', lambda: [extract_companies_from_pdfs.parse_company_line(line) for line in lines], len)
+    companies = [company for company in parsed if company]
+    del lines, parsed
+    
+    timed('categorize', lambda: [categorize_companies.categorize_company(c['name'], c['activite'])
+                                 for c in companies], len)
+    unique = timed('dedup', lambda: extract_companies_from_pdfs.deduplicate_companies(companies),
+                   lambda _: len(companies))
+    timed('fuzzy_dedup', lambda: dedup_companies.find_duplicate_clusters(unique), lambda _: len(unique))
+    
+    sql_file = os.path.join(work_dir, f"synthetic_{size}.sql")
+    timed('export.sql', lambda: extract_companies_from_pdfs.generate_sql_file(companies, sql_file),
+          lambda _: len(unique))
+    csv_file = os.path.join(work_dir, f"synthetic_{size}.csv")
+    timed('export.csv', lambda: extract_companies.stream_sql_to_csv(sql_file, csv_file)[0], lambda count: count)
+    return results
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Print the stages whose rate dropped by more than `tolerance`.
+    
+    Returns:
+        bool: True if no stage regressed
+    """
+    regressions = 0
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference or not reference.get('rate') or not result['rate']:
+                continue
+            ratio = result['rate'] / reference['rate']
+            if ratio < 1 - tolerance:
+                regressions += 1
+                print(f"  REGRESSION {stage} @ {size}: {result['rate']:,.0f}/s "
+                      f"vs {reference['rate']:,.0f}/s baseline ({ratio:.2f}x)")
+    print(f"  {regressions} regression(s) beyond {tolerance:.0%} against the baseline")
+    return regressions == 0
+
+def bench_suite(args):
+    """Time parse, categorize, dedup and export on synthetic data of growing size"""
+    print("Pipeline scaling suite on synthetic directory lines")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='benchmark_pipeline_') as work_dir:
+        for size in args.sizes:
+            results[str(size)] = run_suite_size(size, args.seed, args.pdf, work_dir)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.json}")
+    
+    if args.baseline:
+        print(f"\nComparison with {args.baseline}:")
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        return compare_with_baseline(results, baseline, args.tolerance)
+    return True
+
+def run_memory_variant(variant, size, seed, sql_file, sort_buffer=external_sort.SORT_BUFFER_RECORDS):
+    """
+    Parse, deduplicate and export `size` synthetic companies, with the
+    dictionary records and in-memory SQL text of the previous version
+    ('legacy'), with CompanyRecord and the streaming SQL writer
+    ('compact'), or with the companies streamed into an external sort of
+    sort_buffer records ('external'). Run in a fresh process, so that
+    its peak RSS is its own.
+    
+    Returns:
+        dict: peak_rss_mb, baseline_rss_mb, seconds, companies, sql_sha256
+    """
+    baseline_rss = pipeline_metrics.peak_rss_mb()['self']
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsed = map(extract_companies_from_pdfs.parse_company_line, synthetic_companies.generate_lines(size, seed))
+        companies = (company for company in parsed if company)
+        if variant == 'legacy':
+            legacy_generate_sql_file([dict(company) for company in companies], sql_file)
+        elif variant == 'external':
+            extract_companies_from_pdfs.generate_sql_file(companies, sql_file, sort_buffer=sort_buffer)
+        else:
+            extract_companies_from_pdfs.generate_sql_file(list(companies), sql_file)
+    elapsed = time.perf_counter() - started
+    
+    count = 0
+    digest = hashlib.sha256()
+    with open(sql_file, 'rb') as f:
+        for line in f:
+            if line.startswith(b'-- Total companies:'):
+                count = int(line.split(b':')[1])
+            # The generation date differs between runs
+            if not line.startswith(b'-- Generated:'):
+                digest.update(line)
+    return {
+        'peak_rss_mb': pipeline_metrics.peak_rss_mb()['self'],
+        'baseline_rss_mb': baseline_rss,
+        'seconds': round(elapsed, 3),
+        'companies': count,
+        'sql_sha256': digest.hexdigest(),
+    }
+
+def bench_memory(args):
+    """Compare the peak memory of dictionary records, CompanyRecord and the external sort"""
+    print(f"Peak memory of parse + dedup + SQL export, {args.size:,} synthetic companies")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='benchmark_pipeline_') as work_dir:
+        for variant in ('legacy', 'compact', 'external'):
+            sql_file = os.path.join(work_dir, f"{variant}.sql")
+            # One fresh interpreter per variant: ru_maxrss never goes down
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                result = executor.submit(run_memory_variant, variant, args.size, args.seed, sql_file,
+                                         args.sort_buffer).result()
+            results[variant] = result
+            print(f"  {variant:<10} peak {result['peak_rss_mb']:8.1f} MB "
+                  f"(interpreter {result['baseline_rss_mb']:.1f} MB)  {result['seconds']:8.2f}s  "
+                  f"{result['companies']:,} companies")
+    
+    legacy = results['legacy']
+    used_legacy = legacy['peak_rss_mb'] - legacy['baseline_rss_mb']
+    for variant in ('compact', 'external'):
+        result = results[variant]
+        used = result['peak_rss_mb'] - result['baseline_rss_mb']
+        print(f"  Peak reduction ({variant}): {legacy['peak_rss_mb'] - result['peak_rss_mb']:.1f} MB "
+              f"({1 - used / used_legacy:.0%} of the memory used by the pipeline)")
+    identical = all(result['sql_sha256'] == legacy['sql_sha256'] for result in results.values())
+    print(f"  Identical SQL output: {'yes' if identical else 'NO'}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json}")
+    return identical
+
+def sql_digest(sql_file):
+    """Return the SHA-256 of a SQL file without its generation date"""
+    digest = hashlib.sha256()
+    with open(sql_file, 'rb') as f:
+        for line in f:
+            if not line.startswith(b'-- Generated:'):
+                digest.update(line)
+    return digest.hexdigest()
+
+def bench_jobs(args):
+    """Scaling of categorize_companies.py --jobs with the number of worker processes"""
+    process = (categorize_companies.process_sql_file_streaming if args.stream
+               else categorize_companies.process_sql_file)
+    with tempfile.TemporaryDirectory(prefix='benchmark_pipeline_') as work_dir:
+        sql_file = os.path.join(work_dir, 'synthetic.sql')
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsed = map(extract_companies_from_pdfs.parse_company_line,
+                         synthetic_companies.generate_lines(args.size, args.seed))
+            extract_companies_from_pdfs.generate_sql_file([company for company in parsed if company], sql_file)
+        print(f"Categorization scaling on {args.size:,} synthetic companies "
+              f"({'streaming' if args.stream else 'in memory'}, {os.cpu_count()} CPUs)")
+        
+        results = {}
+        for jobs in args.jobs:
+            output_file = os.path.join(work_dir, f"jobs_{jobs}.sql")
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, stats = best_time(lambda: process(sql_file, output_file, jobs), args.repeat)
+            results[jobs] = {'seconds': elapsed, 'stats': stats, 'sql_sha256': sql_digest(output_file)}
+            speedup = results[args.jobs[0]]['seconds'] / elapsed
+            print(f"  {jobs:>2} jobs  {elapsed:8.3f}s  {sum(stats.values()) / elapsed:12,.0f} companies/s  "
+                  f"speedup {speedup:5.2f}x  efficiency {speedup * args.jobs[0] / jobs:4.0%}")
+    
+    first = results[args.jobs[0]]
+    identical = all(result['sql_sha256'] == first['sql_sha256'] for result in results.values())
+    same_stats = all(result['stats'] == first['stats'] for result in results.values())
+    print(f"  Identical SQL output: {'yes' if identical else 'NO'}")
+    print(f"  Identical category statistics: {'yes' if same_stats else 'NO'}")
+    return identical and same_stats
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark the company import pipeline.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    
+    categorize = subparsers.add_parser('categorize', help="categorize_company throughput")
+    categorize.add_argument('--sql', default='companies_from_pdfs.sql')
+    categorize.add_argument('--repeat', type=int, default=5)
+    categorize.set_defaults(func=bench_categorize)
+    
+    tokenize = subparsers.add_parser('tokenize', help="SQL VALUES parsing throughput")
+    tokenize.add_argument('--sql', default='companies_from_pdfs.sql')
+    tokenize.add_argument('--repeat', type=int, default=5)
+    tokenize.set_defaults(func=bench_tokenize)
+    
+    parse = subparsers.add_parser('parse', help="parse_company_line throughput")
+    parse.add_argument('--pdf-dir', default='.')
+    parse.add_argument('--repeat', type=int, default=5)
+    parse.set_defaults(func=bench_parse)
+    
+    backends = subparsers.add_parser('backends', help="Text extraction backends and parsers: pages/s and parsed-line yield")
+    backends.add_argument('--pdf-dir', default='.')
+    backends.add_argument('--repeat', type=int, default=3)
+    backends.set_defaults(func=bench_backends)
+    
+    suite = subparsers.add_parser('suite', help="Stage throughput on synthetic data at several sizes")
+    suite.add_argument('--sizes', type=int, nargs='+', default=SUITE_SIZES)
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--pdf', action='store_true', help="Also render the lines to PDF and time text extraction")
+    suite.add_argument('--json', metavar='FILE', help="Save the results as JSON")
+    suite.add_argument('--baseline', metavar='FILE', help="JSON results to compare with")
+    suite.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                       help=f"Rate drop reported as a regression (default: {REGRESSION_TOLERANCE})")
+    suite.set_defaults(func=bench_suite)
+    
+    memory = subparsers.add_parser('memory', help="Peak memory of dictionary records vs CompanyRecord")
+    memory.add_argument('--size', type=int, default=MEMORY_SIZE)
+    memory.add_argument('--seed', type=int, default=0)
+    memory.add_argument('--sort-buffer', type=int, default=external_sort.SORT_BUFFER_RECORDS,
+                        help="Records in memory per sorted run of the external variant")
+    memory.add_argument('--json', metavar='FILE', help="Save the results as JSON")
+    memory.set_defaults(func=bench_memory)
+    
+    jobs = subparsers.add_parser('jobs', help="categorize_companies.py --jobs scaling with the number of workers")
+    jobs.add_argument('--size', type=int, default=JOBS_SIZE)
+    jobs.add_argument('--seed', type=int, default=0)
+    jobs.add_argument('--jobs', type=int, nargs='+', default=JOBS_COUNTS)
+    jobs.add_argument('--stream', action='store_true', help="Time the streaming mode (--stream)")
+    jobs.add_argument('--repeat', type=int, default=3)
+    jobs.set_defaults(func=bench_jobs)
+    
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    ok = args.func(args)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
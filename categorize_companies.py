@@ -4,12 +4,29 @@ Script to add proper categoryId to companies in companies_from_pdfs.sql
 Based on business activity keywords
 """
 
+import argparse
+import hashlib
+import json
+import os
 import re
 import sys
 import tempfile
+import time
 import shutil
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from category_rules import trie_regex
+from company_records import RECORD_FILE_SUFFIX, RecordReader, RecordWriter, is_record_file
+from pipeline_metrics import METRICS, add_report_arguments, run_report
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Category mapping with keywords
 CATEGORIES = {
     5: {  # Santé
@@ -52,39 +69,318 @@ CATEGORIES = {
     }
 }
 
+# Pattern to match the VALUES rows of the INSERT statements
+# Match: ('name', 'slug', 'description', 'ville', 'adresse', 'tel', 'activite', categoryId, NOW(), NOW())
+VALUES_ROW_PATTERN = re.compile(
+    r"\('([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*(\d+),\s*NOW\(\),\s*NOW\(\)\)"
+)
+
 # Default category (Vente au détail) is 6
+DEFAULT_CATEGORY = 6
+
+# Order in which categories are checked (most specific first):
+# Santé, Restaurants, Hôtels, Banques, Services publics
+CATEGORY_PRIORITY = [5, 2, 4, 1, 3]
+
+def compile_category_matcher(categories=CATEGORIES, priority=CATEGORY_PRIORITY):
+    """
+    Compile all category keywords into a single regex automaton.
+    
+    Each category becomes one named group, ordered by priority. The whole
+    alternation is wrapped in a lookahead so that a scan visits every
+    position of the text once and reports every keyword occurrence, even
+    when keywords overlap.
+    
+    Args:
+        categories: Mapping of categoryId to {'keywords': [regex, ...]}
+        priority: categoryIds in the order they must win
+        
+    Returns:
+        re.Pattern: Compiled matcher; match.lastgroup is 'c<categoryId>'
+    """
+    groups = []
+    for category_id in priority:
+        keywords = '|'.join(categories[category_id]['keywords'])
+        groups.append(f"(?P<c{category_id}>{keywords})")
+    return re.compile(f"(?=(?:{'|'.join(groups)}))")
+
+CATEGORY_MATCHER = compile_category_matcher()
+CATEGORY_RANK = {f"c{category_id}": rank for rank, category_id in enumerate(CATEGORY_PRIORITY)}
+
+# Names of the built-in categories, for the statistics
+CATEGORY_NAMES = {
+    1: 'Banques',
+    2: 'Restaurants',
+    3: 'Services publics',
+    4: 'Hôtels',
+    5: 'Santé',
+    6: 'Vente au détail',
+}
+
+# category_rules.CategoryRules used instead of CATEGORIES (see use_rules)
+ACTIVE_RULES = None
+
+def use_rules(rules):
+    """
+    Categorize with rules loaded from the database instead of CATEGORIES.
+    
+    Args:
+        rules: category_rules.CategoryRules, or None for the built-in rules
+    """
+    global ACTIVE_RULES
+    ACTIVE_RULES = rules
+
+def active_priority():
+    """Return (categoryIds in priority order, default categoryId) of the rules in use"""
+    if ACTIVE_RULES is not None:
+        return ACTIVE_RULES.priority, ACTIVE_RULES.default_category
+    return CATEGORY_PRIORITY, DEFAULT_CATEGORY
 
 def categorize_company(name, activite):
     """
     Categorize a company based on its name and activity using regex patterns.
     
+    The text is scanned once with CATEGORY_MATCHER; the highest-priority
+    category found wins, and the scan stops early on a top-priority hit.
+    
     Args:
         name: Company name (string)
         activite: Company activity description (string)
         
     Returns:
-        int: categoryId (1-6)
+        int: categoryId (1-6 with the built-in rules)
     """
+    if ACTIVE_RULES is not None:
+        return ACTIVE_RULES.categorize(name, activite)
+    
     # Combine name and activity for searching
     text = f"{name} {activite}".lower()
     
-    # Check each category in order (most specific first)
-    for category_id in [5, 2, 4, 1, 3]:  # Check Santé, Restaurants, Hôtels, Banques, Services publics
-        patterns = CATEGORIES[category_id]['keywords']
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return category_id
+    best_rank = len(CATEGORY_PRIORITY)
+    for match in CATEGORY_MATCHER.finditer(text):
+        rank = CATEGORY_RANK[match.lastgroup]
+        if rank < best_rank:
+            best_rank = rank
+            if rank == 0:
+                break
+    
+    if best_rank < len(CATEGORY_PRIORITY):
+        return CATEGORY_PRIORITY[best_rank]
     
     # Default to Vente au détail (6)
-    return 6
+    return DEFAULT_CATEGORY
+
+# Joins the texts of a batch; never present in extracted text, and no keyword can match it
+BATCH_SEPARATOR = '\x00'
+
+# A built-in keyword that is a plain sequence of words: \b<words>\b
+LITERAL_KEYWORD_PATTERN = re.compile(r"\\b([\w' -]+)\\b")
+
+def compile_batch_prefilter(categories=CATEGORIES):
+    """
+    Compile all keywords into one trie regex without lookahead.
+    
+    It finds whether a text contains any keyword several times faster
+    than CATEGORY_MATCHER finds them all, so categorize_batch() runs the
+    exact scan only on the texts it hits.
+    
+    Returns:
+        re.Pattern, or None if a keyword is not a plain sequence of words
+    """
+    words = []
+    for category in categories.values():
+        for keyword in category['keywords']:
+            literal = LITERAL_KEYWORD_PATTERN.fullmatch(keyword)
+            if literal is None:
+                return None
+            words.append(literal.group(1))
+    return re.compile(rf'\b(?:{trie_regex(words)})\b')
+
+BATCH_PREFILTER = compile_batch_prefilter()
+
+def scan_texts(texts, matcher, rank_of, levels, prefilter=None):
+    """
+    Find the best-ranked keyword of each text with one scan of the batch.
+    
+    The texts are joined with BATCH_SEPARATOR and lowercased at once, and
+    matcher runs over the whole batch; each match is assigned to its text
+    from its position. A keyword match running over the end of its text
+    (impossible with word keywords) sends that text to a scan of its own,
+    so the result is always the one of scanning each text separately.
+    
+    Args:
+        texts: "name activite" texts
+        matcher: Compiled keyword matcher; the keyword is its last group
+        rank_of: Function giving the rank of a match (0 is the best)
+        levels: Number of ranks
+        prefilter: Pattern matching in the texts that contain a keyword
+            (optional); only those are scanned with matcher
+    
+    Returns:
+        tuple: (rank per text, levels if none matched; keyword matched per text)
+    """
+    joined = BATCH_SEPARATOR.join(texts).lower()
+    ends = []
+    position = joined.find(BATCH_SEPARATOR)
+    while position != -1:
+        ends.append(position)
+        position = joined.find(BATCH_SEPARATOR, position + 1)
+    ends.append(len(joined))
+    if len(ends) != len(texts):
+        # A text contains the separator: scan the texts one by one
+        ranks, evidence = [], []
+        for text in texts:
+            text_ranks, text_evidence = scan_texts([text.replace(BATCH_SEPARATOR, ' ')], matcher, rank_of, levels)
+            ranks += text_ranks
+            evidence += text_evidence
+        return ranks, evidence
+    
+    ranks = [levels] * len(texts)
+    evidence = [''] * len(texts)
+    if prefilter is not None:
+        hits = []
+        row = 0
+        match = prefilter.search(joined)
+        while match is not None:
+            while ends[row] < match.start():
+                row += 1
+            hits.append(row)
+            match = prefilter.search(joined, ends[row] + 1)
+        starts = [0] + [end + 1 for end in ends]
+        hit_ranks, hit_evidence = scan_texts([joined[starts[row]:ends[row]] for row in hits], matcher, rank_of, levels)
+        for row, rank, keyword in zip(hits, hit_ranks, hit_evidence):
+            ranks[row] = rank
+            evidence[row] = keyword
+        return ranks, evidence
+    
+    rescan = []
+    row = 0
+    search = matcher.search
+    match = search(joined)
+    while match is not None:
+        start = match.start()
+        while ends[row] < start:
+            row += 1
+        rank = rank_of(match)
+        # Keywords shadowed by this match at the same position rank lower
+        if rank < ranks[row]:
+            if match.end(match.lastindex) > ends[row]:
+                rescan.append(row)
+                rank = 0
+            else:
+                ranks[row] = rank
+                evidence[row] = match.group(match.lastindex)
+            if rank == 0:
+                # Nothing ranks better: skip to the next text
+                match = search(joined, ends[row] + 1)
+                continue
+        match = search(joined, start + 1)
+    
+    for row in rescan:
+        (ranks[row],), (evidence[row],) = scan_texts([texts[row]], matcher, rank_of, levels)
+    return ranks, evidence
+
+def categorize_batch(names, activites):
+    """
+    Categorize whole columns of companies at once.
+    
+    Same result as categorize_company() on each company, without its
+    per-call work: the batch is lowercased once, the texts holding a
+    keyword are found with one pass of BATCH_PREFILTER, and those are
+    scanned in one pass of the compiled matcher (see scan_texts).
+    
+    Args:
+        names: Company names (list, NumPy object array, pandas Series...)
+        activites: Company activities, in the same order
+    
+    Returns:
+        tuple: (categoryIds as a NumPy int8 array, or array('b') without
+        NumPy; int32 if a categoryId does not fit in int8, keyword that
+        decided each category, '' for the default category)
+    """
+    texts = [f"{name} {activite}" for name, activite in zip(names, activites)]
+    if ACTIVE_RULES is not None:
+        ranks, evidence = ACTIVE_RULES.scan_batch(texts)
+        priority, default_category = ACTIVE_RULES.priority, ACTIVE_RULES.default_category
+    else:
+        ranks, evidence = scan_texts(texts, CATEGORY_MATCHER, lambda match: CATEGORY_RANK[match.lastgroup],
+                                     len(CATEGORY_PRIORITY), BATCH_PREFILTER)
+        priority, default_category = CATEGORY_PRIORITY, DEFAULT_CATEGORY
+    
+    categories = [priority[rank] if rank < len(priority) else default_category for rank in ranks]
+    typecode = 'b' if all(-128 <= category_id <= 127 for category_id in set(categories)) else 'i'
+    category_ids = array(typecode, categories)
+    if numpy is not None:
+        category_ids = numpy.frombuffer(category_ids, dtype=numpy.int8 if typecode == 'b' else numpy.int32)
+    return category_ids, evidence
+
+# Header lines rewritten after categorization
+GENERATED_PATTERN = re.compile(r'-- Generated: \d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+DEFAULT_CATEGORY_NOTE = (
+    '-- This script will insert companies into the default category (categoryId = 1)\n'
+    '-- You may want to update categoryId after import to properly categorize companies'
+)
+CATEGORIZED_NOTE = '-- Companies have been automatically categorized based on their business activities'
+
+def recategorize_row(match, stats):
+    """
+    Rebuild one VALUES row matched by VALUES_ROW_PATTERN with a new categoryId.
+    
+    Args:
+        match: re.Match of VALUES_ROW_PATTERN
+        stats: Dict of categoryId -> count, updated in place
+        
+    Returns:
+        str: The updated VALUES row
+    """
+    name = match.group(1).replace("''", "'")
+    slug = match.group(2)
+    description = match.group(3).replace("''", "'")
+    ville = match.group(4)
+    adresse = match.group(5).replace("''", "'")
+    tel = match.group(6)
+    activite = match.group(7).replace("''", "'")
+    
+    # Determine new category
+    started = time.perf_counter()
+    new_category = categorize_company(name, activite)
+    METRICS.add_time('categorize_company', time.perf_counter() - started)
+    
+    # Update statistics
+    stats[new_category] = stats.get(new_category, 0) + 1
+    METRICS.count('rows')
+    
+    # Return updated line (escape single quotes)
+    name_escaped = name.replace("'", "''")
+    description_escaped = description.replace("'", "''")
+    adresse_escaped = adresse.replace("'", "''")
+    activite_escaped = activite.replace("'", "''")
+    
+    return f"('{name_escaped}', '{slug}', '{description_escaped}', '{ville}', '{adresse_escaped}', '{tel}', '{activite_escaped}', {new_category}, NOW(), NOW())"
 
-def process_sql_file(input_file, output_file):
+def print_category_stats(stats, output_file):
+    """Print the categorization statistics"""
+    print(f"\nCategorization complete!")
+    print(f"Total companies processed: {sum(stats.values())}")
+    print("\nBreakdown by category:")
+    names = dict(CATEGORY_NAMES)
+    if ACTIVE_RULES is not None:
+        names.update(ACTIVE_RULES.names)
+    for category_id in sorted(stats):
+        print(f"  {category_id}. {names.get(category_id, 'Category ' + str(category_id))}: {stats[category_id]}")
+    print(f"\nUpdated file saved to: {output_file}")
+
+def process_sql_file(input_file, output_file, jobs=1):
     """
     Process the SQL file and update categoryId values.
     
     Args:
         input_file: Path to input SQL file
         output_file: Path to output SQL file
+        jobs: Number of worker processes categorizing the rows (see recategorize_parallel)
+        
+    Returns:
+        dict: categoryId -> number of companies
         
     Raises:
         FileNotFoundError: If input file doesn't exist
@@ -93,7 +389,7 @@ def process_sql_file(input_file, output_file):
     print(f"Processing {input_file}...")
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
+        with METRICS.stage('read'), open(input_file, 'r', encoding='utf-8') as f:
             content = f.read()
     except FileNotFoundError:
         print(f"Error: Input file '{input_file}' not found.")
@@ -104,64 +400,31 @@ def process_sql_file(input_file, output_file):
     
     # Statistics
     stats = {cat_id: 0 for cat_id in range(1, 7)}
-    total_companies = 0
-    
-    # Pattern to match INSERT statements
-    # Match: ('name', 'slug', 'description', 'ville', 'adresse', 'tel', 'activite', categoryId, NOW(), NOW())
-    pattern = r"\('([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*'([^']*(?:''[^']*)*)',\s*(\d+),\s*NOW\(\),\s*NOW\(\)\)"
-    
-    def replace_category(match):
-        nonlocal total_companies
-        name = match.group(1).replace("''", "'")
-        slug = match.group(2)
-        description = match.group(3).replace("''", "'")
-        ville = match.group(4)
-        adresse = match.group(5).replace("''", "'")
-        tel = match.group(6)
-        activite = match.group(7).replace("''", "'")
-        
-        # Determine new category
-        new_category = categorize_company(name, activite)
-        
-        # Update statistics
-        total_companies += 1
-        stats[new_category] += 1
-        
-        # Return updated line (escape single quotes)
-        name_escaped = name.replace("'", "''")
-        description_escaped = description.replace("'", "''")
-        adresse_escaped = adresse.replace("'", "''")
-        activite_escaped = activite.replace("'", "''")
-        
-        return f"('{name_escaped}', '{slug}', '{description_escaped}', '{ville}', '{adresse_escaped}', '{tel}', '{activite_escaped}', {new_category}, NOW(), NOW())"
     
     # Replace all categoryId values
-    new_content = re.sub(pattern, replace_category, content)
+    with METRICS.stage('rewrite'):
+        if jobs > 1:
+            chunks = iter_sql_lines(content.splitlines(keepends=True))
+            new_content = ''.join(recategorize_parallel(chunks, jobs, stats))
+        else:
+            new_content = VALUES_ROW_PATTERN.sub(lambda match: recategorize_row(match, stats), content)
     
     # Validate that we found and processed companies
-    if total_companies == 0:
+    if sum(stats.values()) == 0:
         print("Warning: No companies were found in the SQL file. Check the file format.")
         sys.exit(1)
     
     # Update the header comment
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    if re.search(r'-- Generated: \d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', new_content):
-        new_content = re.sub(
-            r'-- Generated: \d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}',
-            f'-- Generated: {timestamp}',
-            new_content
-        )
+    new_content = GENERATED_PATTERN.sub(f'-- Generated: {timestamp}', new_content)
     
     # Update the note about categoryId
-    new_content = new_content.replace(
-        '-- This script will insert companies into the default category (categoryId = 1)\n-- You may want to update categoryId after import to properly categorize companies',
-        '-- Companies have been automatically categorized based on their business activities'
-    )
+    new_content = new_content.replace(DEFAULT_CATEGORY_NOTE, CATEGORIZED_NOTE)
     
     # Write to a temporary file first, then move to final location
     try:
-        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', delete=False, 
-                                        dir='.', suffix='.sql') as tmp_file:
+        with METRICS.stage('write'), tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', delete=False,
+                                                                 dir='.', suffix='.sql') as tmp_file:
             tmp_file.write(new_content)
             tmp_filename = tmp_file.name
         
@@ -173,27 +436,764 @@ def process_sql_file(input_file, output_file):
         sys.exit(1)
     
     # Print statistics
-    print(f"\nCategorization complete!")
-    print(f"Total companies processed: {total_companies}")
-    print("\nBreakdown by category:")
-    print(f"  1. Banques: {stats[1]}")
-    print(f"  2. Restaurants: {stats[2]}")
-    print(f"  3. Services publics: {stats[3]}")
-    print(f"  4. Hôtels: {stats[4]}")
-    print(f"  5. Santé: {stats[5]}")
-    print(f"  6. Vente au détail: {stats[6]}")
-    print(f"\nUpdated file saved to: {output_file}")
+    print_category_stats(stats, output_file)
+    return stats
+
+# Tokens deciding whether a line ends inside a string literal or a block comment
+SQL_QUOTE_PATTERN = re.compile(r"''|'|--|/\*|\*/")
+
+def sql_line_state(line, state=None):
+    """
+    Return what the end of a line is inside of, given where it starts.
+    
+    Apostrophes in -- and /* */ comments are ignored, and a doubled
+    apostrophe is an escaped quote inside a string (or an empty string).
+    
+    Args:
+        line: One line of SQL
+        state: None, 'string' or 'comment' at the start of the line
+    
+    Returns:
+        None, 'string' or 'comment' at the end of the line
+    """
+    if state is None and '--' not in line and '/*' not in line:
+        # No comment: the line ends inside a string if it has an odd number of quotes
+        return 'string' if line.count("'") % 2 else None
+    for match in SQL_QUOTE_PATTERN.finditer(line):
+        token = match.group()
+        if state == 'string':
+            if token == "'":
+                state = None
+        elif state == 'comment':
+            if token == '*/':
+                state = None
+        elif token == "'":
+            state = 'string'
+        elif token == '--':
+            break
+        elif token == '/*':
+            state = 'comment'
+    return state
+
+def iter_sql_lines(lines):
+    """
+    Group raw lines so that no SQL string literal is split across items.
+    
+    Lines are yielded as-is, except when a quoted value spans a line break:
+    those lines are joined until the quote is closed. Only the new line is
+    scanned each time (see sql_line_state), and apostrophes in comments are
+    not quotes, so an apostrophe in a comment cannot swallow the file.
+    
+    Args:
+        lines: Iterable of lines (e.g. an open text file)
+    
+    Yields:
+        str: One or more complete lines
+    """
+    parts = []
+    state = None
+    for line in lines:
+        state = sql_line_state(line, state)
+        if state == 'string':
+            parts.append(line)
+            continue
+        if parts:
+            parts.append(line)
+            yield ''.join(parts)
+            parts = []
+        else:
+            yield line
+    if parts:
+        yield ''.join(parts)
+
+def rewrite_header_chunks(chunks, timestamp):
+    """
+    Update the header comments of a categorized file.
+    
+    Args:
+        chunks: Items of iter_sql_lines()
+        timestamp: New value of the Generated line
+    
+    Yields:
+        str: The items, with the Generated line and the note about
+        categoryId rewritten
+    """
+    note_first, note_second = DEFAULT_CATEGORY_NOTE.split('\n')
+    pending_note = None
+    for chunk in chunks:
+        # The note about categoryId spans two lines
+        if pending_note is not None:
+            if chunk.rstrip('\n') == note_second:
+                chunk = CATEGORIZED_NOTE + chunk[len(note_second):]
+            else:
+                yield pending_note
+            pending_note = None
+        elif chunk.rstrip('\n') == note_first:
+            pending_note = chunk
+            continue
+        
+        if chunk.startswith('--'):
+            chunk = GENERATED_PATTERN.sub(f'-- Generated: {timestamp}', chunk)
+        yield chunk
+    
+    if pending_note is not None:
+        yield pending_note
+
+def process_sql_file_streaming(input_file, output_file, jobs=1):
+    """
+    Process the SQL file row by row and update categoryId values.
+    
+    Same output as process_sql_file(), but each VALUES row is categorized
+    and written to the temporary file as soon as it is read, so memory use
+    does not depend on the size of the file.
+    
+    Args:
+        input_file: Path to input SQL file
+        output_file: Path to output SQL file
+        jobs: Number of worker processes categorizing the rows (see recategorize_parallel)
+    
+    Returns:
+        dict: categoryId -> number of companies
+    """
+    print(f"Processing {input_file} (streaming)...")
+    
+    try:
+        source = open(input_file, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+    
+    # Statistics
+    stats = {cat_id: 0 for cat_id in range(1, 7)}
+    
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Write to a temporary file first, then move to final location
+    try:
+        with METRICS.stage('rewrite'), source, tempfile.NamedTemporaryFile(
+                mode='w', encoding='utf-8', delete=False, dir='.', suffix='.sql') as tmp_file:
+            tmp_filename = tmp_file.name
+            chunks = rewrite_header_chunks(iter_sql_lines(source), timestamp)
+            if jobs > 1:
+                tmp_file.writelines(recategorize_parallel(chunks, jobs, stats))
+            else:
+                for chunk in chunks:
+                    if not chunk.startswith('--'):
+                        chunk = VALUES_ROW_PATTERN.sub(lambda match: recategorize_row(match, stats), chunk)
+                    tmp_file.write(chunk)
+    except Exception as e:
+        print(f"Error writing output file: {e}")
+        sys.exit(1)
+    
+    # Validate that we found and processed companies
+    if sum(stats.values()) == 0:
+        os.remove(tmp_filename)
+        print("Warning: No companies were found in the SQL file. Check the file format.")
+        sys.exit(1)
+    
+    # Move temporary file to final location
+    try:
+        shutil.move(tmp_filename, output_file)
+    except Exception as e:
+        print(f"Error writing output file: {e}")
+        sys.exit(1)
+    
+    # Print statistics
+    print_category_stats(stats, output_file)
+    return stats
+
+# ===============================================
+# Parallel categorization
+# ===============================================
+
+# Items of iter_sql_lines() (one VALUES row each) categorized per worker task
+CATEGORIZE_CHUNK_ROWS = 2000
+
+# Tasks submitted ahead of the one being written, per worker
+CATEGORIZE_TASKS_AHEAD = 2
+
+def _recategorize_chunks(chunks):
+    """Worker entry point: categorize the VALUES rows of a batch of iter_sql_lines() items"""
+    METRICS.reset()
+    stats = {}
+    text = ''.join(
+        chunk if chunk.startswith('--')
+        else VALUES_ROW_PATTERN.sub(lambda match: recategorize_row(match, stats), chunk)
+        for chunk in chunks
+    )
+    return text, stats, METRICS.snapshot()
+
+def recategorize_parallel(chunks, jobs, stats, chunk_rows=CATEGORIZE_CHUNK_ROWS):
+    """
+    Categorize the VALUES rows of a SQL text in worker processes.
+    
+    The items are sent to the workers in batches of chunk_rows. Each worker
+    gets the rules in use when it starts and compiles their matcher once;
+    batches are written back in input order and their statistics added to
+    stats, so the output is the same as a serial run. At most
+    CATEGORIZE_TASKS_AHEAD batches per worker are in flight, so a streamed
+    file is never held in memory.
+    
+    Args:
+        chunks: Items of iter_sql_lines() (comment lines are left as-is)
+        jobs: Number of worker processes
+        stats: Dict of categoryId -> count, updated in place
+        chunk_rows: Items per worker task
+    
+    Yields:
+        str: Categorized text of each batch, in input order
+    """
+    def batches():
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) == chunk_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    for text, batch_stats, metrics in map_in_workers(_recategorize_chunks, batches(), jobs):
+        for category_id, count in batch_stats.items():
+            stats[category_id] = stats.get(category_id, 0) + count
+        METRICS.merge(metrics)
+        yield text
+
+def map_in_workers(func, items, jobs):
+    """
+    Yield func(item) for each item, computed by worker processes.
+    
+    Results come back in input order. Each worker gets the rules in use
+    when it starts; at most CATEGORIZE_TASKS_AHEAD items per worker are
+    in flight, so the items can be streamed.
+    
+    Args:
+        func: Picklable function of one item
+        items: Iterable of picklable items
+        jobs: Number of worker processes
+    """
+    with ProcessPoolExecutor(max_workers=jobs, initializer=use_rules, initargs=(ACTIVE_RULES,)) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= jobs * CATEGORIZE_TASKS_AHEAD:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# ===============================================
+# Record files
+# ===============================================
+
+def _categorize_row_group(values):
+    """Worker entry point: categorize the name and activite columns of a row group"""
+    category_ids, _ = categorize_batch(values['name'], values['activite'])
+    return [int(category_id) for category_id in category_ids]
+
+def process_record_file(input_file, output_file, jobs=1):
+    """
+    Categorize the companies of a record file (see company_records.py).
+    
+    Only the name and activite columns are decompressed to categorize.
+    If output_file ends with RECORD_FILE_SUFFIX, the output is a record
+    file whose other columns are copied as-is; otherwise a categorized
+    SQL file is written.
+    
+    Args:
+        input_file: Path to input record file
+        output_file: Path to output record or SQL file
+        jobs: Number of worker processes categorizing the row groups
+    
+    Returns:
+        dict: categoryId -> number of companies
+    """
+    from company_pipeline import SqlSink
+    from extract_companies_from_pdfs import sql_values
+    
+    print(f"Processing {input_file} (record file)...")
+    
+    try:
+        reader = RecordReader(input_file)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    # Statistics
+    stats = {cat_id: 0 for cat_id in range(1, 7)}
+    
+    fd, tmp_filename = tempfile.mkstemp(dir='.', suffix=os.path.splitext(output_file)[1])
+    os.close(fd)
+    try:
+        with METRICS.stage('rewrite'), reader:
+            groups = reader.iter_row_groups(['name', 'activite'])
+            if jobs > 1:
+                categorized = map_in_workers(_categorize_row_group, groups, jobs)
+            else:
+                categorized = map(_categorize_row_group, groups)
+            
+            if output_file.endswith(RECORD_FILE_SUFFIX):
+                writer = RecordWriter(tmp_filename, reader.columns)
+                sink = None
+            else:
+                writer = None
+                sink = SqlSink(tmp_filename)
+                sink.open(len(reader))
+            columns = [name for name, _ in reader.columns if name != 'categoryId']
+            
+            for group, categories in enumerate(categorized):
+                for category_id in categories:
+                    stats[category_id] = stats.get(category_id, 0) + 1
+                METRICS.count('rows', len(categories))
+                
+                if writer is not None:
+                    blocks = {name: reader.raw_block(group, name) for name in columns}
+                    blocks['categoryId'] = categories
+                    writer.write_row_group(len(categories), blocks)
+                else:
+                    values = [reader.read_column(group, name) for name in columns]
+                    for record, category_id in zip(zip(*values), categories):
+                        row = dict(zip(columns, record))
+                        row['categoryId'] = category_id
+                        sink.write(sql_values(row))
+            
+            if writer is not None:
+                writer.close()
+            else:
+                sink.close()
+    except Exception as e:
+        os.remove(tmp_filename)
+        print(f"Error writing output file: {e}")
+        sys.exit(1)
+    
+    # Validate that we found and processed companies
+    if sum(stats.values()) == 0:
+        os.remove(tmp_filename)
+        print("Warning: No companies were found in the record file.")
+        sys.exit(1)
+    
+    # Move temporary file to final location
+    try:
+        shutil.move(tmp_filename, output_file)
+    except Exception as e:
+        print(f"Error writing output file: {e}")
+        sys.exit(1)
+    
+    # Print statistics
+    print_category_stats(stats, output_file)
+    return stats
+
+# ===============================================
+# Incremental categorization
+# ===============================================
+
+# State of the last incremental run: rules fingerprint and, per slug, the
+# hash of the categorized text and the categoryId it was given
+CATEGORY_STATE_FILE = '.categorize_state.json'
+CATEGORY_STATE_VERSION = 1
+
+# Delta script written by the incremental mode
+CATEGORY_DELTA_FILE = 'companies_category_delta.sql'
+
+# Slugs per UPDATE statement of the delta
+UPDATE_BATCH_SIZE = 500
+
+UPDATE_CATEGORY_SQL = 'UPDATE "Company" SET "categoryId" = %s, "updatedAt" = NOW() WHERE slug = ANY(%s)'
+
+def rules_fingerprint(categories=None, priority=None, default_category=DEFAULT_CATEGORY):
+    """
+    Fingerprint the categorization rules.
+    
+    Args:
+        categories: Mapping of categoryId to {'keywords': [regex, ...]}
+            (default: the rules in use)
+        priority: categoryIds in the order they are checked
+        default_category: categoryId of companies matching no keyword
+    
+    Returns:
+        dict: {'priority': [...], 'default': categoryId,
+        'categories': {categoryId: keywords hash}}
+    """
+    if categories is None:
+        if ACTIVE_RULES is not None:
+            priority = ACTIVE_RULES.priority
+            categories = {category_id: {'keywords': sorted(ACTIVE_RULES.keywords[category_id])}
+                          for category_id in priority}
+            default_category = ACTIVE_RULES.default_category
+        else:
+            categories, priority = CATEGORIES, CATEGORY_PRIORITY
+    return {
+        'priority': list(priority),
+        'default': default_category,
+        'categories': {
+            str(category_id): hashlib.sha1(
+                json.dumps(categories[category_id]['keywords']).encode('utf-8')
+            ).hexdigest()
+            for category_id in priority
+        },
+    }
+
+def stale_rank(old_rules, new_rules):
+    """
+    Return the highest priority rank whose rules changed.
+    
+    A company given category C only depends on the rules of C and of the
+    categories checked before C, so it must be re-evaluated when a rule of
+    rank <= rank(C) changed. The companies given the default category
+    depend on every rule and on the default categoryId itself, and are
+    ranked len(priority).
+    
+    Returns:
+        int: Rank of the first changed category, len(priority) if only
+        the default category changed, -1 if everything must be
+        re-evaluated, or len(priority) + 1 (above the rank of the default
+        category) if nothing changed
+    """
+    if old_rules is None or old_rules['priority'] != new_rules['priority']:
+        return -1
+    for rank, category_id in enumerate(new_rules['priority']):
+        key = str(category_id)
+        if old_rules['categories'].get(key) != new_rules['categories'][key]:
+            return rank
+    if old_rules.get('default') != new_rules['default']:
+        return len(new_rules['priority'])
+    return len(new_rules['priority']) + 1
+
+def input_hash(name, activite):
+    """Hash of the text a company is categorized on"""
+    return hashlib.sha1(f"{name}\0{activite}".encode('utf-8')).hexdigest()[:16]
+
+def load_category_state(state_file):
+    """Load the state of the last incremental run (None if there is none)"""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get('version') != CATEGORY_STATE_VERSION:
+        return None
+    return state
+
+def save_category_state(state, state_file):
+    """Write the state atomically"""
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_file, state_file)
+
+def compute_category_delta(input_file, state):
+    """
+    Find the companies whose categoryId must change.
+    
+    A company is re-categorized only if it is new, its name or activity
+    changed, or rules it depends on changed (see stale_rank). Its previous
+    categoryId is the one recorded in the state, or the one of the SQL file
+    for a company seen for the first time.
+    
+    Args:
+        input_file: SQL file of the companies
+        state: State of the last run, or None
+    
+    Returns:
+        tuple: (changes, new_state, stats) where changes is a list of
+        (slug, old categoryId, new categoryId)
+    """
+    rules = rules_fingerprint()
+    first_stale_rank = stale_rank(state['rules'] if state else None, rules)
+    known = state['rows'] if state else {}
+    priority, _ = active_priority()
+    default_rank = len(priority)
+    ranks = {category_id: rank for rank, category_id in enumerate(priority)}
+    # Companies given the previous default category may have matched no keyword
+    old_default = state['rules'].get('default') if state else None
+    if old_default is not None:
+        ranks[old_default] = default_rank
+    
+    rows = {}
+    changes = []
+    stats = {'rows': 0, 'evaluated': 0, 'changed': 0}
+    with open(input_file, 'r', encoding='utf-8') as source:
+        for chunk in iter_sql_lines(source):
+            if chunk.startswith('--'):
+                continue
+            for match in VALUES_ROW_PATTERN.finditer(chunk):
+                name = match.group(1).replace("''", "'")
+                slug = match.group(2)
+                activite = match.group(7).replace("''", "'")
+                text_hash = input_hash(name, activite)
+                stats['rows'] += 1
+                
+                previous = known.get(slug)
+                if previous is None:
+                    old_category = int(match.group(8))
+                    evaluate = True
+                else:
+                    old_hash, old_category = previous
+                    evaluate = (old_hash != text_hash
+                                or first_stale_rank <= ranks.get(old_category, default_rank))
+                
+                new_category = old_category
+                if evaluate:
+                    stats['evaluated'] += 1
+                    new_category = categorize_company(name, activite)
+                    if new_category != old_category:
+                        changes.append((slug, old_category, new_category))
+                rows[slug] = [text_hash, new_category]
+    
+    stats['changed'] = len(changes)
+    new_state = {'version': CATEGORY_STATE_VERSION, 'rules': rules, 'rows': rows}
+    return changes, new_state, stats
+
+def group_changes(changes):
+    """Group changed slugs by new categoryId"""
+    groups = {}
+    for slug, _, new_category in changes:
+        groups.setdefault(new_category, []).append(slug)
+    return groups
+
+def write_category_delta(changes, output_file):
+    """
+    Write the changes as UPDATE statements, grouped by new categoryId.
+    
+    Args:
+        changes: List of (slug, old categoryId, new categoryId)
+        output_file: Path of the delta SQL file
+    """
+    sql_lines = [
+        '-- ===============================================',
+        '-- Company categoryId delta',
+        f'-- Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+        f'-- Companies updated: {len(changes)}',
+        '-- ===============================================',
+        '',
+    ]
+    if changes:
+        sql_lines.append('BEGIN;')
+        sql_lines.append('')
+        for category_id, slugs in sorted(group_changes(changes).items()):
+            sql_lines.append(f'-- categoryId {category_id}: {len(slugs)} companies')
+            for i in range(0, len(slugs), UPDATE_BATCH_SIZE):
+                batch = slugs[i:i + UPDATE_BATCH_SIZE]
+                sql_lines.append(f'UPDATE "Company" SET "categoryId" = {category_id}, "updatedAt" = NOW() WHERE slug IN (')
+                sql_lines.append(',\n'.join(f"  '{slug}'" for slug in batch))
+                sql_lines.append(');')
+            sql_lines.append('')
+        sql_lines.append('COMMIT;')
+    else:
+        sql_lines.append('-- No categoryId changes')
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sql_lines) + '\n')
+
+def apply_category_delta(changes, dsn):
+    """
+    Apply the changes to the "Company" table in one transaction.
+    
+    Args:
+        changes: List of (slug, old categoryId, new categoryId)
+        dsn: PostgreSQL connection string or URL
+    
+    Returns:
+        int: Number of rows updated
+    
+    Raises:
+        ImportError: If psycopg2 is not installed
+    """
+    import psycopg2
+    from psycopg2 import sql
+    from load_companies_postgres import split_schema
+    
+    dsn, schema = split_schema(dsn)
+    updated = 0
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection, connection.cursor() as cursor:
+            if schema:
+                cursor.execute(sql.SQL('SET LOCAL search_path TO {}').format(sql.Identifier(schema)))
+            for category_id, slugs in sorted(group_changes(changes).items()):
+                # Slugs are read from the SQL file, where quotes are doubled
+                cursor.execute(UPDATE_CATEGORY_SQL, (category_id, [slug.replace("''", "'") for slug in slugs]))
+                updated += cursor.rowcount
+    finally:
+        connection.close()
+    return updated
+
+def process_sql_file_incremental(input_file, state_file=CATEGORY_STATE_FILE,
+                                 delta_file=CATEGORY_DELTA_FILE, apply_dsn=None):
+    """
+    Re-categorize only the companies whose input or rules changed.
+    
+    Instead of rewriting the SQL file, the changes since the last run are
+    written as an UPDATE delta script, or applied directly to the database
+    with apply_dsn. The state is saved once the delta is written or applied.
+    
+    Args:
+        input_file: Path to input SQL file
+        state_file: Path of the state of the last run
+        delta_file: Path of the delta SQL file
+        apply_dsn: PostgreSQL DSN to apply the delta to (optional)
+    """
+    print(f"Processing {input_file} (incremental)...")
+    
+    state = load_category_state(state_file)
+    if state is None:
+        print(f"No previous state in {state_file}: every company is evaluated")
+    
+    try:
+        with METRICS.stage('incremental.scan'):
+            changes, new_state, stats = compute_category_delta(input_file, state)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        sys.exit(1)
+    
+    if stats['rows'] == 0:
+        print("Warning: No companies were found in the SQL file. Check the file format.")
+        sys.exit(1)
+    
+    METRICS.count('rows', stats['rows'])
+    METRICS.count('rows_evaluated', stats['evaluated'])
+    METRICS.count('rows_changed', stats['changed'])
+    
+    if apply_dsn:
+        try:
+            with METRICS.stage('incremental.apply'):
+                updated = apply_category_delta(changes, apply_dsn)
+        except ImportError:
+            print("Error: --apply-dsn requires psycopg2 (pip install psycopg2-binary)")
+            sys.exit(1)
+        target = f"database ({updated} rows updated)"
+    else:
+        write_category_delta(changes, delta_file)
+        target = delta_file
+    
+    save_category_state(new_state, state_file)
+    
+    print(f"\nIncremental categorization complete!")
+    print(f"Total companies: {stats['rows']}")
+    print(f"Companies re-evaluated: {stats['evaluated']}")
+    print(f"Companies with a new categoryId: {stats['changed']}")
+    for category_id, slugs in sorted(group_changes(changes).items()):
+        print(f"  -> {category_id}: {len(slugs)}")
+    print(f"\nDelta saved to: {target}")
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Add categoryId values to the companies of a SQL file."
+    )
+    parser.add_argument(
+        '--input', default='companies_from_pdfs.sql',
+        help="Input SQL file, or record file written by extract_companies_from_pdfs.py --records"
+    )
+    parser.add_argument(
+        '--output', default='companies_from_pdfs.sql',
+        help=f"Output SQL file (a record file if it ends with {RECORD_FILE_SUFFIX} and the input is one)"
+    )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help="Process the file row by row with constant memory"
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=1, metavar='N',
+        help="Number of worker processes categorizing the rows (default: 1)"
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Only re-categorize changed companies and write an UPDATE delta instead of the file"
+    )
+    parser.add_argument(
+        '--state', default=CATEGORY_STATE_FILE,
+        help=f"State of the last incremental run (default: {CATEGORY_STATE_FILE})"
+    )
+    parser.add_argument(
+        '--delta', default=CATEGORY_DELTA_FILE,
+        help=f"Delta SQL file of the incremental mode (default: {CATEGORY_DELTA_FILE})"
+    )
+    parser.add_argument(
+        '--apply-dsn', metavar='DSN',
+        help="Apply the incremental delta to PostgreSQL instead of writing the delta file"
+    )
+    add_rules_arguments(parser)
+    add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+def add_rules_arguments(parser):
+    """Add the options selecting the categorization rules to an argparse parser"""
+    parser.add_argument(
+        '--rules', metavar='FILE',
+        help="CSV export of Category/CategoryKeyword to categorize with instead of the built-in rules"
+    )
+    parser.add_argument(
+        '--rules-dsn', metavar='DSN',
+        help="Load the categorization rules from the Category/CategoryKeyword tables"
+    )
+    parser.add_argument(
+        '--rules-cache-dir', default='.category_rules_cache',
+        help="Cache of rule matchers, regex source and keyword ranks (default: .category_rules_cache)"
+    )
+    parser.add_argument(
+        '--default-category', type=int, default=DEFAULT_CATEGORY,
+        help=f"categoryId of companies matching no loaded keyword (default: {DEFAULT_CATEGORY})"
+    )
+
+def load_rules(args):
+    """
+    Load and activate the rules selected on the command line, if any.
+    
+    Args:
+        args: Namespace with the options of add_rules_arguments()
+    """
+    if not (args.rules or args.rules_dsn):
+        return
+    
+    import category_rules
+    
+    try:
+        with METRICS.stage('rules.load'):
+            if args.rules:
+                rules = category_rules.load_rules_file(args.rules, args.default_category)
+            else:
+                rules = category_rules.load_rules_database(args.rules_dsn, args.default_category)
+            rules.prepare(args.rules_cache_dir)
+    except FileNotFoundError:
+        print(f"Error: Rules file '{args.rules}' not found.")
+        sys.exit(1)
+    except ImportError:
+        print("Error: --rules-dsn requires psycopg2 (pip install psycopg2-binary)")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    keyword_count = sum(len(keywords) for keywords in rules.keywords.values())
+    print(f"Loaded {keyword_count} keywords for {len(rules.priority)} categories (rules {rules.checksum[:12]})")
+    use_rules(rules)
 
 if __name__ == '__main__':
-    input_file = 'companies_from_pdfs.sql'
-    output_file = 'companies_from_pdfs.sql'
+    args = parse_args()
     
     try:
-        process_sql_file(input_file, output_file)
+        with run_report('categorize_companies', args.report, args.profile):
+            load_rules(args)
+            if is_record_file(args.input):
+                if args.incremental:
+                    print("Error: --incremental reads SQL files, not record files.")
+                    sys.exit(1)
+                process_record_file(args.input, args.output, args.jobs)
+            elif args.incremental:
+                process_sql_file_incremental(args.input, args.state, args.delta, args.apply_dsn)
+            elif args.stream:
+                process_sql_file_streaming(args.input, args.output, args.jobs)
+            else:
+                process_sql_file(args.input, args.output, args.jobs)
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
         sys.exit(1)
     except Exception as e:
         print(f"\nUnexpected error: {e}")
         sys.exit(1)
-
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Categorization rules loaded from the CategoryKeyword table.
+
+categorize_companies.py ships a fixed CATEGORIES mapping for the six
+original categories. The backend keeps the real rules in the database:
+"Category" rows (with a parentId hierarchy) and their "CategoryKeyword"
+rows. This module loads those rules from an export file or directly from
+PostgreSQL and compiles them into one matcher:
+
+- all keywords go into a single trie-shaped regex, so the scan costs about
+  the same with thousands of keywords as with a hundred;
+- a company gets the highest-priority category among the keywords found,
+  where deeper (more specific) categories come before their ancestors;
+- the matcher regex and the keyword ranks are cached on disk under the
+  checksum of the rules, so a cold start with unchanged rules does not
+  rebuild them (the regex itself is compiled with re.compile).
+
+Export the rules with:
+    \\copy (SELECT c.id AS "categoryId", c."parentId", c.name, k.keyword FROM "Category" c LEFT JOIN "CategoryKeyword" k ON k."categoryId" = c.id ORDER BY c.id, k.id) TO 'category_rules.csv' CSV HEADER
+"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+# On-disk cache of built matchers
+RULES_CACHE_DIR = '.category_rules_cache'
+RULES_CACHE_ENTRIES = 8  # Matchers kept in the cache (most recently used)
+RULES_CACHE_VERSION = 2
+
+RULES_SNAPSHOT_SQL = '''
+SELECT c.id, c."parentId", c.name, k.keyword
+FROM "Category" c
+LEFT JOIN "CategoryKeyword" k ON k."categoryId" = c.id
+ORDER BY c.id, k.id
+'''
+
+def _is_word(char):
+    """Whether a character is a regex word character (\\w)"""
+    return char.isalnum() or char == '_'
+
+def keyword_variants(keyword, accents=True):
+    """
+    Return the forms of a keyword to match in lowercased text.
+    
+    Extracted text is NFKD-normalized (accents are separate combining
+    characters) while keywords are usually typed composed, so both forms
+    are matched.
+    """
+    keyword = ' '.join(keyword.lower().split())
+    if not keyword:
+        return []
+    if not accents:
+        return [keyword]
+    forms = {keyword, unicodedata.normalize('NFC', keyword), unicodedata.normalize('NFKD', keyword)}
+    return sorted(forms)
+
+def trie_regex(words):
+    """Build a regex matching any of the words, longest first at each position"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ending here: the longer continuation is tried first
+        return f'(?:{body})?' if '' in node else body
+    
+    return build(trie)
+
+class CategoryRules:
+    """Keyword rules of a category tree, compiled into a single matcher
+    
+    Attributes:
+        keywords: categoryId -> list of keywords
+        parents: categoryId -> parent categoryId (or None)
+        names: categoryId -> category name
+        priority: categoryIds with keywords, in the order they win
+        default_category: categoryId of companies matching no keyword
+        checksum: SHA-256 of the rules, key of the matcher cache
+    """
+    
+    def __init__(self, keywords, parents=None, names=None, default_category=6,
+                 priority=None, accents=True):
+        """
+        Args:
+            keywords: Mapping of categoryId to a list of keywords
+            parents: Mapping of categoryId to its parent categoryId
+            names: Mapping of categoryId to its name
+            default_category: categoryId of companies matching no keyword
+            priority: Explicit order of the categories (default: deepest
+                first, then categorize_companies.CATEGORY_PRIORITY, then id)
+            accents: Also match the NFKD form of accented keywords
+        """
+        self.keywords = {category_id: list(words) for category_id, words in keywords.items()}
+        self.parents = dict(parents or {})
+        self.names = dict(names or {})
+        self.default_category = default_category
+        self.accents = accents
+        self.priority = list(priority) if priority else self._default_priority()
+        self.checksum = self._checksum()
+        self._matcher = None
+        self._ranks = None
+    
+    def depth(self, category_id):
+        """Number of ancestors of a category"""
+        depth = 0
+        seen = {category_id}
+        parent = self.parents.get(category_id)
+        while parent is not None and parent not in seen:
+            seen.add(parent)
+            depth += 1
+            parent = self.parents.get(parent)
+        return depth
+    
+    def _default_priority(self):
+        from categorize_companies import CATEGORY_PRIORITY
+        
+        legacy = {category_id: rank for rank, category_id in enumerate(CATEGORY_PRIORITY)}
+        with_keywords = [category_id for category_id, words in self.keywords.items() if words]
+        return sorted(with_keywords, key=lambda category_id: (
+            -self.depth(category_id), legacy.get(category_id, len(legacy)), category_id))
+    
+    def _checksum(self):
+        canonical = json.dumps({
+            'priority': self.priority,
+            'keywords': {str(category_id): sorted(self.keywords[category_id]) for category_id in self.priority},
+            'default': self.default_category,
+            'accents': self.accents,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def build_matcher_source(self):
+        """
+        Build the matcher regex and the rank of each keyword.
+        
+        At every position the matcher reports the longest keyword; shorter
+        keywords that also match there are its prefixes, so each keyword
+        is given the best rank among itself and those prefixes.
+        
+        Returns:
+            tuple: (regex source, {keyword: rank})
+        """
+        ranks = {}
+        for rank, category_id in enumerate(self.priority):
+            for keyword in self.keywords[category_id]:
+                for form in keyword_variants(keyword, self.accents):
+                    ranks.setdefault(form, rank)
+        
+        best = {}
+        for keyword, rank in ranks.items():
+            for end in range(1, len(keyword)):
+                prefix = keyword[:end]
+                # The prefix also matches if a word boundary follows it in the keyword
+                if prefix in ranks and _is_word(keyword[end - 1]) != _is_word(keyword[end]):
+                    rank = min(rank, ranks[prefix])
+            best[keyword] = rank
+        
+        source = rf'(?=\b({trie_regex(best)})\b)' if best else r'(?!)'
+        return source, best
+    
+    def _compile(self, cache_dir):
+        entry = load_cached_matcher(self.checksum, cache_dir) if cache_dir else None
+        if entry is not None:
+            self._matcher, self._ranks = entry
+            return
+        source, self._ranks = self.build_matcher_source()
+        self._matcher = re.compile(source)
+        if cache_dir:
+            store_cached_matcher(self.checksum, source, self._ranks, cache_dir)
+    
+    def prepare(self, cache_dir=RULES_CACHE_DIR):
+        """Compile the matcher now, through the on-disk cache (None to bypass it)"""
+        if self._matcher is None:
+            self._compile(cache_dir)
+        return self
+    
+    def categorize(self, name, activite):
+        """
+        Categorize a company from its name and activity.
+        
+        Returns:
+            int: categoryId of the best-ranked keyword found, or the
+            default category
+        """
+        if self._matcher is None:
+            self.prepare()
+        text = f"{name} {activite}".lower()
+        ranks = self._ranks
+        best_rank = len(self.priority)
+        for match in self._matcher.finditer(text):
+            rank = ranks[match.group(1)]
+            if rank < best_rank:
+                best_rank = rank
+                if rank == 0:
+                    break
+        if best_rank < len(self.priority):
+            return self.priority[best_rank]
+        return self.default_category
+    
+    def scan_batch(self, texts):
+        """
+        Rank the best keyword of each "name activite" text of a batch.
+        
+        Returns:
+            tuple: (rank in priority per text, len(priority) if no keyword
+            matched; keyword matched per text)
+        """
+        from categorize_companies import scan_texts
+        
+        if self._matcher is None:
+            self.prepare()
+        ranks = self._ranks
+        return scan_texts(texts, self._matcher, lambda match: ranks[match.group(1)], len(self.priority))
+
+# ===============================================
+# Matcher cache
+# ===============================================
+
+def _cache_file(checksum, cache_dir):
+    return os.path.join(cache_dir, f"{checksum}.json")
+
+def load_cached_matcher(checksum, cache_dir=RULES_CACHE_DIR):
+    """
+    Load a matcher from the cache.
+    
+    The entry holds the regex source and the keyword ranks; the source is
+    compiled with re.compile. An entry that is not well-formed (other
+    version, hand-edited, truncated) is a cache miss.
+    
+    Returns:
+        tuple: (re.Pattern, {keyword: rank}), or None on a cache miss
+    """
+    path = _cache_file(checksum, cache_dir)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != RULES_CACHE_VERSION or entry.get('checksum') != checksum:
+        return None
+    source, ranks = entry.get('source'), entry.get('ranks')
+    if not isinstance(source, str) or not isinstance(ranks, dict):
+        return None
+    if not all(type(rank) is int and rank >= 0 for rank in ranks.values()):
+        return None
+    try:
+        matcher = re.compile(source)
+    except re.error:
+        return None
+    if matcher.groups != 1:
+        return None
+    os.utime(path)
+    return matcher, ranks
+
+def store_cached_matcher(checksum, source, ranks, cache_dir=RULES_CACHE_DIR):
+    """Store a matcher (regex source and keyword ranks) in the cache and drop the least recently used ones"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_file(checksum, cache_dir)
+    entry = {
+        'version': RULES_CACHE_VERSION,
+        'checksum': checksum,
+        'source': source,
+        'ranks': ranks,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    
+    entries = sorted(
+        (entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for stale in entries[RULES_CACHE_ENTRIES:]:
+        os.remove(stale.path)
+
+# ===============================================
+# Loading
+# ===============================================
+
+def builtin_rules():
+    """Rules equivalent to categorize_companies.CATEGORIES"""
+    from categorize_companies import CATEGORIES, CATEGORY_PRIORITY, DEFAULT_CATEGORY
+    
+    keywords = {
+        category_id: [re.sub(r'^\\b|\\b$', '', pattern) for pattern in rules['keywords']]
+        for category_id, rules in CATEGORIES.items()
+    }
+    # The built-in keywords only match their composed form
+    return CategoryRules(keywords, default_category=DEFAULT_CATEGORY,
+                         priority=CATEGORY_PRIORITY, accents=False)
+
+def rules_from_rows(rows, default_category=6):
+    """
+    Build rules from (categoryId, parentId, name, keyword) rows.
+    
+    parentId, name and keyword may be empty: categories without keywords
+    still define the hierarchy.
+    """
+    keywords = {}
+    parents = {}
+    names = {}
+    for category_id, parent_id, name, keyword in rows:
+        category_id = int(category_id)
+        keywords.setdefault(category_id, [])
+        parents[category_id] = int(parent_id) if parent_id not in (None, '') else None
+        if name:
+            names[category_id] = name
+        if keyword:
+            keywords[category_id].append(keyword)
+    return CategoryRules(keywords, parents, names, default_category)
+
+def load_rules_file(path, default_category=6):
+    """
+    Load rules from a CSV export of "Category" and "CategoryKeyword".
+    
+    The file has a header with the columns categoryId and keyword, and
+    optionally parentId and name (see the export command at the top of
+    this module).
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = {'categoryId', 'keyword'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+        rows = [
+            (row['categoryId'], row.get('parentId'), row.get('name'), row['keyword'])
+            for row in reader if row['categoryId']
+        ]
+    return rules_from_rows(rows, default_category)
+
+def load_rules_database(dsn, default_category=6):
+    """
+    Load rules from the "Category" and "CategoryKeyword" tables.
+    
+    Raises:
+        ImportError: If psycopg2 is not installed
+    """
+    import psycopg2
+    from psycopg2 import sql
+    from load_companies_postgres import split_schema
+    
+    dsn, schema = split_schema(dsn)
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection, connection.cursor() as cursor:
+            if schema:
+                cursor.execute(sql.SQL('SET LOCAL search_path TO {}').format(sql.Identifier(schema)))
+            cursor.execute(RULES_SNAPSHOT_SQL)
+            rows = cursor.fetchall()
+    finally:
+        connection.close()
+    return rules_from_rows(rows, default_category)
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Single-pass company import pipeline.
+
+Chains the three import scripts in one process:
+
+    PDF files -> parse -> dedup -> categorize -> SQL / CSV / JSON lines / record file
+
+Companies flow through generator stages. Each row is categorized with
+categorize_company() as it is built and fanned out to every sink at once,
+so the SQL file is not written with categoryId = 1, re-parsed and rewritten
+by categorize_companies.py, then parsed a third time by extract_companies.py.
+
+The SQL sink writes the same file as extract_companies_from_pdfs.py followed
+by categorize_companies.py, and the CSV sink the same file as
+extract_companies.py --stream on that SQL file.
+
+Usage:
+    python company_pipeline.py --sql companies_from_pdfs.sql --csv companies.csv
+    python company_pipeline.py --jsonl companies.jsonl --workers 4
+    python company_pipeline.py --records companies.records
+    python company_pipeline.py --sql companies_from_pdfs.sql --normalize-phones --phone-index phones.json
+    python company_pipeline.py --sql companies_from_pdfs.sql --geocode
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from categorize_companies import add_rules_arguments, categorize_company, load_rules, print_category_stats
+from company_records import RecordWriter
+from external_sort import SORT_BUFFER_RECORDS
+from extract_companies_from_pdfs import (
+    BATCH_SIZE, CACHE_DIR, CACHE_MAX_BYTES, PAGES_PER_TASK, ExternalSortedCompanies, SlugAllocator,
+    deduplicate_companies, format_location_line, format_values_line, geocode_company_row, index_company_row,
+    iter_company_values, iter_extracted_files, load_gazetteer, load_phone_index, location_batch_lines,
+    normalize_company_phones, read_error_text, record_values, sql_batch_lines, sql_footer_lines,
+    sql_header_lines, strategy_counts,
+)
+from gazetteer import DEFAULT_GAZETTEER, print_geocode_counts
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, backend_available
+from pipeline_metrics import METRICS, add_report_arguments, run_report
+
+# Columns of the CSV sink, as exported by extract_companies.py
+CSV_COLUMNS = ['name', 'slug', 'description', 'ville', 'adresse', 'tel', 'activite',
+               'categoryId', 'createdAt', 'updatedAt']
+
+# Text columns of a row, SQL-escaped by iter_company_values()
+TEXT_COLUMNS = ['name', 'slug', 'description', 'ville', 'adresse', 'tel', 'activite']
+
+# ===============================================
+# Stages
+# ===============================================
+
+def iter_pdf_companies(pdfs, workers=1, pages_per_task=PAGES_PER_TASK, cache_dir=CACHE_DIR,
+                       cache_max_bytes=CACHE_MAX_BYTES, backend=DEFAULT_BACKEND, layout=False,
+                       geometry=False):
+    """
+    Parse the companies of the PDF files.
+    
+    Args:
+        pdfs: PDF file paths
+        workers: Number of worker processes (1 for serial extraction)
+        pages_per_task: Pages per worker task
+        cache_dir: Cache directory, or None to bypass the cache
+        cache_max_bytes: Size limit of the cache directory
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+    
+    Yields:
+        CompanyRecord: Parsed company (ville, name, activite, adresse, tel)
+    """
+    extracted = iter_extracted_files(pdfs, workers, pages_per_task, cache_dir, cache_max_bytes,
+                                     backend, layout, geometry)
+    for pdf_file, companies, elapsed, source, errors in extracted:
+        print(f"  {pdf_file}: {len(companies)} companies ({elapsed:.2f}s, {source})")
+        for page_number, message in errors:
+            print(f"  {pdf_file}: {read_error_text(page_number, message)}, not cached")
+        METRICS.count('companies_extracted', len(companies))
+        yield from companies
+
+def iter_categorized_rows(unique_companies, slugs=None, stats=None):
+    """
+    Build the rows of the companies with their categoryId.
+    
+    Args:
+        unique_companies: Deduplicated, sorted CompanyRecords
+        slugs: SlugAllocator preloaded with existing slugs (optional)
+        stats: Dict of categoryId -> count, updated in place (optional)
+    
+    Yields:
+        dict: SQL-escaped values of iter_company_values() plus 'categoryId'
+    """
+    for row in iter_company_values(unique_companies, slugs):
+        started = time.perf_counter()
+        # Categorize on the values stored in the database
+        row['categoryId'] = categorize_company(row['name'].replace("''", "'"),
+                                               row['activite'].replace("''", "'"))
+        METRICS.add_time('categorize_company', time.perf_counter() - started)
+        if stats is not None:
+            stats[row['categoryId']] = stats.get(row['categoryId'], 0) + 1
+        yield row
+
+def fan_out(rows, sinks):
+    """
+    Write every row to every sink.
+    
+    Returns:
+        int: Number of rows written
+    """
+    count = 0
+    for row in rows:
+        for sink in sinks:
+            started = time.perf_counter()
+            sink.write(row)
+            METRICS.add_time(f'sink.{sink.name}', time.perf_counter() - started)
+        count += 1
+    METRICS.count('rows_emitted', count)
+    return count
+
+# ===============================================
+# Sinks
+# ===============================================
+
+class SqlSink:
+    """INSERT script with categorized rows, in batches of BATCH_SIZE"""
+    
+    name = 'sql'
+    
+    def __init__(self, path, geocoder=None):
+        self.path = path
+        self.geocoder = geocoder
+        self._file = None
+        self._batch = []
+        self._locations = []
+        self._written = 0
+        self._total = 0
+        self._started = False
+    
+    def open(self, total):
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write_lines(sql_header_lines(total, categorized=True))
+        self._total = total
+    
+    def write(self, row):
+        self._batch.append(format_values_line(row, row['categoryId']))
+        if self.geocoder is not None:
+            self._locations.append(format_location_line(row, geocode_company_row(self.geocoder, row)))
+        if len(self._batch) == BATCH_SIZE:
+            self._flush()
+    
+    def close(self):
+        self._flush()
+        self._write_lines(sql_footer_lines(self._total))
+        self._file.close()
+    
+    def _flush(self):
+        if self._batch:
+            self._write_lines(sql_batch_lines(self._batch, self._written))
+            self._written += len(self._batch)
+            self._batch = []
+        if self._locations:
+            self._write_lines(location_batch_lines(self._locations))
+            self._locations = []
+    
+    def _write_lines(self, lines):
+        # Lines are separated, not terminated, by line breaks (as in generate_sql_file)
+        for line in lines:
+            if self._started:
+                self._file.write('\n')
+            self._file.write(line)
+            self._started = True
+
+class CsvSink:
+    """CSV export with the columns of extract_companies.py"""
+    
+    name = 'csv'
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._writer = None
+    
+    def open(self, total):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_COLUMNS)
+    
+    def write(self, row):
+        values = [row[column].replace("''", "'") for column in TEXT_COLUMNS]
+        self._writer.writerow(values + [row['categoryId'], 'NOW()', 'NOW()'])
+    
+    def close(self):
+        self._file.close()
+
+class JsonLinesSink:
+    """One JSON object per company, with the values stored in the database"""
+    
+    name = 'jsonl'
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+    
+    def open(self, total):
+        self._file = open(self.path, 'w', encoding='utf-8')
+    
+    def write(self, row):
+        record = {column: row[column].replace("''", "'") for column in TEXT_COLUMNS}
+        record['categoryId'] = row['categoryId']
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    def close(self):
+        self._file.close()
+
+class RecordSink:
+    """Compressed columnar record file (see company_records.py)"""
+    
+    name = 'records'
+    
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+    
+    def open(self, total):
+        self._writer = RecordWriter(self.path)
+    
+    def write(self, row):
+        self._writer.write(record_values(row, row['categoryId']))
+    
+    def close(self):
+        self._writer.close()
+
+class PhoneIndexSink:
+    """Phone -> company index updated with the companies written (see phone_numbers.py)"""
+    
+    name = 'phone_index'
+    
+    def __init__(self, phone_index, path):
+        self.phone_index = phone_index
+        self.path = path
+    
+    def open(self, total):
+        pass
+    
+    def write(self, row):
+        index_company_row(self.phone_index, row)
+    
+    def close(self):
+        self.phone_index.save(self.path)
+
+# ===============================================
+# Pipeline
+# ===============================================
+
+def run_pipeline(companies, sinks, slugs=None, fuzzy_dedup=False, dedup_report=None, sort_buffer=None):
+    """
+    Deduplicate, categorize and write companies to the sinks.
+    
+    Deduplication sorts the companies, so the parsed companies are
+    collected before the first row is written (in memory, or in sorted
+    runs on disk with sort_buffer); the rows themselves are built,
+    categorized and written one at a time.
+    
+    Args:
+        companies: Iterable of parsed CompanyRecords
+        sinks: Sink objects (open/write/close)
+        slugs: SlugAllocator preloaded with existing slugs (optional)
+        fuzzy_dedup: Also merge near-duplicate companies
+        dedup_report: CSV audit of the merged clusters with fuzzy_dedup
+        sort_buffer: Dedup and sort on disk, sort_buffer records at a time (optional)
+    
+    Returns:
+        dict: categoryId -> number of companies
+    """
+    sorted_companies = deduplicate_companies(companies if sort_buffer else list(companies), sort_buffer)
+    unique_companies = sorted_companies
+    try:
+        if fuzzy_dedup:
+            from dedup_companies import find_duplicate_clusters, merge_duplicates, write_cluster_report
+            
+            with METRICS.stage('fuzzy_dedup'):
+                clusters, matches, dedup_stats = find_duplicate_clusters(unique_companies)
+                if dedup_report:
+                    write_cluster_report(unique_companies, clusters, matches, dedup_report, dedup_stats['skipped'])
+                unique_companies = merge_duplicates(unique_companies, clusters)
+            METRICS.count('fuzzy_dedup.split_blocks', dedup_stats['split_blocks'])
+            METRICS.count('fuzzy_dedup.skipped_blocks', dedup_stats['skipped_blocks'])
+            METRICS.count('fuzzy_dedup.skipped_records', dedup_stats['skipped_records'])
+            print(f"Near-duplicate detection: {len(clusters)} clusters merged")
+            if dedup_stats['skipped_blocks']:
+                print(f"Blocks too large to compare: {dedup_stats['skipped_blocks']} "
+                      f"({dedup_stats['skipped_records']} companies, listed in the cluster report)")
+        
+        stats = {cat_id: 0 for cat_id in range(1, 7)}
+        for sink in sinks:
+            sink.open(len(unique_companies))
+        try:
+            fan_out(iter_categorized_rows(unique_companies, slugs, stats), sinks)
+        finally:
+            for sink in sinks:
+                sink.close()
+        return stats
+    finally:
+        if isinstance(sorted_companies, ExternalSortedCompanies):
+            # Delete the sorted runs now rather than at garbage collection
+            sorted_companies.close()
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Extract, categorize and export the companies of the PDF files in one pass."
+    )
+    parser.add_argument('--pdf-dir', default='.', help="Directory of the PDF files (default: .)")
+    parser.add_argument('--sql', metavar='FILE', help="Categorized SQL file to write")
+    parser.add_argument('--csv', metavar='FILE', help="CSV file to write")
+    parser.add_argument('--jsonl', metavar='FILE', help="JSON lines file to write")
+    parser.add_argument('--records', metavar='FILE', help="Compressed columnar record file to write")
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of worker processes (default: 1, serial extraction)"
+    )
+    parser.add_argument(
+        '--pages-per-task', type=int, default=PAGES_PER_TASK,
+        help=f"Pages per worker task when --workers > 1 (default: {PAGES_PER_TASK})"
+    )
+    parser.add_argument(
+        '--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+        help=f"Text extraction backend (default: {DEFAULT_BACKEND}; pdfium requires pypdfium2)"
+    )
+    parser.add_argument(
+        '--layout', action='store_true',
+        help="Reassemble the table rows whose cells wrap on several lines"
+    )
+    parser.add_argument(
+        '--geometry', action='store_true',
+        help="Parse the tables from the positions of the text: columns are detected "
+             "once per page and fields assigned by column instead of by keywords"
+    )
+    parser.add_argument(
+        '--cache-dir', default=CACHE_DIR,
+        help=f"Cache of parsed records keyed by PDF content (default: {CACHE_DIR})"
+    )
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not update the cache")
+    parser.add_argument(
+        '--fuzzy-dedup', action='store_true',
+        help="Also merge near-duplicate companies (accents, OCR spacing, same phone)"
+    )
+    parser.add_argument(
+        '--dedup-report', default='duplicate_clusters.csv', metavar='FILE',
+        help="CSV audit of the merged clusters with --fuzzy-dedup (default: duplicate_clusters.csv)"
+    )
+    parser.add_argument(
+        '--external-sort', type=int, nargs='?', const=SORT_BUFFER_RECORDS, metavar='RECORDS',
+        help="Dedup and sort on disk, holding at most RECORDS companies in memory "
+             f"(default: {SORT_BUFFER_RECORDS}), for directories larger than RAM"
+    )
+    parser.add_argument(
+        '--normalize-phones', action='store_true',
+        help="Rewrite the phone numbers in canonical E.164 form (+221...)"
+    )
+    parser.add_argument(
+        '--phone-index', metavar='FILE',
+        help="Phone -> company index (JSON) updated with the companies written; companies it "
+             "already knows under another name (other file, earlier import) are merged into them"
+    )
+    parser.add_argument(
+        '--geocode', nargs='?', const=DEFAULT_GAZETTEER, metavar='GAZETTEER',
+        help="Also insert a primary \"CompanyLocation\" for each company in the SQL file, located "
+             f"with an offline gazetteer CSV (default: {os.path.basename(DEFAULT_GAZETTEER)})"
+    )
+    parser.add_argument(
+        '--slug-snapshot', metavar='FILE',
+        help="CSV of slugs (slug[,name,ville]) already in the database, to avoid slug collisions"
+    )
+    add_rules_arguments(parser)
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+    if not (args.sql or args.csv or args.jsonl or args.records):
+        args.sql = 'companies_from_pdfs.sql'
+    return args
+
+def run(args):
+    """Run the pipeline with the parsed command line arguments"""
+    pdfs = sorted(os.path.join(args.pdf_dir, f) for f in os.listdir(args.pdf_dir) if f.endswith('.pdf'))
+    if not pdfs:
+        print(f"Error: No PDF files found in '{args.pdf_dir}'.")
+        sys.exit(1)
+    if not backend_available(args.backend):
+        print(f"Error: --backend {args.backend} requires pypdfium2 (pip install pypdfium2)")
+        sys.exit(1)
+    if args.geometry and args.layout:
+        print("Error: --geometry reassembles the table rows itself and cannot be used with --layout.")
+        sys.exit(1)
+    if args.external_sort and args.fuzzy_dedup:
+        print("Error: --fuzzy-dedup compares all companies in memory and cannot be used with --external-sort.")
+        sys.exit(1)
+    if args.geocode and not args.sql:
+        print("Error: --geocode writes the locations to the SQL file and requires --sql.")
+        sys.exit(1)
+    print(f"Processing {len(pdfs)} PDF files...")
+    
+    geocoder = load_gazetteer(args.geocode) if args.geocode else None
+    sinks = []
+    if args.sql:
+        sinks.append(SqlSink(args.sql, geocoder))
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.jsonl:
+        sinks.append(JsonLinesSink(args.jsonl))
+    if args.records:
+        sinks.append(RecordSink(args.records))
+    phone_index = load_phone_index(args.phone_index) if args.phone_index else None
+    output_paths = ', '.join(sink.path for sink in sinks)
+    if phone_index is not None:
+        sinks.append(PhoneIndexSink(phone_index, args.phone_index))
+    
+    load_rules(args)
+    slugs = SlugAllocator.from_file(args.slug_snapshot) if args.slug_snapshot else None
+    companies = iter_pdf_companies(pdfs, args.workers, args.pages_per_task,
+                                   None if args.no_cache else args.cache_dir, CACHE_MAX_BYTES,
+                                   args.backend, args.layout, args.geometry)
+    if args.normalize_phones:
+        companies = normalize_company_phones(companies)
+    indexed_variants = []
+    if phone_index is not None:
+        from dedup_companies import skip_indexed_variants
+        
+        companies = skip_indexed_variants(companies, phone_index, indexed_variants)
+    stats = run_pipeline(companies, sinks, slugs, args.fuzzy_dedup, args.dedup_report, args.external_sort)
+    
+    print_category_stats(stats, output_paths)
+    if phone_index is not None:
+        METRICS.count('phone_index.merged', len(indexed_variants))
+        print(f"Phone index: {len(phone_index)} numbers ({args.phone_index}), "
+              f"{len(indexed_variants)} companies merged into indexed companies")
+    if geocoder is not None:
+        print_geocode_counts()
+    strategies = strategy_counts()
+    if strategies:
+        print("Lines resolved by strategy: " + ', '.join(f"{name} {count}" for name, count in strategies.items()))
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    with run_report('company_pipeline', args.report, args.profile):
+        run(args)
+
+if __name__ == '__main__':
+    main()
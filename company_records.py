@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Compressed columnar record file for the companies handed between stages.
+
+The extractor writes the companies once; the categorizer and the exporter
+read them back without parsing SQL, and SQL or CSV are only written as
+final outputs:
+
+    with RecordWriter('companies.records') as writer:
+        writer.write({'name': ..., 'slug': ..., ..., 'categoryId': 1})
+
+    with RecordReader('companies.records') as reader:
+        for name, activite in reader.iter_rows(['name', 'activite']):
+            ...
+
+Rows are stored in row groups of ROW_GROUP_ROWS rows. Within a row group
+each column is one zlib-compressed block, so a reader decompresses only
+the columns it asks for (column projection), and a column can be replaced
+while the other blocks are copied as-is. Values are the ones stored in
+the database (not SQL-escaped).
+
+Layout (integers little endian):
+
+    MAGIC
+    column blocks, row group after row group
+    footer: JSON {"version", "columns": [[name, type]...], "rows",
+                  "row_groups": [{"rows", "blocks": {column: [offset, size]}}]}
+    footer size (8 bytes) + MAGIC
+
+A text block holds the length in characters of each value (4 bytes each)
+followed by the UTF-8 text of all values; an integer block holds 8 bytes
+per value. The file is memory-mapped when read.
+"""
+
+import json
+import mmap
+import struct
+import zlib
+
+MAGIC = b'ECWREC1\n'
+RECORD_FILE_VERSION = 1
+
+# Suffix of the output paths written as record files instead of SQL
+RECORD_FILE_SUFFIX = '.records'
+
+# Columns of the Company rows, with their type
+COLUMNS = [
+    ('name', 'str'),
+    ('slug', 'str'),
+    ('description', 'str'),
+    ('ville', 'str'),
+    ('adresse', 'str'),
+    ('tel', 'str'),
+    ('activite', 'str'),
+    ('categoryId', 'int'),
+]
+
+# Rows per row group (unit of compression and of column projection)
+ROW_GROUP_ROWS = 10000
+
+# zlib compression level of the blocks
+COMPRESSION_LEVEL = 6
+
+_FOOTER_SIZE = struct.Struct('<Q')
+
+def encode_block(values, kind):
+    """Return the compressed block of one column of a row group"""
+    if kind == 'int':
+        data = struct.pack(f'<{len(values)}q', *values)
+    else:
+        data = struct.pack(f'<{len(values)}I', *map(len, values)) + ''.join(values).encode('utf-8')
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+def decode_block(block, rows, kind):
+    """Return the values of a compressed column block of `rows` rows"""
+    data = zlib.decompress(block)
+    if kind == 'int':
+        return list(struct.unpack_from(f'<{rows}q', data))
+    lengths = struct.unpack_from(f'<{rows}I', data)
+    text = data[4 * rows:].decode('utf-8')
+    values = []
+    start = 0
+    for length in lengths:
+        values.append(text[start:start + length])
+        start += length
+    return values
+
+def is_record_file(path):
+    """Return True if path is a record file (checked on its first bytes)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+class RecordWriter:
+    """Writes rows to a record file, one row group at a time"""
+    
+    def __init__(self, path, columns=COLUMNS, row_group_rows=ROW_GROUP_ROWS):
+        self.path = path
+        self.columns = list(columns)
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self._row_groups = []
+        self._buffer = {name: [] for name, _ in self.columns}
+        self._buffered = 0
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+    
+    def write(self, row):
+        """Add a row (dict with a value for every column)"""
+        for name, values in self._buffer.items():
+            values.append(row[name])
+        self._buffered += 1
+        if self._buffered == self.row_group_rows:
+            self.flush()
+    
+    def write_row_group(self, rows, columns):
+        """
+        Add a whole row group.
+        
+        Args:
+            rows: Number of rows of the group
+            columns: column -> list of values, or compressed block as
+                returned by RecordReader.raw_block() (copied as-is)
+        """
+        self.flush()
+        blocks = {}
+        for name, kind in self.columns:
+            block = columns[name]
+            if not isinstance(block, (bytes, bytearray, memoryview)):
+                block = encode_block(block, kind)
+            blocks[name] = [self._file.tell(), len(block)]
+            self._file.write(block)
+        self._row_groups.append({'rows': rows, 'blocks': blocks})
+        self.rows += rows
+    
+    def flush(self):
+        """Write the buffered rows as a row group"""
+        if self._buffered:
+            buffered, columns = self._buffered, self._buffer
+            self._buffer = {name: [] for name, _ in self.columns}
+            self._buffered = 0
+            self.write_row_group(buffered, columns)
+    
+    def close(self):
+        """Write the last row group and the footer"""
+        if self._file.closed:
+            return
+        self.flush()
+        footer = json.dumps({
+            'version': RECORD_FILE_VERSION,
+            'columns': self.columns,
+            'rows': self.rows,
+            'row_groups': self._row_groups,
+        }).encode('utf-8')
+        self._file.write(footer)
+        self._file.write(_FOOTER_SIZE.pack(len(footer)) + MAGIC)
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class RecordReader:
+    """Reads the columns of a record file"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            trailer_size = _FOOTER_SIZE.size + len(MAGIC)
+            if (len(self._map) < len(MAGIC) + trailer_size or self._map[:len(MAGIC)] != MAGIC
+                    or self._map[-len(MAGIC):] != MAGIC):
+                raise ValueError(f"{path} is not a record file")
+            footer_size, = _FOOTER_SIZE.unpack_from(self._map, len(self._map) - trailer_size)
+            footer_start = len(self._map) - trailer_size - footer_size
+            footer = json.loads(self._map[footer_start:footer_start + footer_size])
+        except Exception:
+            self.close()
+            raise
+        if footer.get('version') != RECORD_FILE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {RECORD_FILE_VERSION} record file")
+        self.columns = [tuple(column) for column in footer['columns']]
+        self.row_groups = footer['row_groups']
+        self.rows = footer['rows']
+        self._kinds = dict(self.columns)
+    
+    def raw_block(self, group, column):
+        """Return the compressed block of a column in row group number `group`"""
+        offset, size = self.row_groups[group]['blocks'][column]
+        return self._map[offset:offset + size]
+    
+    def read_column(self, group, column):
+        """Return the values of a column in row group number `group`"""
+        return decode_block(self.raw_block(group, column), self.row_groups[group]['rows'], self._kinds[column])
+    
+    def iter_row_groups(self, columns=None):
+        """
+        Read the row groups, decompressing only the requested columns.
+        
+        Args:
+            columns: Column names (default: all columns)
+        
+        Yields:
+            dict: column -> list of values, for each row group
+        """
+        columns = columns or [name for name, _ in self.columns]
+        for name in columns:
+            if name not in self._kinds:
+                raise KeyError(f"{self.path} has no column {name!r}")
+        for group in range(len(self.row_groups)):
+            yield {name: self.read_column(group, name) for name in columns}
+    
+    def iter_rows(self, columns=None):
+        """Yield the rows as tuples of the requested columns (default: all columns)"""
+        columns = columns or [name for name, _ in self.columns]
+        for values in self.iter_row_groups(columns):
+            yield from zip(*(values[name] for name in columns))
+    
+    def __len__(self):
+        return self.rows
+    
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
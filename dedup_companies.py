@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Fuzzy near-duplicate detection for extracted companies.
+
+Exact deduplication on (name, ville) misses variants such as
+"SOCIETE GENERALE SENEGAL", "Société Générale Sénégal" or OCR-spaced
+"S OCIETE GENERALE". This module finds them without comparing every pair:
+
+1. Blocking: records are grouped by normalized name, by canonical phone
+   number (see phone_numbers.py) and by MinHash/LSH bands of the
+   character trigrams of the normalized name.
+2. Scoring: only records sharing a block are compared, with the Jaccard
+   similarity of their trigram sets.
+3. Clustering: matching pairs are merged with union-find into clusters
+   that are written to an audit CSV before duplicates are dropped.
+
+Each record is hashed into a fixed number of blocks, and pairs are scored
+block by block without being kept, so the work and the memory grow
+linearly with the number of records. Oversized blocks (common names,
+shared switchboards) are split by ville and by further MinHash bands until
+their parts are small enough; a block that cannot be split is skipped,
+counted and listed in the audit CSV.
+"""
+
+import csv
+import random
+import re
+import unicodedata
+import zlib
+
+from phone_numbers import normalize_phone
+
+# Trigram shingles and MinHash/LSH parameters (8 bands x 3 rows: pairs above
+# ~0.5 Jaccard similarity are very likely to share at least one band)
+NGRAM_SIZE = 3
+LSH_BANDS = 8
+LSH_ROWS = 3
+NUM_HASHES = LSH_BANDS * LSH_ROWS
+
+# Minimum trigram similarity to merge two companies
+SIMILARITY_THRESHOLD = 0.7
+# Lower threshold when both companies have the same phone number
+PHONE_SIMILARITY_THRESHOLD = 0.4
+
+# Blocks larger than this are split before being expanded into pairs (common names, shared switchboards)
+MAX_BLOCK_SIZE = 50
+
+# Legal forms ignored when comparing names
+LEGAL_FORMS = {'sa', 'sarl', 'suarl', 'sas', 'sasu', 'gie', 'snc', 'ets', 'ste', 'cie'}
+
+# Fixed seeds so that the hash functions are the same on every run
+_MASKS = [random.Random(seed).getrandbits(32) for seed in range(NUM_HASHES)]
+
+def normalize_name(name):
+    """
+    Normalize a company name for comparison.
+    
+    Accents and case are removed, punctuation becomes spaces, runs of
+    single letters left by OCR spacing ("S O C I E T E") are joined back
+    and legal forms are dropped.
+    
+    Args:
+        name: Company name
+    
+    Returns:
+        str: Normalized name (space-separated tokens)
+    """
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii').lower()
+    tokens = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    
+    merged = []
+    letters = ''
+    for token in tokens:
+        if len(token) == 1 and token.isalpha():
+            letters += token
+            continue
+        if letters:
+            merged.append(letters)
+            letters = ''
+        merged.append(token)
+    if letters:
+        merged.append(letters)
+    
+    return ' '.join(token for token in merged if token not in LEGAL_FORMS)
+
+def shingles(normalized):
+    """Return the set of character trigrams of a normalized name, ignoring spaces"""
+    text = normalized.replace(' ', '')
+    if len(text) <= NGRAM_SIZE:
+        return {text} if text else set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def minhash(shingle_set):
+    """
+    Compute the MinHash signature of a set of shingles.
+    
+    Each hash function is CRC32 of the shingle XORed with a fixed mask.
+    
+    Returns:
+        tuple: NUM_HASHES minimum hash values
+    """
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set]
+    return tuple(min(h ^ mask for h in hashes) for mask in _MASKS)
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class _UnionFind:
+    """Disjoint sets over record indices"""
+    
+    def __init__(self, size):
+        self.parent = list(range(size))
+    
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+    
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # The smallest index stays the root, so clusters are stable
+            if b < a:
+                a, b = b, a
+            self.parent[b] = a
+
+def _features(company):
+    """Return (normalized name, trigram set, canonical phone, ville, MinHash signature) of a company"""
+    normalized = normalize_name(company.get('name'))
+    shingle_set = shingles(normalized)
+    return (normalized, shingle_set, normalize_phone(company.get('tel')),
+            (company.get('ville') or '').lower(), minhash(shingle_set) if shingle_set else None)
+
+def _band(signature, band):
+    return signature[band * LSH_ROWS:(band + 1) * LSH_ROWS] if signature else None
+
+def _blocks(features):
+    """Group record indices by blocking key"""
+    blocks = {}
+    for index, (normalized, _, phone, ville, signature) in enumerate(features):
+        keys = [('name', ville, normalized)]
+        if phone:
+            keys.append(('phone', phone))
+        if signature:
+            for band in range(LSH_BANDS):
+                keys.append(('lsh', ville, band, _band(signature, band)))
+        for key in keys:
+            blocks.setdefault(key, []).append(index)
+    return blocks
+
+def _split_block(key, members, features):
+    """
+    Split an oversized block into parts of at most MAX_BLOCK_SIZE records.
+    
+    Phone blocks are split by ville, then by MinHash band; LSH blocks by
+    the bands after their own, so the records of a part share more of
+    their signature. Name blocks are not split (see find_duplicate_clusters).
+    
+    Returns:
+        tuple: (parts, oversized) lists of member lists; oversized parts
+        could not be split further
+    """
+    if key[0] == 'phone':
+        refinements = [lambda index: features[index][3]]
+        refinements += [lambda index, band=band: _band(features[index][4], band) for band in range(LSH_BANDS)]
+    else:
+        refinements = [lambda index, band=band: _band(features[index][4], band)
+                       for band in [*range(key[2] + 1, LSH_BANDS), *range(key[2])]]
+    
+    parts, oversized = [], []
+    pending = [(members, 0)]
+    while pending:
+        members, level = pending.pop()
+        if len(members) <= MAX_BLOCK_SIZE:
+            if len(members) > 1:
+                parts.append(members)
+        elif level == len(refinements):
+            oversized.append(members)
+        else:
+            groups = {}
+            for index in members:
+                groups.setdefault(refinements[level](index), []).append(index)
+            pending.extend((group, level + 1) for group in groups.values())
+    parts.sort(key=lambda part: part[0])
+    return parts, oversized
+
+def find_duplicate_clusters(companies):
+    """
+    Find clusters of near-duplicate companies.
+    
+    Two companies match when they are in the same city and their names
+    have a trigram similarity of at least SIMILARITY_THRESHOLD, or when
+    they share a phone number and a similarity of at least
+    PHONE_SIMILARITY_THRESHOLD.
+    
+    Pairs are scored within their block and only the matches are kept; a
+    pair sharing several blocks is scored again in each one until it
+    matches. Companies with the same normalized name and city have a
+    similarity of 1 and are merged without being paired, however many
+    they are.
+    
+    Args:
+        companies: List of company dictionaries (name, ville, tel...)
+    
+    Returns:
+        tuple: (clusters, matches, stats) where clusters is a list of
+        sorted index lists with at least two records, matches maps each
+        merged index to (index it matched, score, reason), and stats
+        counts candidate pairs, matches, split blocks and skipped blocks
+        and records; stats['skipped'] lists (block kind, member indices)
+        of the blocks that could not be split.
+    """
+    features = [_features(company) for company in companies]
+    
+    union_find = _UnionFind(len(companies))
+    matches = {}
+    skipped_records = set()
+    stats = {'candidate_pairs': 0, 'matches': 0, 'split_blocks': 0, 'skipped_blocks': 0,
+             'skipped_records': 0, 'skipped': []}
+    
+    blocks = _blocks(features)
+    # Same normalized name and city: chained first, so that the other
+    # blocks of these companies find them already merged
+    for key, members in blocks.items():
+        if key[0] == 'name' and len(members) > 1 and features[members[0]][1]:
+            first = members[0]
+            for b in members[1:]:
+                stats['matches'] += 1
+                union_find.union(first, b)
+                matches.setdefault(b, (first, 1.0, 'name'))
+    
+    for key, members in blocks.items():
+        if len(members) < 2 or key[0] == 'name':
+            continue
+        
+        parts = [members]
+        if len(members) > MAX_BLOCK_SIZE:
+            stats['split_blocks'] += 1
+            parts, oversized = _split_block(key, members, features)
+            for part in oversized:
+                root = union_find.find(part[0])
+                if all(union_find.find(index) == root for index in part):
+                    continue  # Already one cluster (same name and city)
+                stats['skipped_blocks'] += 1
+                stats['skipped'].append((key[0], part))
+                skipped_records.update(part)
+        
+        by_phone = key[0] == 'phone'
+        threshold = PHONE_SIMILARITY_THRESHOLD if by_phone else SIMILARITY_THRESHOLD
+        reason = 'phone' if by_phone else 'similar name'
+        for part in parts:
+            for position, a in enumerate(part):
+                for b in part[position + 1:]:
+                    if union_find.find(a) == union_find.find(b):
+                        continue
+                    score = jaccard(features[a][1], features[b][1])
+                    stats['candidate_pairs'] += 1
+                    if score < threshold:
+                        continue
+                    stats['matches'] += 1
+                    union_find.union(a, b)
+                    matches.setdefault(b, (a, score, reason))
+    
+    stats['skipped_records'] = len(skipped_records)
+    groups = {}
+    for index in range(len(companies)):
+        groups.setdefault(union_find.find(index), []).append(index)
+    clusters = [members for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: members[0])
+    return clusters, matches, stats
+
+def _completeness(company):
+    """Number of filled fields, used to pick the record kept in a cluster"""
+    return sum(1 for field in ('activite', 'adresse', 'tel') if company.get(field))
+
+def choose_canonical(companies, members):
+    """Return the index kept for a cluster: the most complete, then the first one"""
+    return min(members, key=lambda index: (-_completeness(companies[index]), index))
+
+def merge_duplicates(companies, clusters):
+    """
+    Drop near-duplicates, keeping one record per cluster.
+    
+    Args:
+        companies: List of company dictionaries
+        clusters: Clusters returned by find_duplicate_clusters()
+    
+    Returns:
+        list: Companies without duplicates, in input order
+    """
+    dropped = set()
+    for members in clusters:
+        keep = choose_canonical(companies, members)
+        dropped.update(index for index in members if index != keep)
+    return [company for index, company in enumerate(companies) if index not in dropped]
+
+def _company_key(name, ville):
+    """Identity of a company in a phone index: normalized name and ville"""
+    return normalize_name(name), normalize_name(ville)
+
+def indexed_company_keys(index):
+    """Return the identities of all the companies listed in a PhoneIndex"""
+    return {_company_key(name, ville) for name, ville in index.companies.values()}
+
+def find_indexed_variant(company, index, indexed_keys=None):
+    """
+    Find the company a phone index knows under another name.
+    
+    A company whose phone number is indexed for a company with another
+    name or city, and whose name has a similarity of at least
+    PHONE_SIMILARITY_THRESHOLD with it, is a variant of that company
+    (printed in another file or loaded by an earlier import). A company
+    the index already lists under its own name and city, with this number,
+    another one or none, is that company and has no variant, so that
+    running an import again gives the same rows.
+    
+    Args:
+        company: Company dictionary (name, ville, tel...)
+        index: PhoneIndex (see phone_numbers.py)
+        indexed_keys: indexed_company_keys(index), when looking up many companies
+    
+    Returns:
+        dict: Indexed company (slug, name, ville), or None
+    """
+    known = index.lookup(company.get('tel'))
+    if not known:
+        return None
+    key = _company_key(company.get('name'), company.get('ville'))
+    if indexed_keys is None:
+        indexed_keys = indexed_company_keys(index)
+    if key in indexed_keys or any(_company_key(entry['name'], entry['ville']) == key for entry in known):
+        return None
+    normalized = key[0]
+    shingle_set = shingles(normalized)
+    for entry in known:
+        if jaccard(shingle_set, shingles(normalize_name(entry['name']))) >= PHONE_SIMILARITY_THRESHOLD:
+            return entry
+    return None
+
+def skip_indexed_variants(companies, index, merged=None):
+    """
+    Drop the variants of indexed companies from a stream of companies.
+    
+    Args:
+        companies: Iterable of company dictionaries
+        index: PhoneIndex (see phone_numbers.py)
+        merged: List receiving (company, indexed company) for each company dropped (optional)
+    
+    Yields:
+        Companies that are not variants of an indexed company, in input order
+    """
+    indexed_keys = indexed_company_keys(index)
+    for company in companies:
+        entry = find_indexed_variant(company, index, indexed_keys)
+        if entry is None:
+            yield company
+        elif merged is not None:
+            merged.append((company, entry))
+
+def write_cluster_report(companies, clusters, matches, output_file, skipped=()):
+    """
+    Write the duplicate clusters to a CSV file for auditing.
+    
+    One line per record of each cluster, with the record it matched, the
+    similarity score and whether it is kept. The records of the blocks
+    that were too large to compare follow, with cluster 'skipped-N' and
+    the kind of block as reason.
+    
+    Args:
+        companies: List of company dictionaries
+        clusters: Clusters returned by find_duplicate_clusters()
+        matches: Matches returned by find_duplicate_clusters()
+        output_file: Path to the CSV file
+        skipped: stats['skipped'] returned by find_duplicate_clusters()
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['cluster', 'record', 'kept', 'ville', 'name', 'tel',
+                         'matched_record', 'score', 'reason'])
+        for cluster_id, members in enumerate(clusters, 1):
+            keep = choose_canonical(companies, members)
+            for index in members:
+                company = companies[index]
+                matched, score, reason = matches.get(index, ('', '', ''))
+                writer.writerow([
+                    cluster_id, index, 'yes' if index == keep else 'no',
+                    company.get('ville', ''), company.get('name', ''), company.get('tel', ''),
+                    matched, f"{score:.2f}" if score != '' else '', reason,
+                ])
+        for block_id, (kind, members) in enumerate(skipped, 1):
+            for index in members:
+                company = companies[index]
+                writer.writerow([
+                    f"skipped-{block_id}", index, '', company.get('ville', ''), company.get('name', ''),
+                    company.get('tel', ''), '', '', f"{kind} block too large",
+                ])
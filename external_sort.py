@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+External merge sort for record streams larger than RAM.
+
+Records (plain tuples) are buffered up to a fixed count, sorted and
+spilled to temporary run files, then read back in one k-way merge:
+
+    runs = spill_sorted_runs(records, buffer_size, work_dir)
+    runs = reduce_runs(runs, work_dir)
+    for record in merge_runs(runs):
+        ...
+
+At most buffer_size records are in memory while spilling, plus one
+chunk of RUN_CHUNK records per run file while merging. When there are
+more than MERGE_FAN_IN runs, groups of runs are first merged into
+larger runs so that the number of open files stays bounded.
+"""
+
+import heapq
+import os
+import pickle
+import tempfile
+
+# Records kept in memory before a sorted run is spilled to disk
+SORT_BUFFER_RECORDS = 100000
+
+# Maximum number of run files merged (and open) at once
+MERGE_FAN_IN = 64
+
+# Records per pickle frame of a run file
+RUN_CHUNK = 1000
+
+def write_run(records, work_dir):
+    """
+    Write records to a new run file.
+    
+    Args:
+        records: Iterable of picklable records, already in run order
+        work_dir: Directory of the run files
+    
+    Returns:
+        tuple: (path of the run file, number of records written)
+    """
+    fd, path = tempfile.mkstemp(suffix='.run', dir=work_dir)
+    count = 0
+    with os.fdopen(fd, 'wb') as file:
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == RUN_CHUNK:
+                pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+            count += len(chunk)
+    return path, count
+
+def read_run(path):
+    """Yield the records of a run file, one chunk in memory at a time"""
+    with open(path, 'rb') as file:
+        while True:
+            try:
+                chunk = pickle.load(file)
+            except EOFError:
+                return
+            yield from chunk
+
+def spill_sorted_runs(records, buffer_size=SORT_BUFFER_RECORDS, work_dir=None, key=None):
+    """
+    Sort records in memory-bounded runs written to disk.
+    
+    Args:
+        records: Iterable of records
+        buffer_size: Records sorted in memory per run
+        work_dir: Directory of the run files (default: system temp directory)
+        key: Sort key (default: the records themselves)
+    
+    Returns:
+        list: Paths of the sorted run files
+    """
+    runs = []
+    buffer = []
+    for record in records:
+        buffer.append(record)
+        if len(buffer) >= buffer_size:
+            buffer.sort(key=key)
+            runs.append(write_run(buffer, work_dir)[0])
+            buffer = []
+    if buffer or not runs:
+        buffer.sort(key=key)
+        runs.append(write_run(buffer, work_dir)[0])
+    return runs
+
+def merge_runs(runs, key=None):
+    """
+    Merge sorted run files into one sorted stream.
+    
+    Records comparing equal come out in the order of their runs, so runs
+    spilled from a stream in order give a stable sort.
+    
+    Args:
+        runs: Paths of sorted run files (at most MERGE_FAN_IN, see reduce_runs)
+        key: Sort key the runs were sorted with
+    
+    Yields:
+        Records in sorted order
+    """
+    yield from heapq.merge(*(read_run(path) for path in runs), key=key)
+
+def reduce_runs(runs, work_dir=None, key=None, fan_in=MERGE_FAN_IN, remove=True):
+    """
+    Merge groups of runs until at most `fan_in` runs are left.
+    
+    Args:
+        runs: Paths of sorted run files
+        work_dir: Directory of the merged run files
+        key: Sort key the runs were sorted with
+        fan_in: Maximum number of runs merged at once
+        remove: Delete the runs once they are merged
+    
+    Returns:
+        list: Paths of the remaining sorted run files, in run order
+    """
+    while len(runs) > fan_in:
+        merged = []
+        for start in range(0, len(runs), fan_in):
+            group = runs[start:start + fan_in]
+            merged.append(write_run(merge_runs(group, key), work_dir)[0])
+            if remove:
+                for path in group:
+                    os.remove(path)
+        runs = merged
+    return runs
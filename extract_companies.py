@@ -1,71 +1,147 @@
+import argparse
 import re
 import csv
 from datetime import datetime
 
-def extract_company_data_from_sql(sql_content):
-    """Extrait les données des commandes INSERT du fichier SQL"""
+from company_records import RecordReader, is_record_file
+from pipeline_metrics import METRICS, add_report_arguments, run_report
+
+# Nombre de lignes écrites d'un coup dans le CSV en mode streaming
+CSV_CHUNK_SIZE = 1000
+
+# Début d'une commande INSERT INTO "Company" (...) VALUES
+INSERT_PATTERN = re.compile(r'INSERT\s+INTO\s+"Company"\s*\(([^)]+)\)\s*VALUES', re.IGNORECASE)
+
+# Lexèmes SQL d'un bloc VALUES
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|--[^\n]*|/\*.*?\*/)               # espaces et commentaires
+  | (?P<string>'(?:[^']|'')*')                      # 'texte', avec '' pour une apostrophe
+  | (?P<number>[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<call>[A-Za-z_][\w.]*\s*\()                 # début d'appel de fonction : NOW(
+  | (?P<word>[A-Za-z_][\w.]*|"(?:[^"]|"")*")        # NULL, TRUE, ON, identifiants...
+  | (?P<punct>[(),;])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+def tokenize_sql(sql_content, pos=0):
+    """
+    Découpe le contenu SQL en lexèmes à partir de la position donnée.
     
-    # Expression régulière pour capturer les valeurs entre parenthèses après INSERT
-    insert_pattern = r'INSERT INTO "Company" \(([^)]+)\) VALUES\s*((?:\([^)]+\)(?:,\s*)?)+)'
+    Générateur paresseux : le découpage s'arrête dès que l'appelant
+    cesse de consommer les lexèmes. Les espaces et commentaires sont ignorés.
     
-    # Trouver toutes les commandes INSERT
-    inserts = re.findall(insert_pattern, sql_content, re.IGNORECASE | re.DOTALL)
+    Yields:
+        re.Match: un lexème ; match.lastgroup donne son type
+    """
+    for match in TOKEN_PATTERN.finditer(sql_content, pos):
+        if match.lastgroup != 'space':
+            yield match
+
+def _parse_values(sql_content, tokens, columns):
+    """
+    Lit la liste de lignes d'un bloc VALUES.
     
-    companies = []
+    Yields:
+        tuple: (colonnes, valeurs) pour chaque ligne
+        
+    Returns:
+        int: position de fin du bloc VALUES
+    """
+    state = 'row'
+    values = []
+    depth = 0
+    call_start = 0
     
-    for columns_str, values_str in inserts:
-        # Extraire les noms de colonnes
-        columns = [col.strip().strip('"') for col in columns_str.split(',')]
+    for token in tokens:
+        kind = token.lastgroup
+        text = token.group(kind)
         
-        # Nettoyer et diviser les valeurs
-        values_blocks = re.findall(r'\(([^)]+)\)', values_str)
+        if depth:
+            # Dans un appel de fonction : on garde le texte brut jusqu'à la parenthèse fermante
+            if kind == 'call' or text == '(':
+                depth += 1
+            elif text == ')':
+                depth -= 1
+                if depth == 0:
+                    values.append(sql_content[call_start:token.end()])
+                    state = 'separator'
+            continue
         
-        for block in values_blocks:
-            # Gérer les valeurs avec apostrophes dans le texte
+        if state == 'value':
+            if kind == 'string':
+                values.append(text[1:-1].replace("''", "'"))
+            elif kind == 'number':
+                values.append(text)
+            elif kind == 'word' and text.upper() == 'NULL':
+                values.append(None)
+            elif kind == 'word' and text.upper() in ('TRUE', 'FALSE'):
+                values.append(text)
+            elif kind == 'call':
+                depth = 1
+                call_start = token.start()
+                continue
+            else:
+                break
+            state = 'separator'
+        elif state == 'separator':
+            if text == ',':
+                state = 'value'
+            elif text == ')':
+                yield columns, values
+                state = 'next'
+            else:
+                break
+        elif state == 'row':
+            if text != '(':
+                break
             values = []
-            current_value = ""
-            in_quotes = False
-            escape_next = False
-            
-            for i, char in enumerate(block):
-                if escape_next:
-                    current_value += char
-                    escape_next = False
-                elif char == "'":
-                    if i + 1 < len(block) and block[i + 1] == "'":
-                        # Apostrophe échappée ('')
-                        current_value += "'"
-                        i += 1  # Saute le prochain caractère
-                    else:
-                        in_quotes = not in_quotes
-                        current_value += char
-                elif char == ',' and not in_quotes:
-                    values.append(current_value.strip())
-                    current_value = ""
-                else:
-                    current_value += char
-            
-            # Ajouter la dernière valeur
-            if current_value:
-                values.append(current_value.strip())
-            
-            # Nettoyer les valeurs
-            cleaned_values = []
-            for val in values:
-                # Supprimer les apostrophes autour des valeurs
-                if val.startswith("'") and val.endswith("'"):
-                    val = val[1:-1]
-                # Gérer les apostrophes doubles
-                val = val.replace("''", "'")
-                cleaned_values.append(val)
-            
-            # Créer un dictionnaire pour cette entreprise
-            if len(cleaned_values) >= len(columns):
-                company = {}
-                for i, col in enumerate(columns):
-                    if i < len(cleaned_values):
-                        company[col] = cleaned_values[i]
-                companies.append(company)
+            state = 'value'
+        else:
+            # Après une ligne : une virgule annonce la suivante, tout le reste termine le bloc
+            if text != ',':
+                return token.start()
+            state = 'row'
+    else:
+        if state == 'next':
+            return len(sql_content)
+        raise ValueError("Bloc VALUES incomplet en fin de fichier")
+    
+    raise ValueError(f"Lexème inattendu {text!r} à la position {token.start()}")
+
+def iter_insert_rows(sql_content):
+    """
+    Parcourt les lignes VALUES des commandes INSERT INTO "Company".
+    
+    Analyse en un seul passage (temps linéaire) : chaque littéral est
+    reconnu par une expression régulière compilée, sans recopie caractère
+    par caractère. Les apostrophes doublées, NULL, les nombres et les
+    appels de fonction comme NOW() sont gérés. Les chaînes sont renvoyées
+    sans apostrophes, NULL devient None, les nombres, booléens et appels
+    de fonction sont renvoyés tels qu'écrits dans le SQL.
+    
+    Args:
+        sql_content: Contenu SQL
+        
+    Yields:
+        tuple: (liste des colonnes, liste des valeurs) pour chaque ligne
+    """
+    pos = 0
+    while True:
+        insert = INSERT_PATTERN.search(sql_content, pos)
+        if not insert:
+            return
+        columns = [col.strip().strip('"') for col in insert.group(1).split(',')]
+        tokens = tokenize_sql(sql_content, insert.end())
+        pos = yield from _parse_values(sql_content, tokens, columns)
+
+def extract_company_data_from_sql(sql_content):
+    """Extrait les données des commandes INSERT du fichier SQL"""
+    
+    companies = []
+    for columns, values in iter_insert_rows(sql_content):
+        # Créer un dictionnaire pour cette entreprise
+        if len(values) >= len(columns):
+            companies.append(dict(zip(columns, values)))
     
     return companies
 
@@ -99,33 +175,215 @@ def save_to_csv(companies, output_file):
     print(f"Fichier CSV sauvegardé : {output_file}")
     print(f"Nombre d'entreprises exportées : {len(companies)}")
 
-def main():
-    # Lire le fichier SQL
-    sql_file = 'companies_from_pdfs.sql'
+def iter_sql_statements(lines):
+    """
+    Regroupe les lignes d'un fichier SQL en commandes complètes.
+    
+    Une commande se termine par un ';' en fin de ligne, hors chaîne de
+    caractères. Les lignes de commentaire '--' sont ignorées. Seule la
+    commande en cours est gardée en mémoire.
+    
+    Args:
+        lines: Itérable de lignes (par exemple un fichier ouvert)
+        
+    Yields:
+        str: Une commande SQL
+    """
+    buffer = []
+    in_quotes = False
+    for line in lines:
+        if not in_quotes and line.lstrip().startswith('--'):
+            continue
+        buffer.append(line)
+        if line.count("'") % 2:
+            in_quotes = not in_quotes
+        if not in_quotes and line.rstrip().endswith(';'):
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+def iter_company_rows(sql_file):
+    """
+    Lit les entreprises d'un fichier SQL au fil de la lecture.
+    
+    Args:
+        sql_file: Chemin du fichier SQL
+        
+    Yields:
+        tuple: (liste des colonnes, liste des valeurs) pour chaque entreprise
+    """
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        for statement in iter_sql_statements(f):
+            yield from iter_insert_rows(statement)
+
+def stream_sql_to_csv(sql_file, output_file, chunk_size=CSV_CHUNK_SIZE, preview_size=5):
+    """
+    Exporte les entreprises d'un fichier SQL en CSV avec une mémoire bornée.
+    
+    Les lignes sont écrites par paquets de chunk_size au fur et à mesure
+    de la lecture. L'ordre des colonnes est celui de la première commande
+    INSERT ; les commandes suivantes sont réordonnées sur cet en-tête.
+    
+    Args:
+        sql_file: Chemin du fichier SQL
+        output_file: Chemin du fichier CSV
+        chunk_size: Nombre de lignes par écriture
+        preview_size: Nombre d'entreprises renvoyées pour l'aperçu
+        
+    Returns:
+        tuple: (nombre d'entreprises exportées, aperçu des premières entreprises)
+    """
+    header = None
+    chunk = []
+    preview = []
+    count = 0
+    
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        
+        for columns, values in iter_company_rows(sql_file):
+            if header is None:
+                header = columns
+                writer.writerow(header)
+            elif columns != header:
+                row = dict(zip(columns, values))
+                values = [row.get(col) for col in header]
+            
+            if len(preview) < preview_size:
+                preview.append(dict(zip(header, values)))
+            
+            chunk.append(values)
+            count += 1
+            if len(chunk) >= chunk_size:
+                with METRICS.stage('csv.write'):
+                    writer.writerows(chunk)
+                chunk.clear()
+        
+        with METRICS.stage('csv.write'):
+            writer.writerows(chunk)
+    
+    METRICS.count('rows_emitted', count)
+    return count, preview
+
+def stream_records_to_csv(records_file, output_file, chunk_size=CSV_CHUNK_SIZE, preview_size=5):
+    """
+    Exporte en CSV les entreprises d'un fichier d'enregistrements.
+    
+    Le fichier (voir company_records.py) est lu groupe de lignes par
+    groupe de lignes, sans analyse SQL. Le CSV est le même que celui de
+    stream_sql_to_csv() sur le fichier SQL équivalent.
+    
+    Args:
+        records_file: Chemin du fichier d'enregistrements
+        output_file: Chemin du fichier CSV
+        chunk_size: Nombre de lignes par écriture
+        preview_size: Nombre d'entreprises renvoyées pour l'aperçu
+    
+    Returns:
+        tuple: (nombre d'entreprises exportées, aperçu des premières entreprises)
+    """
+    chunk = []
+    preview = []
+    count = 0
+    
+    with RecordReader(records_file) as reader, open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        header = [name for name, _ in reader.columns] + ['createdAt', 'updatedAt']
+        writer.writerow(header)
+        
+        for values in reader.iter_rows():
+            values = list(values) + ['NOW()', 'NOW()']
+            if len(preview) < preview_size:
+                preview.append(dict(zip(header, values)))
+            
+            chunk.append(values)
+            count += 1
+            if len(chunk) >= chunk_size:
+                with METRICS.stage('csv.write'):
+                    writer.writerows(chunk)
+                chunk.clear()
+        
+        with METRICS.stage('csv.write'):
+            writer.writerows(chunk)
+    
+    METRICS.count('rows_emitted', count)
+    return count, preview
+
+def print_preview(companies):
+    """Affiche un aperçu des premières entreprises"""
+    print("\nAperçu des premières entreprises :")
+    for i, company in enumerate(companies[:5]):
+        print(f"\n{i+1}. {company.get('name', 'N/A')}")
+        print(f"   Ville: {company.get('ville', 'N/A')}")
+        print(f"   Catégorie: {company.get('categoryId', 'N/A')}")
+
+def parse_args(argv=None):
+    """Analyse les arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Exporte les entreprises d'un fichier SQL en CSV.")
+    parser.add_argument(
+        '--input', default='companies_from_pdfs.sql',
+        help="Fichier SQL à lire, ou fichier d'enregistrements (extract_companies_from_pdfs.py --records)"
+    )
+    parser.add_argument('--output', help="Fichier CSV à écrire (par défaut companies_export_<date>.csv)")
+    parser.add_argument(
+        '--stream', action='store_true',
+        help="Lit et écrit au fil de l'eau, avec une mémoire bornée"
+    )
+    add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with run_report('extract_companies', args.report, args.profile):
+        run(args)
+
+def run(args):
+    """Exporte le fichier SQL en CSV selon les arguments analysés"""
+    sql_file = args.input
+    
+    # Générer le nom du fichier CSV
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = args.output or f'companies_export_{timestamp}.csv'
     
     try:
-        with open(sql_file, 'r', encoding='utf-8') as f:
+        records = is_record_file(sql_file)
+        if args.stream or records:
+            if records:
+                print("Export en continu des données depuis le fichier d'enregistrements...")
+                with METRICS.stage('stream'):
+                    count, preview = stream_records_to_csv(sql_file, output_file)
+            else:
+                print("Export en continu des données depuis le fichier SQL...")
+                with METRICS.stage('stream'):
+                    count, preview = stream_sql_to_csv(sql_file, output_file)
+            
+            if count:
+                print(f"Fichier CSV sauvegardé : {output_file}")
+                print(f"Nombre d'entreprises exportées : {count}")
+                print_preview(preview)
+            else:
+                print("Aucune donnée d'entreprise trouvée dans le fichier SQL.")
+            return
+        
+        # Lire le fichier SQL
+        with METRICS.stage('read'), open(sql_file, 'r', encoding='utf-8') as f:
             sql_content = f.read()
         
         print("Extraction des données depuis le fichier SQL...")
-        companies = extract_company_data_from_sql(sql_content)
+        with METRICS.stage('parse'):
+            companies = extract_company_data_from_sql(sql_content)
         
         if companies:
             print(f"Données extraites : {len(companies)} entreprises trouvées")
             
-            # Générer le nom du fichier CSV
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f'companies_export_{timestamp}.csv'
-            
             # Sauvegarder en CSV
-            save_to_csv(companies, output_file)
+            with METRICS.stage('csv.write'):
+                save_to_csv(companies, output_file)
+            METRICS.count('rows_emitted', len(companies))
             
             # Afficher un aperçu des données
-            print("\nAperçu des premières entreprises :")
-            for i, company in enumerate(companies[:5]):
-                print(f"\n{i+1}. {company.get('name', 'N/A')}")
-                print(f"   Ville: {company.get('ville', 'N/A')}")
-                print(f"   Catégorie: {company.get('categoryId', 'N/A')}")
+            print_preview(companies)
                 
         else:
             print("Aucune donnée d'entreprise trouvée dans le fichier SQL.")
@@ -4,13 +4,42 @@ Extract company information from PDF files and generate SQL INSERT statements.
 """
 
 import PyPDF2
+import argparse
+import bisect
+import csv
+import gzip
+import hashlib
+import inspect
+import json
 import os
 import re
+import shutil
+import sys
+import tempfile
+import time
 import unicodedata
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
 from datetime import datetime
 
+from company_records import COLUMNS as RECORD_COLUMNS, RecordWriter
+from external_sort import SORT_BUFFER_RECORDS, merge_runs, reduce_runs, spill_sorted_runs
+from gazetteer import DEFAULT_GAZETTEER, Gazetteer, print_geocode_counts
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, backend_available, backend_version, open_document
+from phone_numbers import PhoneIndex, normalize_phone, phone_type
+from pipeline_metrics import METRICS, add_report_arguments, run_report
+
 # Constants
 BATCH_SIZE = 100  # Number of companies per batch in SQL INSERT
+PAGES_PER_TASK = 8  # Number of PDF pages handled by one worker task
+CACHE_DIR = '.pdf_cache'  # On-disk cache of parsed company records
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # Size limit of the cache directory
+CHECKPOINT_FILE = '.extract_checkpoint.json'  # Progress of a resumable page-by-page extraction
+COLUMN_SHARE = 0.125  # Share of the rows in which a text run start must recur to be a column
+COLUMN_TOLERANCE = 2.0  # Distance (pt) under which text run starts belong to the same column
+LINE_TOLERANCE = 2.0  # Distance (pt) under which the runs of a cell are on the same text line
+ROW_REACH = 20.0  # Distance (pt) from the city cell beyond which a text run is outside the row (page footer)
 
 # Senegalese cities
 SENEGALESE_CITIES = [
@@ -40,6 +69,9 @@ ACTIVITY_KEYWORDS = [
     'Grossiste', 'Repartition', 'Répartition', 'Promotion',
 ]
 
+# Column labels of the table header
+TABLE_HEADER_LABELS = {'Ville', 'Entreprise', 'Activité', 'Adresse', 'Tel', 'Téléphone'}
+
 def clean_text(text):
     """Clean and normalize text
     
@@ -70,7 +102,7 @@ def create_slug(name):
         str: URL-friendly slug or 'company-{hash}' if empty after processing
     """
     if not name:
-        return f"company-{hash(name) % 10000}"
+        return f"company-{_stable_hash(name)}"
     
     # Convert to lowercase and normalize
     slug = unicodedata.normalize('NFKD', name.lower())
@@ -84,77 +116,271 @@ def create_slug(name):
     
     # Handle edge case of empty slug (only special chars)
     if not slug:
-        slug = f"company-{hash(name) % 10000}"
+        slug = f"company-{_stable_hash(name)}"
     
     # Limit length
     return slug[:100]
 
+def _stable_hash(text):
+    """Short hash of a text that is the same on every run (unlike hash())"""
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()[:8]
+
+class SlugAllocator:
+    """Allocate unique company slugs
+    
+    Every allocated or preloaded slug is kept in a set, so uniqueness checks
+    are O(1), and the next free counter of each base slug is remembered, so
+    allocating 'foo', 'foo-1', 'foo-2'... stays O(1) amortized. A generated
+    'foo-1' can never clash with a company genuinely named "Foo 1": whichever
+    comes second gets another suffix.
+    
+    Allocation only depends on the preloaded slugs and the order of the
+    companies, so the same input always gives the same slugs.
+    
+    When the preloaded snapshot also gives the name and ville of existing
+    companies, allocating a slug for one of them returns its existing slug,
+    so re-running an import does not duplicate companies under new slugs.
+    """
+    
+    def __init__(self, existing=()):
+        """
+        Args:
+            existing: Iterable of slugs, or of (slug, name, ville) tuples
+        """
+        self._taken = set()
+        self._next_suffix = {}
+        self._known = {}
+        for entry in existing:
+            if isinstance(entry, str):
+                self._taken.add(entry)
+            else:
+                slug, name, ville = entry
+                self._taken.add(slug)
+                if name is not None:
+                    self._known.setdefault(self.company_key(name, ville), slug)
+    
+    @staticmethod
+    def company_key(name, ville):
+        """Identity of a company, as used for deduplication"""
+        return ((name or '').lower(), (ville or '').lower())
+    
+    @classmethod
+    def from_file(cls, path):
+        """Preload an allocator from a slug snapshot file
+        
+        The file is a CSV with one company per line: slug, and optionally
+        name and ville. Such a file can be exported with:
+            \\copy (SELECT slug, name, ville FROM "Company") TO 'slugs.csv' CSV
+        
+        Args:
+            path: Path to the snapshot file
+            
+        Returns:
+            SlugAllocator: Allocator aware of the snapshot slugs
+        """
+        def entries():
+            with open(path, 'r', encoding='utf-8', newline='') as file:
+                for row in csv.reader(file):
+                    if not row or not row[0]:
+                        continue
+                    if len(row) >= 3:
+                        yield row[0], row[1], row[2]
+                    else:
+                        yield row[0]
+        return cls(entries())
+    
+    def __contains__(self, slug):
+        return slug in self._taken
+    
+    def __len__(self):
+        return len(self._taken)
+    
+    def allocate(self, base_slug, name=None, ville=None):
+        """Return a unique slug derived from base_slug and reserve it
+        
+        Args:
+            base_slug: Slug built by create_slug()
+            name: Company name, to reuse the slug of an already known company
+            ville: Company city
+            
+        Returns:
+            str: base_slug, or base_slug-N with the smallest free N
+        """
+        if name is not None and self._known:
+            known = self._known.get(self.company_key(name, ville))
+            if known is not None:
+                return known
+        
+        slug = base_slug
+        if slug in self._taken:
+            counter = self._next_suffix.get(base_slug, 1)
+            while f"{base_slug}-{counter}" in self._taken:
+                counter += 1
+            slug = f"{base_slug}-{counter}"
+            self._next_suffix[base_slug] = counter + 1
+        self._taken.add(slug)
+        return slug
+
+# Senegalese phone patterns: 33 XXX XX XX or 7X XXX XX XX, in order of preference
+PHONE_PATTERNS = [
+    r'\b(33\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+    r'\b(33\s*\d{7,})\s*$',
+    r'\b(7[0-8]\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+    r'\b(7[0-8]\s*\d{7,})\s*$',
+    r'\b(\d{2}\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
+    r'\b(0\s*\d{9})\s*$',
+]
+
+# Trailing run of digits and spaces: every phone match lies inside it
+PHONE_TAIL_PATTERN = re.compile(r'[\d\s]*$')
+
+# All phone patterns in one alternation, matched from the start of the
+# trailing run. Each alternative skips lazily to its own leftmost match, and
+# alternatives are tried in order, so the first pattern that matches wins
+# exactly as if the patterns were searched one after another.
+PHONE_PATTERN = re.compile('|'.join(f'[\\d\\s]*?{pattern}' for pattern in PHONE_PATTERNS))
+
+# Anchored alternation of the cities, in list order
+CITY_PATTERN = re.compile('(?:' + '|'.join(re.escape(city) for city in SENEGALESE_CITIES) + ')(?= )')
+
+def compile_keyword_pattern(keywords):
+    """Compile keywords into one case-insensitive, whole-word matcher
+    
+    Keyword i is captured by group i + 1. The alternation is wrapped in a
+    lookahead so that a scan reports every position where a keyword starts.
+    
+    Args:
+        keywords: Keywords in order of preference
+        
+    Returns:
+        re.Pattern: Compiled matcher; match.lastindex - 1 is the keyword index
+    """
+    alternatives = '|'.join(f'({re.escape(keyword)})' for keyword in keywords)
+    return re.compile(rf'(?=\b(?:{alternatives})\b)', re.IGNORECASE)
+
+ADDRESS_PATTERN = compile_keyword_pattern(ADDRESS_KEYWORDS)
+ACTIVITY_PATTERN = compile_keyword_pattern(ACTIVITY_KEYWORDS)
+TRAILING_DASH_PATTERN = re.compile(r'\s*-\s*$')
+
+def find_keyword(pattern, text):
+    """Find the start of the preferred keyword in text
+    
+    The keyword that comes first in the keyword list wins; if it occurs
+    several times, its first occurrence is returned.
+    
+    Args:
+        pattern: Matcher built by compile_keyword_pattern()
+        text: Text to search
+        
+    Returns:
+        int: Start index of the keyword, or -1 if no keyword is found
+    """
+    best_rank = None
+    best_start = -1
+    for match in pattern.finditer(text):
+        rank = match.lastindex
+        if best_rank is None or rank < best_rank:
+            best_rank = rank
+            best_start = match.start()
+            if rank == 1:
+                break
+    return best_start
+
 def extract_phone_from_end(text):
     """Extract phone number from the end of the text"""
-    # Senegalese phone patterns: 33 XXX XX XX or 7X XXX XX XX
-    patterns = [
-        r'\b(33\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
-        r'\b(33\s*\d{7,})\s*$',
-        r'\b(7[0-8]\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
-        r'\b(7[0-8]\s*\d{7,})\s*$',
-        r'\b(\d{2}\s*\d{3}\s*\d{2}\s*\d{2})\s*$',
-        r'\b(0\s*\d{9})\s*$',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    tail_start = PHONE_TAIL_PATTERN.search(text).start()
+    if tail_start < len(text):
+        match = PHONE_PATTERN.match(text, tail_start)
         if match:
-            phone = match.group(1)
-            remaining_text = text[:match.start()].strip()
+            phone = match.group(match.lastindex)
+            remaining_text = text[:match.start(match.lastindex)].strip()
             return phone, remaining_text
     
     # If no phone found, return empty and full text
     return "", text
 
+class CompanyRecord(Mapping):
+    """Compact, read-only company record
+    
+    Fields are stored in __slots__ instead of a per-record dict, and the
+    highly repeated ville and activite strings are interned, so millions
+    of records share one copy of each city and activity. Records also
+    behave as read-only mappings (company['name'], company.get('tel'),
+    dict(company)), like the dictionaries they replace.
+    """
+    
+    __slots__ = ('ville', 'name', 'activite', 'adresse', 'tel')
+    
+    def __init__(self, ville, name, activite='', adresse='', tel=''):
+        self.ville = sys.intern(ville)
+        self.name = name
+        self.activite = sys.intern(activite)
+        self.adresse = adresse
+        self.tel = tel
+    
+    @classmethod
+    def from_mapping(cls, company):
+        """Build a record from a company dictionary (or return a record as-is)"""
+        if isinstance(company, cls):
+            return company
+        return cls(company['ville'], company['name'], company['activite'], company['adresse'], company['tel'])
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self):
+        return iter(self.__slots__)
+    
+    def __len__(self):
+        return len(self.__slots__)
+    
+    def __reduce__(self):
+        # Pickled as a plain tuple of fields (worker results)
+        return (CompanyRecord, (self.ville, self.name, self.activite, self.adresse, self.tel))
+    
+    def __repr__(self):
+        return f"CompanyRecord({dict(self)!r})"
+
 def parse_company_line(line):
     """Parse a single line containing company information"""
     line = clean_text(line)
     
     if not line or len(line) < 10:
+        METRICS.count('lines_rejected.too_short')
         return None
     
     # Skip header lines
     if 'Ville' in line and 'Entreprise' in line:
+        METRICS.count('lines_rejected.header')
         return None
     
     # Check if line starts with a city
-    ville = None
-    for city in SENEGALESE_CITIES:
-        if line.startswith(city + ' '):
-            ville = city
-            line = line[len(city):].strip()
-            break
-    
-    if not ville:
+    city_match = CITY_PATTERN.match(line)
+    if not city_match:
+        METRICS.count('lines_rejected.no_city')
         return None
+    ville = city_match.group()
+    line = line[city_match.end():].strip()
     
     # Extract phone from the end
     tel, remaining = extract_phone_from_end(line)
     
     if not remaining:
+        METRICS.count('lines_rejected.no_company_text')
         return None
     
     # Now we have: "Entreprise Activité Adresse" in remaining
     # Strategy: Split by known address/activity keywords
     
     # Try to find address start
-    address_start_idx = -1
-    for keyword in ADDRESS_KEYWORDS:
-        # Case insensitive search for keyword as a whole word
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        match = re.search(pattern, remaining, re.IGNORECASE)
-        if match:
-            address_start_idx = match.start()
-            break
+    address_start_idx = find_keyword(ADDRESS_PATTERN, remaining)
     
     company_name = ""
     activite = ""
     adresse = ""
+    strategy = 'keywords'
     
     if address_start_idx > 0:
         # We found an address
@@ -162,13 +388,7 @@ def parse_company_line(line):
         before_address = remaining[:address_start_idx].strip()
         
         # Now split before_address into company name and activity
-        activity_start_idx = -1
-        for keyword in ACTIVITY_KEYWORDS:
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            match = re.search(pattern, before_address, re.IGNORECASE)
-            if match:
-                activity_start_idx = match.start()
-                break
+        activity_start_idx = find_keyword(ACTIVITY_PATTERN, before_address)
         
         if activity_start_idx > 0:
             company_name = before_address[:activity_start_idx].strip()
@@ -180,18 +400,13 @@ def parse_company_line(line):
                 split_at = len(words) // 2
                 company_name = ' '.join(words[:split_at])
                 activite = ' '.join(words[split_at:])
+                strategy = 'half_split'
             else:
                 company_name = before_address
                 activite = ""
     else:
         # No address found, split remaining into company and activity
-        activity_start_idx = -1
-        for keyword in ACTIVITY_KEYWORDS:
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            match = re.search(pattern, remaining, re.IGNORECASE)
-            if match:
-                activity_start_idx = match.start()
-                break
+        activity_start_idx = find_keyword(ACTIVITY_PATTERN, remaining)
         
         if activity_start_idx > 0:
             company_name = remaining[:activity_start_idx].strip()
@@ -202,67 +417,870 @@ def parse_company_line(line):
             activite = ""
     
     # Clean up company name (remove trailing dashes, etc.)
-    company_name = re.sub(r'\s*-\s*$', '', company_name).strip()
+    company_name = TRAILING_DASH_PATTERN.sub('', company_name).strip()
     
     if not company_name or len(company_name) < 2:
+        METRICS.count('lines_rejected.name_too_short')
         return None
     
-    return {
-        'ville': ville,
-        'name': company_name,
-        'activite': activite,
-        'adresse': adresse,
-        'tel': tel
-    }
+    METRICS.count(f'strategy.{strategy}')
+    return CompanyRecord(ville, company_name, activite, adresse, tel)
 
-def extract_companies_from_pdf(pdf_file):
+def extract_companies_from_pdf(pdf_file, backend=DEFAULT_BACKEND, layout=False, geometry=False, errors=None):
     """Extract company information from a PDF file
     
     Args:
         pdf_file: Path to the PDF file to process
-        
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+        errors: List receiving the read error, if any (see iter_page_companies())
+    
+    Returns:
+        list: List of CompanyRecords with extracted data
+    """
+    return extract_companies_from_pages(pdf_file, backend=backend, layout=layout, geometry=geometry,
+                                        errors=errors)
+
+def extract_companies_from_pages(pdf_file, start=0, stop=None, backend=DEFAULT_BACKEND, layout=False,
+                                 geometry=False, errors=None):
+    """Extract company information from a range of pages of a PDF file
+    
+    Args:
+        pdf_file: Path to the PDF file to process
+        start: Index of the first page to process
+        stop: Index after the last page to process (None for end of file)
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+        errors: List receiving the read error, if any (see iter_page_companies())
+    
+    Returns:
+        list: List of CompanyRecords with extracted data, in page order
+    """
+    companies = []
+    for _, page_companies in iter_page_companies(pdf_file, [(start, stop)], backend=backend,
+                                                     layout=layout, geometry=geometry, errors=errors):
+        companies.extend(page_companies)
+    return companies
+
+def merge_wrapped_lines(lines):
+    """Reassemble the table rows split over several text lines
+    
+    A cell that wraps inside a table row (a long company name or activity)
+    comes out of the text engines as an extra line, which cuts the row in
+    two: the first part misses the columns after the break, and the rest
+    has no city and is rejected. Every row of the directory tables starts
+    in the city column, so a line that does not start with a city
+    continues the row above it.
+    
+    Args:
+        lines: Text lines of a page, in engine order
+    
+    Returns:
+        list: One line per table row; lines before the first row are kept as is
+    """
+    rows = []
+    in_row = False
+    for line in lines:
+        text = ' '.join(line.split())
+        if not text:
+            continue
+        cleaned = clean_text(text)
+        starts_row = bool(CITY_PATTERN.match(cleaned))
+        if in_row and not starts_row and not ('Ville' in cleaned and 'Entreprise' in cleaned):
+            rows[-1] = f"{rows[-1]} {text}"
+            METRICS.count('lines_merged')
+        else:
+            rows.append(text)
+            in_row = starts_row
+    return rows
+
+def page_runs(fragments):
+    """Put the positioned text runs of a page in reading coordinates
+    
+    Directory pages are printed either upright or rotated a quarter turn,
+    so each run is expressed along its own writing direction.
+    
+    Args:
+        fragments: (x, y, dx, dy, text) tuples from Document.page_fragments()
+    
+    Returns:
+        list: (column position, row position, text) tuples, the column
+        position growing along the lines and the row position down the page
+    """
+    runs = []
+    for x, y, dx, dy, text in fragments:
+        if abs(dx) >= abs(dy):
+            sign = 1 if dx > 0 else -1
+            runs.append((x * sign, -y * sign, text))
+        else:
+            sign = 1 if dy > 0 else -1
+            runs.append((y * sign, x * sign, text))
+    return runs
+
+def detect_columns(runs):
+    """Detect the column starts of the table of a page
+    
+    The cells of a column all start at the same position, so the starts
+    shared by many runs are the columns. Runs starting anywhere else are
+    the continuation of a cell on the same line.
+    
+    Args:
+        runs: (column position, row position, text) tuples of the page
+    
     Returns:
-        list: List of company dictionaries with extracted data
+        list: Sorted column start positions (empty if the page has no runs)
     """
+    clusters = []
+    for position in sorted(run[0] for run in runs):
+        if clusters and position - clusters[-1][1] <= COLUMN_TOLERANCE:
+            clusters[-1][1] = position
+            clusters[-1][2] += 1
+        else:
+            clusters.append([position, position, 1])
+    if not clusters:
+        return []
+    threshold = max(cluster[2] for cluster in clusters) * COLUMN_SHARE
+    return [start for start, _, count in clusters if count >= threshold]
+
+def column_fields(columns, runs):
+    """Map the columns of a page to company fields
+    
+    The first two columns are the city and the company name. The last
+    column holds the phone when most of its cells are phone numbers; the
+    columns in between are the activity then the address. A page whose
+    table merges the last cells into one column gets fewer fields, and
+    the missing ones are split out of the text of the row.
+    
+    Args:
+        columns: Sorted column start positions, from detect_columns()
+        runs: (column position, row position, text) tuples of the page
+    
+    Returns:
+        list: Field name of each column
+    """
+    fields = ['ville', 'name', 'activite', 'adresse'][:len(columns)]
+    fields += ['adresse'] * (len(columns) - len(fields))
+    if len(columns) > 2:
+        last = [text for position, _, text in runs if position >= columns[-1] - COLUMN_TOLERANCE]
+        phones = sum(1 for text in last if not extract_phone_from_end(text)[1])
+        if phones * 2 > len(last):
+            fields[-1] = 'tel'
+    return fields
+
+def text_lines(runs):
+    """Join text runs into lines, from the top, each line in writing order"""
+    lines = []
+    for position, row, text in sorted(runs, key=lambda run: run[1]):
+        if lines and row - lines[-1][0] <= LINE_TOLERANCE:
+            lines[-1][1].append((position, text))
+        else:
+            lines.append((row, [(position, text)]))
+    return [' '.join(text for _, text in sorted(line)) for _, line in lines]
+
+def parse_page_geometry(fragments):
+    """Parse the table of a page from the positions of its text runs
+    
+    The column starts are detected once for the page. Each run is then
+    given to a column by its start position and to the row of the nearest
+    city cell, which puts the lines of a wrapped cell back into their row.
+    Fields come straight from their columns; when a cell spans several
+    columns (the text engine merged them into one run), the address and
+    the phone are split out of it with the keyword rules.
+    
+    Pages without at least a city, a name and one more column are parsed
+    line by line with parse_company_line().
+    
+    Args:
+        fragments: (x, y, dx, dy, text) tuples from Document.page_fragments()
+    
+    Returns:
+        tuple: (list of CompanyRecords, number of table rows)
+    """
+    runs = [
+        run for run in page_runs(fragments)
+        if not (run[2].partition(' ')[0] in TABLE_HEADER_LABELS and set(run[2].split()) <= TABLE_HEADER_LABELS)
+    ]
+    if len(runs) < len(fragments):
+        METRICS.count('lines_rejected.header')
+    columns = detect_columns(runs)
+    if len(columns) < 3:
+        lines = text_lines(runs)
+        companies = [company for company in map(parse_company_line, lines) if company]
+        return companies, len(lines)
+    fields = column_fields(columns, runs)
+    
+    # Rows are anchored on the cells of the city column
+    name_start = columns[1] - COLUMN_TOLERANCE
+    anchors = sorted((run for run in runs if run[0] < name_start), key=lambda run: run[1])
+    anchor_rows = [run[1] for run in anchors]
+    rows = [{'ville': [anchor]} for anchor in anchors]
+    for run in runs:
+        if run[0] < name_start:
+            continue
+        # Nearest city cell, above or below the run
+        index = bisect.bisect_left(anchor_rows, run[1])
+        if index == len(anchors) or (
+                index > 0 and run[1] - anchor_rows[index - 1] < anchor_rows[index] - run[1]):
+            index -= 1
+        if index < 0 or abs(run[1] - anchor_rows[index]) > ROW_REACH:
+            continue
+        field = fields[bisect.bisect_right(columns, run[0] + COLUMN_TOLERANCE) - 1]
+        rows[index].setdefault(field, []).append(run)
+    
+    # A city wrapped on two lines gives two city cells, one of them without
+    # a name next to it. The single-line cells of the row are centred
+    # between the two lines, which tells the neighbour it goes with.
+    cell_rows = sorted(run[1] for run in runs if run[0] >= name_start)
+    
+    def centred(first, second):
+        middle = (anchor_rows[first] + anchor_rows[second]) / 2
+        index = bisect.bisect_left(cell_rows, middle - LINE_TOLERANCE)
+        return index < len(cell_rows) and cell_rows[index] <= middle + LINE_TOLERANCE
+    
+    for index, cells in enumerate(rows):
+        if 'name' in cells:
+            continue
+        neighbours = [
+            other for other in (index - 1, index + 1)
+            if 0 <= other < len(rows) and 'name' in rows[other]
+            and abs(anchor_rows[other] - anchor_rows[index]) <= ROW_REACH
+        ]
+        if neighbours:
+            target = min(neighbours, key=lambda other: (
+                not centred(index, other), abs(anchor_rows[other] - anchor_rows[index])))
+            for field, parts in cells.items():
+                rows[target].setdefault(field, []).extend(parts)
+            cells.clear()
+    
+    rows = [cells for cells in rows if cells]
     companies = []
+    for cells in rows:
+        company = parse_geometry_row({
+            field: parts[0][2] if len(parts) == 1 else ' '.join(text_lines(parts))
+            for field, parts in cells.items()
+        })
+        if company:
+            companies.append(company)
+    return companies, len(rows)
+
+def parse_geometry_row(cells):
+    """Build the company of a table row from its cells
+    
+    Args:
+        cells: Text of the cells of the row, by field name
+    
+    Returns:
+        CompanyRecord, or None if the row has no company name
+    """
+    ville = clean_text(cells['ville'])
+    company_name = TRAILING_DASH_PATTERN.sub('', clean_text(cells.get('name', ''))).strip()
+    if len(company_name) < 2:
+        METRICS.count('lines_rejected.name_too_short')
+        return None
+    activite = clean_text(cells.get('activite', ''))
+    adresse = clean_text(cells.get('adresse', ''))
+    strategy = 'geometry'
+    
+    tel = ""
+    if 'tel' in cells:
+        tel, rest = extract_phone_from_end(clean_text(cells['tel']))
+        adresse = f"{adresse} {rest}".strip()
+    elif adresse or activite:
+        # The phone was printed in the same run as the cell before it
+        if adresse:
+            tel, adresse = extract_phone_from_end(adresse)
+        else:
+            tel, activite = extract_phone_from_end(activite)
+        if tel:
+            strategy = 'geometry_split'
+    
+    if activite and 'adresse' not in cells:
+        # Activity and address merged into one run
+        address_start_idx = find_keyword(ADDRESS_PATTERN, activite)
+        if address_start_idx > 0:
+            adresse = f"{activite[address_start_idx:]} {adresse}".strip()
+            activite = activite[:address_start_idx].strip()
+            strategy = 'geometry_split'
+    
+    METRICS.count(f'strategy.{strategy}')
+    return CompanyRecord(ville, company_name, activite, adresse, tel)
+
+def strategy_counts():
+    """Return the number of lines resolved by each parsing strategy so far
+    
+    Strategies:
+        geometry        every field taken from its column
+        geometry_split  columns, plus the address or phone split out of a
+                        cell the text engine merged with the next ones
+        keywords        parse_company_line() keyword boundaries
+        half_split      parse_company_line() first half/second half guess
+    
+    Returns:
+        dict: Count by strategy name, for the strategies that resolved lines
+    """
+    return {
+        name: METRICS.counters[f'strategy.{name}']
+        for name in ('geometry', 'geometry_split', 'keywords', 'half_split')
+        if METRICS.counters[f'strategy.{name}']
+    }
+
+def iter_page_companies(pdf_file, page_ranges=None, first_page=0, backend=DEFAULT_BACKEND, layout=False,
+                        geometry=False, errors=None):
+    """Extract company information page by page
+    
+    Pages are loaded one at a time and released once parsed, so memory
+    stays bounded by one page whatever the size of the file. On a read
+    error, the error is printed and the extraction of the file stops:
+    the pages before it have already been yielded, the failed page and
+    the pages after it are not.
+    
+    Args:
+        pdf_file: Path to the PDF file to process
+        page_ranges: (start, stop) page index ranges, stop None for end of
+            file (default: all pages), see parse_page_ranges()
+        first_page: Index of the first page to process (pages before it are skipped)
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines (merge_wrapped_lines())
+        geometry: Parse the table from the text positions (parse_page_geometry())
+        errors: List receiving (page index, error message) on a read error,
+            with page index None if the file could not be opened (optional)
+    
+    Yields:
+        tuple: (page index, list of CompanyRecords of the page), in page order
+    """
+    page_number = None
     try:
-        with open(pdf_file, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text = page.extract_text()
-                lines = text.split('\n')
+        with open_document(pdf_file, backend) as document:
+            for page_number in select_pages(page_ranges, document.page_count):
+                if page_number < first_page:
+                    continue
+                if geometry:
+                    with METRICS.stage('pdf.extract_text'):
+                        fragments = document.page_fragments(page_number)
+                    parse_started = time.perf_counter()
+                    companies, rows = parse_page_geometry(fragments)
+                    METRICS.add_time('parse_page_geometry', time.perf_counter() - parse_started)
+                    METRICS.count('lines_seen', rows)
+                    METRICS.count('pages')
+                    yield page_number, companies
+                    continue
                 
+                with METRICS.stage('pdf.extract_text'):
+                    lines = document.page_lines(page_number)
+                if layout:
+                    lines = merge_wrapped_lines(lines)
+                
+                parse_started = time.perf_counter()
+                companies = []
                 for line in lines:
                     company = parse_company_line(line)
                     if company:
                         companies.append(company)
+                METRICS.add_time('parse_company_line', time.perf_counter() - parse_started, len(lines))
+                METRICS.count('lines_seen', len(lines))
+                METRICS.count('pages')
+                yield page_number, companies
     except Exception as e:
         # Log the full error for debugging
         import traceback
         print(f"Error processing {pdf_file}: {e}")
         print(traceback.format_exc())
+        METRICS.count('read_errors')
+        if errors is not None:
+            errors.append((page_number, str(e)))
+
+def parse_page_ranges(spec):
+    """Parse a page selection such as "1-10,15,40-" (1-based, inclusive)
     
-    return companies
+    Args:
+        spec: Comma-separated page numbers and ranges, open-ended ranges allowed
+    
+    Returns:
+        list: Sorted (start, stop) page index ranges (0-based, stop
+        exclusive, None for end of file)
+    
+    Raises:
+        argparse.ArgumentTypeError: On an invalid selection
+    """
+    ranges = []
+    for part in spec.split(','):
+        first, dash, last = part.strip().partition('-')
+        try:
+            start = int(first) if first else 1
+            stop = (int(last) if last else None) if dash else start
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid page range: '{part}'")
+        if start < 1 or (stop is not None and stop < start):
+            raise argparse.ArgumentTypeError(f"invalid page range: '{part}'")
+        ranges.append((start - 1, stop))
+    return sorted(ranges, key=lambda r: r[0])
+
+def select_pages(page_ranges, page_count):
+    """Return the sorted, unique page indexes of page_ranges within a file"""
+    if page_ranges is None:
+        return range(page_count)
+    pages = set()
+    for start, stop in page_ranges:
+        pages.update(range(start, page_count if stop is None else min(stop, page_count)))
+    return sorted(pages)
 
-def generate_sql_file(companies, output_file='companies_from_pdfs.sql'):
-    """Generate SQL file with CREATE TABLE and INSERT statements"""
+class PageCheckpoint:
+    """Resumable progress of a page-by-page extraction
+    
+    The checkpoint file (JSON) records, for each PDF file, its content
+    hash and the last page done (1-based). The companies of each finished
+    page are appended to a spool file next to it (<checkpoint>.records.jsonl)
+    and flushed to disk before the checkpoint is updated, so after a crash
+    the pages already done are replayed from the spool instead of being
+    extracted again.
+    
+    The checkpoint is reset when the parser version (backend included) or
+    the page selection changes, and the progress of a file when its
+    content changes.
+    """
+    
+    def __init__(self, path=CHECKPOINT_FILE, page_ranges=None, backend=DEFAULT_BACKEND, layout=False,
+                 geometry=False):
+        self.path = path
+        self.spool_path = f"{path}.records.jsonl"
+        selection = [list(r) for r in page_ranges] if page_ranges else None
+        version = parser_version(backend, layout, geometry)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if state.get('parser_version') != version or state.get('pages') != selection:
+            state = {'parser_version': version, 'pages': selection, 'files': {}}
+            open(self.spool_path, 'w').close()
+        self.state = state
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+    
+    def start_file(self, pdf_file):
+        """Return the last page done of a PDF file (0 if none), resetting it if the file changed"""
+        sha256 = file_sha256(pdf_file)
+        entry = self.state['files'].get(pdf_file)
+        if not entry or entry['sha256'] != sha256:
+            entry = self.state['files'][pdf_file] = {'sha256': sha256, 'last_page': 0}
+        return entry['last_page']
+    
+    def replay(self, pdf_file):
+        """
+        Yield the pages of a PDF file already done, from the spool.
+        
+        Yields:
+            tuple: (page index, list of CompanyRecords of the page), in page order
+        """
+        entry = self.state['files'][pdf_file]
+        replayed = set()
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash
+                    continue
+                if (page['file'] != pdf_file or page['sha256'] != entry['sha256']
+                        or page['page'] > entry['last_page'] or page['page'] in replayed):
+                    continue
+                replayed.add(page['page'])
+                yield page['page'] - 1, [CompanyRecord.from_mapping(c) for c in page['companies']]
+    
+    def page_done(self, pdf_file, page_index, companies):
+        """Record the companies of a finished page, then the page as done"""
+        entry = self.state['files'][pdf_file]
+        page = {'file': pdf_file, 'sha256': entry['sha256'], 'page': page_index + 1,
+                'companies': [dict(company) for company in companies]}
+        self._spool.write(json.dumps(page, ensure_ascii=False) + '\n')
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        
+        entry['last_page'] = page_index + 1
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def close(self):
+        """Close the spool file"""
+        self._spool.close()
+
+def iter_checkpointed_pages(pdf_file, page_ranges=None, checkpoint=None, backend=DEFAULT_BACKEND, layout=False,
+                            geometry=False):
+    """Extract a PDF file page by page, resuming from a checkpoint
+    
+    Args:
+        pdf_file: Path to the PDF file to process
+        page_ranges: Page index ranges to process (default: all pages)
+        checkpoint: PageCheckpoint recording the progress (optional)
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+    
+    Yields:
+        tuple: (page index, list of CompanyRecords, source) in page order,
+        where source is 'checkpoint' for replayed pages or 'serial'
+    """
+    last_page = 0
+    if checkpoint is not None:
+        last_page = checkpoint.start_file(pdf_file)
+        for page_number, companies in checkpoint.replay(pdf_file):
+            yield page_number, companies, 'checkpoint'
+    
+    for page_number, companies in iter_page_companies(pdf_file, page_ranges, last_page, backend, layout, geometry):
+        if checkpoint is not None:
+            checkpoint.page_done(pdf_file, page_number, companies)
+        yield page_number, companies, 'serial'
+
+def count_pdf_pages(pdf_file):
+    """Return the number of pages of a PDF file (0 if it cannot be read)"""
+    try:
+        with open(pdf_file, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        print(f"Error reading {pdf_file}: {e}")
+        return 0
+
+def plan_extraction_tasks(pdfs, pages_per_task=PAGES_PER_TASK):
+    """Split PDF files into page-range tasks for the worker pool
+    
+    Args:
+        pdfs: List of PDF file paths, in output order
+        pages_per_task: Maximum number of pages per task
+        
+    Returns:
+        list: (pdf_index, pdf_file, start, stop) tuples, in output order
+    """
+    tasks = []
+    for pdf_index, pdf_file in enumerate(pdfs):
+        page_count = count_pdf_pages(pdf_file)
+        if page_count == 0:
+            # One task for the whole file: it fails (or finds nothing) the same way as a serial run
+            tasks.append((pdf_index, pdf_file, 0, None))
+        for start in range(0, page_count, pages_per_task):
+            stop = min(start + pages_per_task, page_count)
+            tasks.append((pdf_index, pdf_file, start, stop))
+    return tasks
+
+def _run_extraction_task(task, backend=DEFAULT_BACKEND, layout=False, geometry=False):
+    """Worker entry point: extract one page range, time it and collect its metrics and read errors"""
+    pdf_index, pdf_file, start, stop = task
+    METRICS.reset()
+    started = time.perf_counter()
+    errors = []
+    companies = extract_companies_from_pages(pdf_file, start, stop, backend, layout, geometry, errors)
+    return companies, time.perf_counter() - started, METRICS.snapshot(), errors
+
+def extract_companies_parallel(pdfs, workers, pages_per_task=PAGES_PER_TASK, backend=DEFAULT_BACKEND, layout=False,
+                               geometry=False):
+    """Extract companies from several PDFs with a process pool
+    
+    Work is split by PDF and by page range. Results are merged back in
+    (file, page) order, so the output is identical to a serial run: when
+    a page cannot be read, the companies of the pages before it are kept
+    and the later page ranges of the file are dropped.
+    
+    Args:
+        pdfs: List of PDF file paths, in output order
+        workers: Number of worker processes
+        pages_per_task: Maximum number of pages per task
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+    
+    Returns:
+        tuple: (companies per PDF as a list of lists, seconds spent per PDF,
+        read errors per PDF as a list of lists, see iter_page_companies())
+    """
+    tasks = plan_extraction_tasks(pdfs, pages_per_task)
+    per_file = [[] for _ in pdfs]
+    timings = [0.0 for _ in pdfs]
+    file_errors = [[] for _ in pdfs]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order, which is (file, page) order
+        results = executor.map(_run_extraction_task, tasks, repeat(backend), repeat(layout), repeat(geometry))
+        for task, (companies, elapsed, metrics, errors) in zip(tasks, results):
+            pdf_index = task[0]
+            timings[pdf_index] += elapsed
+            if file_errors[pdf_index]:
+                # A serial run stops at the first failed page of the file
+                continue
+            METRICS.merge(metrics)
+            per_file[pdf_index].extend(companies)
+            file_errors[pdf_index].extend(errors)
+    
+    return per_file, timings, file_errors
+
+def deduplicate_companies(companies, sort_buffer=None):
+    """Remove duplicate companies and sort them
+    
+    Args:
+        companies: Iterable of CompanyRecord (or company dictionaries)
+        sort_buffer: Records held in memory, to dedup and sort on disk
+            with ExternalSortedCompanies (default: in memory)
+    
+    Returns:
+        list: CompanyRecords unique on name+ville, sorted by (ville, name)
+        (an ExternalSortedCompanies with sort_buffer, which the caller
+        closes to delete its run files)
+    """
+    if isinstance(companies, ExternalSortedCompanies):
+        return companies
+    if sort_buffer:
+        return ExternalSortedCompanies(companies, sort_buffer)
     
     # Remove duplicates based on name+ville combination
+    started = time.perf_counter()
     seen = set()
     unique_companies = []
-    for company in companies:
-        key = (company['name'].lower(), company['ville'].lower())
+    for company in map(CompanyRecord.from_mapping, companies):
+        key = (company.name.lower(), company.ville.lower())
         if key not in seen:
             seen.add(key)
             unique_companies.append(company)
+    del seen
+    
+    # Sort by name for consistency
+    unique_companies.sort(key=lambda x: (x.ville, x.name))
+    METRICS.add_time('dedup', time.perf_counter() - started)
+    return unique_companies
+
+class ExternalSortedCompanies:
+    """Unique companies sorted by (ville, name) in run files on disk
+    
+    Same result as deduplicate_companies() with a fixed memory budget:
+    
+    1. Companies are numbered in input order, sorted on their lowercased
+       (ville, name) key in runs of sort_buffer records spilled to disk,
+       and merged; the first company of each key is kept, like the
+       first one seen in memory.
+    2. The kept companies are sorted again in runs on (ville, name, input
+       order), the order of the stable in-memory sort.
+    
+    Iterating merges the runs of step 2, and can be repeated until the
+    run files are deleted by close() or garbage collection.
+    """
+    
+    def __init__(self, companies, sort_buffer=SORT_BUFFER_RECORDS, work_dir=None):
+        started = time.perf_counter()
+        self.total = 0
+        self._work_dir = None
+        self._work_dir = tempfile.mkdtemp(prefix='companies_sort_', dir=work_dir)
+        
+        keyed_runs = reduce_runs(spill_sorted_runs(self._keyed(companies), sort_buffer, self._work_dir),
+                                 self._work_dir)
+        self._runs = reduce_runs(spill_sorted_runs(self._first_of_keys(keyed_runs), sort_buffer, self._work_dir),
+                                 self._work_dir)
+        for path in keyed_runs:
+            os.remove(path)
+        METRICS.count('external_sort.runs', len(self._runs))
+        METRICS.add_time('dedup', time.perf_counter() - started)
+    
+    def _keyed(self, companies):
+        for company in map(CompanyRecord.from_mapping, companies):
+            yield (company.ville.lower(), company.name.lower(), self.total,
+                   company.ville, company.name, company.activite, company.adresse, company.tel)
+            self.total += 1
+    
+    def _first_of_keys(self, runs):
+        self._count = 0
+        previous = None
+        for ville_key, name_key, number, ville, name, activite, adresse, tel in merge_runs(runs):
+            if (ville_key, name_key) != previous:
+                previous = (ville_key, name_key)
+                self._count += 1
+                yield (ville, name, number, activite, adresse, tel)
+    
+    def __len__(self):
+        return self._count
+    
+    def __iter__(self):
+        for ville, name, _, activite, adresse, tel in merge_runs(self._runs):
+            yield CompanyRecord(ville, name, activite, adresse, tel)
+    
+    def close(self):
+        """Delete the run files"""
+        if self._work_dir:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+
+def iter_company_values(unique_companies, slugs=None):
+    """Build the column values of each company, as written in the SQL file
+    
+    IMPORTANT: All text values are processed through clean_text(), which
+    escapes single quotes for SQL safety. Do not modify this without
+    ensuring proper SQL escaping is maintained.
+    
+    Args:
+        unique_companies: Deduplicated, sorted CompanyRecords
+        slugs: SlugAllocator, e.g. preloaded with the slugs of the database
+        
+    Yields:
+        dict: name, slug, description, ville, adresse, tel and activite values
+    """
+    # Track slugs to ensure uniqueness
+    if slugs is None:
+        slugs = SlugAllocator()
+    
+    for company in unique_companies:
+        started = time.perf_counter()
+        name = clean_text(company['name'])
+        ville = clean_text(company['ville'])
+        adresse = clean_text(company['adresse'])
+        tel = clean_text(company['tel'])
+        activite = clean_text(company['activite'])
+        cleaned = time.perf_counter()
+        
+        # Name and ville as stored in the database (one level of SQL escaping removed)
+        slug = slugs.allocate(create_slug(name), name.replace("''", "'"), ville.replace("''", "'"))
+        METRICS.add_time('clean_text', cleaned - started)
+        METRICS.add_time('create_slug', time.perf_counter() - cleaned)
+        
+        # Create description from activity
+        # Note: ville is already SQL-escaped by clean_text, which is necessary for SQL safety
+        # The escaped version is used here to maintain consistency in the SQL file
+        description = activite if activite else f"Entreprise basée à {ville}"
+        
+        yield {
+            'name': name,
+            'slug': slug,
+            'description': description,
+            'ville': ville,
+            'adresse': adresse,
+            'tel': tel,
+            'activite': activite,
+        }
+
+def record_values(row, category_id=1):
+    """Return a row of iter_company_values() with the values stored in the database, for a RecordWriter"""
+    record = {column: row[column].replace("''", "'") for column, kind in RECORD_COLUMNS if kind == 'str'}
+    record['categoryId'] = category_id
+    return record
+
+def sql_values(record):
+    """Return a row of a record file with its text values SQL-escaped, as built by iter_company_values()"""
+    row = {column: record[column].replace("'", "''") for column, kind in RECORD_COLUMNS if kind == 'str'}
+    row['categoryId'] = record['categoryId']
+    return row
+
+def index_company_row(phone_index, row):
+    """Add a company row of iter_company_values() to a PhoneIndex, with the values stored in the database"""
+    phone_index.add(row['tel'], row['slug'], row['name'].replace("''", "'"), row['ville'].replace("''", "'"))
+
+def geocode_company_row(geocoder, row):
+    """Return the location of a company row of iter_company_values() (see Gazetteer.geocode), or None"""
+    return geocoder.geocode(row['ville'].replace("''", "'"), row['adresse'].replace("''", "'"))
+
+def normalize_company_phones(companies):
+    """Rewrite the phone numbers of companies in canonical E.164 form (+221...)
+    
+    Numbers that are not valid Senegalese numbers are kept as printed.
+    The numbers are counted by type (phones.landline, phones.mobile,
+    phones.other) and phones.invalid.
     
-    print(f"Total companies: {len(companies)}")
+    Args:
+        companies: Iterable of CompanyRecords
+    
+    Yields:
+        CompanyRecord: Company with its canonical phone number
+    """
+    for company in companies:
+        if company.tel:
+            canonical = normalize_phone(company.tel)
+            if canonical:
+                METRICS.count(f'phones.{phone_type(canonical)}')
+                if canonical != company.tel:
+                    company = CompanyRecord(company.ville, company.name, company.activite, company.adresse, canonical)
+            else:
+                METRICS.count('phones.invalid')
+        yield company
+
+def generate_sql_file(companies, output_file='companies_from_pdfs.sql', slugs=None, sort_buffer=None,
+                      phone_index=None, records_file=None, geocoder=None):
+    """Generate SQL file with CREATE TABLE and INSERT statements
+    
+    Args:
+        companies: List of extracted company dictionaries (or an ExternalSortedCompanies)
+        output_file: Path to the SQL file to write
+        slugs: SlugAllocator preloaded with existing slugs (optional)
+        sort_buffer: Dedup and sort on disk, sort_buffer records at a time (optional)
+        phone_index: PhoneIndex receiving the companies written (optional)
+        records_file: Also write the rows to this record file (see company_records.py)
+        geocoder: Gazetteer locating the companies; a "CompanyLocation" INSERT
+            follows each batch of companies (optional)
+    """
+    with METRICS.stage('sql.generate'):
+        unique_companies = deduplicate_companies(companies, sort_buffer)
+        try:
+            return _generate_sql_file(companies, unique_companies, output_file, slugs, phone_index, records_file,
+                                      geocoder)
+        finally:
+            if unique_companies is not companies and isinstance(unique_companies, ExternalSortedCompanies):
+                # Sorted here: delete the run files now (the caller closes its own)
+                unique_companies.close()
+
+def _generate_sql_file(companies, unique_companies, output_file, slugs, phone_index=None, records_file=None,
+                       geocoder=None):
+    """Write the deduplicated companies to the SQL file (see generate_sql_file)"""
+    total = unique_companies.total if isinstance(unique_companies, ExternalSortedCompanies) else len(companies)
+    print(f"Total companies: {total}")
     print(f"Unique companies: {len(unique_companies)}")
     
-    # Sort by name for consistency
-    unique_companies.sort(key=lambda x: (x['ville'], x['name']))
+    records = RecordWriter(records_file) if records_file else None
     
-    # Generate SQL
+    # Write the SQL one batch at a time, so the whole text is never in memory
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sql_header_lines(len(unique_companies))))
+        
+        # Generate INSERT statements in batches
+        rows = iter_company_values(unique_companies, slugs)
+        for i in range(0, len(unique_companies), BATCH_SIZE):
+            batch_size = min(BATCH_SIZE, len(unique_companies) - i)
+            batch = []
+            locations = []
+            for row in islice(rows, batch_size):
+                if phone_index is not None:
+                    index_company_row(phone_index, row)
+                if records is not None:
+                    records.write(record_values(row))
+                if geocoder is not None:
+                    locations.append(format_location_line(row, geocode_company_row(geocoder, row)))
+                batch.append(format_values_line(row))
+            f.write('\n' + '\n'.join(sql_batch_lines(batch, i)))
+            if locations:
+                f.write('\n' + '\n'.join(location_batch_lines(locations)))
+            METRICS.count('rows_emitted', batch_size)
+        
+        f.write('\n' + '\n'.join(sql_footer_lines(len(unique_companies))))
+    
+    print(f"\nSQL file generated: {output_file}")
+    if records is not None:
+        records.close()
+        print(f"Record file generated: {records_file}")
+    return output_file
+
+def sql_header_lines(total, categorized=False):
+    """Return the comment header of the SQL file
+    
+    Args:
+        total: Number of companies in the file
+        categorized: Rows carry their computed categoryId instead of 1
+        
+    Returns:
+        list: Lines, without line breaks
+    """
     sql_lines = []
     sql_lines.append('-- ===============================================')
     sql_lines.append('-- Companies Extracted from PDF Files')
@@ -270,12 +1288,15 @@ def generate_sql_file(companies, output_file='companies_from_pdfs.sql'):
     sql_lines.append('-- PostgreSQL SQL Script')
     sql_lines.append('-- ===============================================')
     sql_lines.append(f'-- Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-    sql_lines.append(f'-- Total companies: {len(unique_companies)}')
+    sql_lines.append(f'-- Total companies: {total}')
     sql_lines.append('-- ===============================================')
     sql_lines.append('')
     sql_lines.append('-- Note: This assumes the Company table exists (run Prisma migrations first)')
-    sql_lines.append('-- This script will insert companies into the default category (categoryId = 1)')
-    sql_lines.append('-- You may want to update categoryId after import to properly categorize companies')
+    if categorized:
+        sql_lines.append('-- Companies have been automatically categorized based on their business activities')
+    else:
+        sql_lines.append('-- This script will insert companies into the default category (categoryId = 1)')
+        sql_lines.append('-- You may want to update categoryId after import to properly categorize companies')
     sql_lines.append('')
     sql_lines.append('-- ===============================================')
     sql_lines.append('-- CREATE TABLE (for reference - uncomment if needed)')
@@ -303,58 +1324,78 @@ def generate_sql_file(companies, output_file='companies_from_pdfs.sql'):
     sql_lines.append('-- Using categoryId = 1 as default (update as needed)')
     sql_lines.append('-- ON CONFLICT DO NOTHING prevents duplicate insertions if re-run')
     sql_lines.append('')
+    return sql_lines
+
+def format_values_line(row, category_id=1):
+    """Build the VALUES line of one row of iter_company_values()"""
+    # All text values are SQL-escaped by iter_company_values
+    return (
+        f"  ('{row['name']}', '{row['slug']}', '{row['description']}', "
+        f"'{row['ville']}', "
+        f"'{row['adresse']}', "
+        f"'{row['tel']}', "
+        f"'{row['activite']}', "
+        f"{category_id}, NOW(), NOW())"
+    )
+
+def sql_batch_lines(values_lines, offset):
+    """Return the INSERT statement of one batch of VALUES lines
     
-    # Track slugs to ensure uniqueness
-    slug_counts = {}
+    Args:
+        values_lines: Lines built by format_values_line()
+        offset: Number of companies written before this batch
+    """
+    return [
+        f'-- Batch {offset//BATCH_SIZE + 1}: Companies {offset+1} to {offset+len(values_lines)}',
+        'INSERT INTO "Company" (name, slug, description, ville, adresse, tel, activite, "categoryId", "createdAt", "updatedAt") VALUES',
+        ',\n'.join(values_lines),
+        'ON CONFLICT (slug) DO NOTHING;',
+        '',
+    ]
+
+def _sql_text(value):
+    """Return a text value as an SQL literal, NULL if it is empty"""
+    return "'" + value.replace("'", "''") + "'" if value else 'NULL'
+
+def format_location_line(row, location):
+    """Build the VALUES line of the "CompanyLocation" of one row of iter_company_values()
     
-    # Generate INSERT statements in batches
-    for i in range(0, len(unique_companies), BATCH_SIZE):
-        batch = unique_companies[i:i+BATCH_SIZE]
-        
-        sql_lines.append(f'-- Batch {i//BATCH_SIZE + 1}: Companies {i+1} to {min(i+BATCH_SIZE, len(unique_companies))}')
-        sql_lines.append('INSERT INTO "Company" (name, slug, description, ville, adresse, tel, activite, "categoryId", "createdAt", "updatedAt") VALUES')
-        
-        values_lines = []
-        for company in batch:
-            name = clean_text(company['name'])
-            base_slug = create_slug(name)
-            
-            # Ensure slug uniqueness by appending counter if needed
-            if base_slug in slug_counts:
-                slug_counts[base_slug] += 1
-                slug = f"{base_slug}-{slug_counts[base_slug]}"
-            else:
-                slug_counts[base_slug] = 0
-                slug = base_slug
-            
-            ville = clean_text(company['ville'])
-            adresse = clean_text(company['adresse'])
-            tel = clean_text(company['tel'])
-            activite = clean_text(company['activite'])
-            
-            # Create description from activity
-            # Note: ville is already SQL-escaped by clean_text, which is necessary for SQL safety
-            # The escaped version is used here to maintain consistency in the SQL file
-            description = activite if activite else f"Entreprise basée à {ville}"
-            
-            # Build VALUES line
-            # IMPORTANT: All text values have been processed through clean_text()
-            # which escapes single quotes for SQL safety. Do not modify this without
-            # ensuring proper SQL escaping is maintained.
-            values_line = (
-                f"  ('{name}', '{slug}', '{description}', "
-                f"'{ville}', "
-                f"'{adresse if adresse else ''}', "
-                f"'{tel if tel else ''}', "
-                f"'{activite if activite else ''}', "
-                f"1, NOW(), NOW())"
-            )
-            values_lines.append(values_line)
-        
-        sql_lines.append(',\n'.join(values_lines))
-        sql_lines.append('ON CONFLICT (slug) DO NOTHING;')
-        sql_lines.append('')
+    Args:
+        row: Row of iter_company_values() (SQL-escaped values)
+        location: Result of Gazetteer.geocode(); None keeps the ville as
+            city, without region or coordinates
+    """
+    address = f"'{row['adresse']}'" if row['adresse'] else 'NULL'
+    if location is None:
+        city = f"'{row['ville']}'" if row['ville'] else 'NULL'
+        return f"  ('{row['slug']}', NULL, NULL, {city}, {address}, NULL, NULL)"
+    return (
+        f"  ('{row['slug']}', {_sql_text(location['region'])}, {_sql_text(location['department'])}, "
+        f"{_sql_text(location['city'])}, {address}, {location['lat']!r}, {location['lng']!r})"
+    )
+
+def location_batch_lines(values_lines):
+    """Return the "CompanyLocation" INSERT of one batch of lines built by format_location_line()
     
+    The locations are joined to the companies on slug, and a company that
+    already has a primary location (re-run, or company skipped by ON
+    CONFLICT) keeps it.
+    """
+    return [
+        'INSERT INTO "CompanyLocation" ("companyId", region, department, city, address, lat, lng, "isPrimary", "createdAt", "updatedAt")',
+        'SELECT c.id, v.region, v.department, v.city, v.address, CAST(v.lat AS DOUBLE PRECISION), '
+        'CAST(v.lng AS DOUBLE PRECISION), true, NOW(), NOW()',
+        'FROM (VALUES',
+        ',\n'.join(values_lines),
+        ') AS v(slug, region, department, city, address, lat, lng)',
+        'JOIN "Company" c ON c.slug = v.slug',
+        'WHERE NOT EXISTS (SELECT 1 FROM "CompanyLocation" l WHERE l."companyId" = c.id AND l."isPrimary");',
+        '',
+    ]
+
+def sql_footer_lines(total):
+    """Return the closing statements and comments of the SQL file"""
+    sql_lines = []
     sql_lines.append('-- ===============================================')
     sql_lines.append('-- RESET SEQUENCE')
     sql_lines.append('-- ===============================================')
@@ -370,18 +1411,328 @@ def generate_sql_file(companies, output_file='companies_from_pdfs.sql'):
     sql_lines.append('-- ===============================================')
     sql_lines.append('-- IMPORT COMPLETE')
     sql_lines.append('-- ===============================================')
-    sql_lines.append(f'-- Successfully prepared {len(unique_companies)} companies for import')
+    sql_lines.append(f'-- Successfully prepared {total} companies for import')
     sql_lines.append('-- ===============================================')
+    return sql_lines
+
+def parser_version(backend=DEFAULT_BACKEND, layout=False, geometry=False):
+    """Return a version stamp of the parsing rules
     
-    # Write to file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(sql_lines))
+    The stamp changes whenever the line parser, the keyword lists, the
+    compiled patterns, the record type, the text extraction backend (its
+    module source or engine version), the row reconstruction or the
+    geometry parser change, which invalidates previously cached records.
     
-    print(f"\nSQL file generated: {output_file}")
-    return output_file
+    Args:
+        backend: Text extraction backend
+        layout: Whether wrapped table rows are reassembled
+        geometry: Whether the table is parsed from the text positions
+    
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    sources = [clean_text, compile_keyword_pattern, find_keyword, extract_phone_from_end, parse_company_line,
+               CompanyRecord, iter_page_companies, inspect.getmodule(BACKENDS[backend])]
+    if layout:
+        sources.append(merge_wrapped_lines)
+    if geometry:
+        sources += [page_runs, detect_columns, column_fields, text_lines, parse_page_geometry, parse_geometry_row]
+    for source in sources:
+        digest.update(inspect.getsource(source).encode('utf-8'))
+    patterns = [PHONE_TAIL_PATTERN, PHONE_PATTERN, CITY_PATTERN, ADDRESS_PATTERN, ACTIVITY_PATTERN,
+                TRAILING_DASH_PATTERN]
+    rules = [
+        SENEGALESE_CITIES, ADDRESS_KEYWORDS, ACTIVITY_KEYWORDS, PHONE_PATTERNS,
+        [[pattern.pattern, pattern.flags] for pattern in patterns],
+        backend_version(backend), layout, geometry,
+        COLUMN_SHARE, COLUMN_TOLERANCE, LINE_TOLERANCE, ROW_REACH,
+    ]
+    digest.update(json.dumps(rules, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-def main():
+def _cache_path(pdf_file, cache_dir, version):
+    """Return the cache entry path of a PDF file"""
+    return os.path.join(cache_dir, f"{file_sha256(pdf_file)}_{version}.json.gz")
+
+def load_cached_companies(pdf_file, cache_dir=CACHE_DIR, version=None):
+    """Load the parsed records of a PDF file from the cache
+    
+    Args:
+        pdf_file: Path to the PDF file
+        cache_dir: Cache directory
+        version: Parser version stamp (defaults to parser_version())
+        
+    Returns:
+        list: CompanyRecords, or None on a cache miss
+    """
+    path = _cache_path(pdf_file, cache_dir, version or parser_version())
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            companies = [CompanyRecord.from_mapping(company) for company in json.load(file)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    # Mark the entry as recently used for eviction
+    os.utime(path)
+    return companies
+
+def store_cached_companies(pdf_file, companies, cache_dir=CACHE_DIR, version=None,
+                           max_bytes=CACHE_MAX_BYTES):
+    """Store the parsed records of a PDF file in the cache
+    
+    The entry is written to a temporary file and renamed, so a crash never
+    leaves a truncated entry behind. The cache is then trimmed to max_bytes.
+    
+    Args:
+        pdf_file: Path to the PDF file
+        companies: CompanyRecords extracted from the file
+        cache_dir: Cache directory
+        version: Parser version stamp (defaults to parser_version())
+        max_bytes: Size limit of the cache directory
+    """
+    version = version or parser_version()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(pdf_file, cache_dir, version)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+        json.dump([dict(company) for company in companies], file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    evict_cache(cache_dir, version, max_bytes)
+
+def evict_cache(cache_dir=CACHE_DIR, version=None, max_bytes=CACHE_MAX_BYTES):
+    """Trim the cache directory
+    
+    Entries written by another parser version are removed first, then the
+    least recently used entries until the directory fits in max_bytes.
+    
+    Args:
+        cache_dir: Cache directory
+        version: Current parser version stamp (defaults to parser_version())
+        max_bytes: Size limit of the cache directory
+        
+    Returns:
+        int: Number of entries removed
+    """
+    version = version or parser_version()
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith('.json.gz'):
+            entries.append(entry)
+    
+    removed = 0
+    current = []
+    for entry in entries:
+        if entry.name.endswith(f"_{version}.json.gz"):
+            current.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+        else:
+            os.remove(entry.path)
+            removed += 1
+    
+    total = sum(size for _, size, _ in current)
+    for _, size, path in sorted(current):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+def read_error_text(page_number, message):
+    """Describe a read error of iter_page_companies()"""
+    if page_number is None:
+        return f"Read error: {message}"
+    return f"Read error on page {page_number + 1}: {message}"
+
+def iter_extracted_files(pdfs, workers=1, pages_per_task=PAGES_PER_TASK, cache_dir=CACHE_DIR,
+                         cache_max_bytes=CACHE_MAX_BYTES, backend=DEFAULT_BACKEND, layout=False,
+                         geometry=False):
+    """Extract the companies of each PDF file, reusing cached records
+    
+    Files whose content is in the cache are not parsed again; the others
+    are extracted serially or, with workers > 1, in parallel page ranges,
+    and stored in the cache. A file with a read error keeps the companies
+    of the pages before it but is not cached, so the next run extracts it
+    again.
+    
+    Args:
+        pdfs: PDF file paths
+        workers: Number of worker processes (1 for serial extraction)
+        pages_per_task: Pages per worker task
+        cache_dir: Cache directory, or None to bypass the cache
+        cache_max_bytes: Size limit of the cache directory
+        backend: Text extraction backend (see pdf_backends.py)
+        layout: Reassemble table rows wrapped on several lines
+        geometry: Parse the table from the text positions (parse_page_geometry())
+    
+    Yields:
+        tuple: (pdf_file, companies, elapsed seconds, source, errors) in the
+        order of pdfs, where source is 'cache', 'worker' or 'serial' and
+        errors the (page index, message) read errors of the file
+    """
+    version = parser_version(backend, layout, geometry)
+    cached = {}
+    if cache_dir is not None:
+        for pdf_file in pdfs:
+            file_started = time.perf_counter()
+            with METRICS.stage('cache.load'):
+                companies = load_cached_companies(pdf_file, cache_dir, version)
+            if companies is not None:
+                cached[pdf_file] = (companies, time.perf_counter() - file_started)
+                METRICS.count('cache.hits')
+            else:
+                METRICS.count('cache.misses')
+    
+    extracted = {}
+    misses = [pdf_file for pdf_file in pdfs if pdf_file not in cached]
+    if workers > 1 and misses:
+        per_file, timings, file_errors = extract_companies_parallel(misses, workers, pages_per_task, backend,
+                                                                    layout, geometry)
+        extracted = dict(zip(misses, zip(per_file, timings, file_errors)))
+    
+    for pdf_file in pdfs:
+        if pdf_file in cached:
+            companies, elapsed = cached[pdf_file]
+            yield pdf_file, companies, elapsed, 'cache', []
+            continue
+        
+        if pdf_file in extracted:
+            companies, elapsed, errors = extracted[pdf_file]
+            source = 'worker'
+        else:
+            file_started = time.perf_counter()
+            errors = []
+            companies = extract_companies_from_pdf(pdf_file, backend, layout, geometry, errors)
+            elapsed = time.perf_counter() - file_started
+            source = 'serial'
+        if errors:
+            METRICS.count('cache.skipped_failed')
+        elif cache_dir is not None:
+            with METRICS.stage('cache.store'):
+                store_cached_companies(pdf_file, companies, cache_dir, version, cache_max_bytes)
+        yield pdf_file, companies, elapsed, source, errors
+
+def load_phone_index(path):
+    """Load the phone index of --phone-index, or start an empty one if the file does not exist yet"""
+    if not os.path.exists(path):
+        return PhoneIndex()
+    try:
+        return PhoneIndex.load(path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def load_gazetteer(path):
+    """Load the gazetteer of --geocode"""
+    try:
+        return Gazetteer.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load the gazetteer: {e}")
+        sys.exit(1)
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Extract companies from the PDF files of the current directory."
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of worker processes (default: 1, serial extraction)"
+    )
+    parser.add_argument(
+        '--pages-per-task', type=int, default=PAGES_PER_TASK,
+        help=f"Pages per worker task when --workers > 1 (default: {PAGES_PER_TASK})"
+    )
+    parser.add_argument(
+        '--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+        help=f"Text extraction backend (default: {DEFAULT_BACKEND}; pdfium requires pypdfium2)"
+    )
+    parser.add_argument(
+        '--layout', action='store_true',
+        help="Reassemble the table rows whose cells wrap on several lines"
+    )
+    parser.add_argument(
+        '--geometry', action='store_true',
+        help="Parse the tables from the positions of the text: columns are detected "
+             "once per page and fields assigned by column instead of by keywords"
+    )
+    parser.add_argument(
+        '--cache-dir', default=CACHE_DIR,
+        help=f"Cache of parsed records keyed by PDF content (default: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        '--cache-max-mb', type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+        help="Size limit of the cache in MB, least recently used entries are evicted"
+    )
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not update the cache")
+    parser.add_argument(
+        '--fuzzy-dedup', action='store_true',
+        help="Also merge near-duplicate companies (accents, OCR spacing, same phone)"
+    )
+    parser.add_argument(
+        '--dedup-report', default='duplicate_clusters.csv', metavar='FILE',
+        help="CSV audit of the merged clusters with --fuzzy-dedup (default: duplicate_clusters.csv)"
+    )
+    parser.add_argument(
+        '--slug-snapshot', metavar='FILE',
+        help="CSV of slugs (slug[,name,ville]) already in the database, to avoid slug collisions"
+    )
+    parser.add_argument(
+        '--pages', type=parse_page_ranges, metavar='RANGES',
+        help="Pages to extract from each PDF, e.g. 1-100,250,900- (extracts page by page, without the cache)"
+    )
+    parser.add_argument(
+        '--checkpoint', nargs='?', const=CHECKPOINT_FILE, metavar='FILE',
+        help="Extract page by page and record the progress, to resume after a crash "
+             f"(default: {CHECKPOINT_FILE}); use with --external-sort to keep memory bounded"
+    )
+    parser.add_argument(
+        '--external-sort', type=int, nargs='?', const=SORT_BUFFER_RECORDS, metavar='RECORDS',
+        help="Dedup and sort on disk, holding at most RECORDS companies in memory "
+             f"(default: {SORT_BUFFER_RECORDS}), for directories larger than RAM"
+    )
+    parser.add_argument(
+        '--records', metavar='FILE',
+        help="Also write the companies to a compressed columnar record file, read by "
+             "categorize_companies.py and extract_companies.py without parsing SQL"
+    )
+    parser.add_argument(
+        '--normalize-phones', action='store_true',
+        help="Rewrite the phone numbers in canonical E.164 form (+221...)"
+    )
+    parser.add_argument(
+        '--phone-index', metavar='FILE',
+        help="Phone -> company index (JSON) updated with the companies written; companies it "
+             "already knows under another name (other file, earlier import) are merged into them"
+    )
+    parser.add_argument(
+        '--geocode', nargs='?', const=DEFAULT_GAZETTEER, metavar='GAZETTEER',
+        help="Also insert a primary \"CompanyLocation\" (region, department, city, lat/lng) for each "
+             "company, located from its ville and adresse with an offline gazetteer CSV "
+             f"(default: {os.path.basename(DEFAULT_GAZETTEER)})"
+    )
+    parser.add_argument(
+        '--load-dsn', metavar='DSN',
+        help="Load the companies into PostgreSQL with COPY instead of writing the SQL file"
+    )
+    add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function"""
+    args = parse_args(argv)
+    with run_report('extract_companies_from_pdfs', args.report, args.profile):
+        run(args)
+
+def run(args):
+    """Run the extraction with the parsed command line arguments"""
     print("="*60)
     print("Extracting Companies from PDF Files")
     print("="*60)
@@ -389,52 +1740,194 @@ def main():
     # Get all PDF files
     pdfs = sorted([f for f in os.listdir('.') if f.endswith('.pdf')])
     print(f"\nFound {len(pdfs)} PDF files")
+    if args.external_sort and args.fuzzy_dedup:
+        print("Error: --fuzzy-dedup compares all companies in memory and cannot be used with --external-sort.")
+        sys.exit(1)
+    if not backend_available(args.backend):
+        print(f"Error: --backend {args.backend} requires pypdfium2 (pip install pypdfium2)")
+        sys.exit(1)
+    if args.geometry and args.layout:
+        print("Error: --geometry reassembles the table rows itself and cannot be used with --layout.")
+        sys.exit(1)
+    page_by_page = args.pages is not None or args.checkpoint is not None
+    if page_by_page and args.workers > 1:
+        print("Error: --pages and --checkpoint extract page by page and cannot be used with --workers.")
+        sys.exit(1)
+    if args.records and args.load_dsn:
+        print("Error: --records is written with the SQL file and cannot be used with --load-dsn.")
+        sys.exit(1)
+    if args.phone_index and args.load_dsn:
+        print("Error: --phone-index is built from the SQL file rows and cannot be used with --load-dsn.")
+        sys.exit(1)
+    if args.geocode and args.load_dsn:
+        print("Error: --geocode is written with the SQL file and cannot be used with --load-dsn.")
+        sys.exit(1)
+    phone_index = load_phone_index(args.phone_index) if args.phone_index else None
+    geocoder = load_gazetteer(args.geocode) if args.geocode else None
     
-    # Extract companies from all PDFs
-    all_companies = []
-    for pdf_file in pdfs:
-        print(f"\nProcessing: {pdf_file}")
-        companies = extract_companies_from_pdf(pdf_file)
-        print(f"  Extracted: {len(companies)} companies")
-        all_companies.extend(companies)
-    
-    print(f"\n{'='*60}")
-    print(f"Total extracted: {len(all_companies)} companies")
-    print('='*60)
-    
-    # Show sample
-    print("\nSample companies:")
-    for i, company in enumerate(all_companies[:5], 1):
-        print(f"{i}. {company['name']} ({company['ville']})")
+    # Extract companies from all PDFs, reusing cached records of unchanged files
+    started = time.perf_counter()
+    if args.workers > 1:
+        print(f"Using {args.workers} worker processes")
+    sample = []
+    extracted = iter_extracted_files(
+        pdfs, args.workers, args.pages_per_task,
+        None if args.no_cache else args.cache_dir, args.cache_max_mb * 1024 * 1024,
+        args.backend, args.layout, args.geometry,
+    )
+    
+    checkpoint = (PageCheckpoint(args.checkpoint, args.pages, args.backend, args.layout, args.geometry)
+                  if args.checkpoint else None)
+    
+    def extracted_pages():
+        for pdf_file in pdfs:
+            print(f"\nProcessing: {pdf_file}")
+            file_started = time.perf_counter()
+            count = resumed = 0
+            pages = iter_checkpointed_pages(pdf_file, args.pages, checkpoint, args.backend, args.layout,
+                                            args.geometry)
+            for _, companies, source in pages:
+                count += len(companies)
+                resumed += source == 'checkpoint'
+                sample.extend(companies[:5 - len(sample)])
+                yield from companies
+            elapsed = time.perf_counter() - file_started
+            if resumed:
+                print(f"  Extracted: {count} companies ({elapsed:.2f}s, {resumed} pages from checkpoint)")
+            else:
+                print(f"  Extracted: {count} companies ({elapsed:.2f}s)")
+    
+    def extracted_companies():
+        for pdf_file, companies, elapsed, source, errors in extracted:
+            print(f"\nProcessing: {pdf_file}")
+            if source == 'cache':
+                print(f"  Extracted: {len(companies)} companies ({elapsed:.3f}s from cache)")
+            elif source == 'worker':
+                print(f"  Extracted: {len(companies)} companies ({elapsed:.2f}s worker time)")
+            else:
+                print(f"  Extracted: {len(companies)} companies ({elapsed:.2f}s)")
+            for page_number, message in errors:
+                print(f"  {read_error_text(page_number, message)}: not cached, extracted again on the next run")
+            sample.extend(companies[:5 - len(sample)])
+            yield from companies
+    
+    companies = extracted_pages() if page_by_page else extracted_companies()
+    if args.normalize_phones:
+        companies = normalize_company_phones(companies)
+    indexed_variants = []
+    if phone_index is not None:
+        from dedup_companies import skip_indexed_variants
         
-        # Show activity with ellipsis only if truncated
-        activity = company['activite']
-        if len(activity) > 60:
-            print(f"   Activity: {activity[:60]}...")
-        elif activity:
-            print(f"   Activity: {activity}")
+        companies = skip_indexed_variants(companies, phone_index, indexed_variants)
+    all_companies = None
+    try:
+        if args.external_sort:
+            # Companies go to the sorted runs on disk as they are extracted
+            all_companies = ExternalSortedCompanies(companies, args.external_sort)
+            total_extracted = all_companies.total
         else:
-            print(f"   Activity: (none)")
+            all_companies = list(companies)
+            total_extracted = len(all_companies)
+        if checkpoint is not None:
+            checkpoint.close()
+        METRICS.count('companies_extracted', total_extracted)
+        print(f"\nExtraction time: {time.perf_counter() - started:.2f}s")
+        strategies = strategy_counts()
+        if strategies:
+            print("Lines resolved by strategy: " + ', '.join(f"{name} {count}" for name, count in strategies.items()))
         
-        # Show address with ellipsis only if truncated
-        address = company['adresse']
-        if len(address) > 60:
-            print(f"   Address: {address[:60]}...")
-        elif address:
-            print(f"   Address: {address}")
-        else:
-            print(f"   Address: (none)")
+        print(f"\n{'='*60}")
+        print(f"Total extracted: {total_extracted} companies")
+        print('='*60)
+        
+        # Show sample
+        print("\nSample companies:")
+        for i, company in enumerate(sample, 1):
+            print(f"{i}. {company['name']} ({company['ville']})")
             
-        print(f"   Phone: {company['tel'] if company['tel'] else '(none)'}")
-        print()
-    
-    # Generate SQL file
-    output_file = generate_sql_file(all_companies)
-    
-    print(f"\n{'='*60}")
-    print("DONE!")
-    print(f"SQL file created: {output_file}")
-    print('='*60)
+            # Show activity with ellipsis only if truncated
+            activity = company['activite']
+            if len(activity) > 60:
+                print(f"   Activity: {activity[:60]}...")
+            elif activity:
+                print(f"   Activity: {activity}")
+            else:
+                print(f"   Activity: (none)")
+            
+            # Show address with ellipsis only if truncated
+            address = company['adresse']
+            if len(address) > 60:
+                print(f"   Address: {address[:60]}...")
+            elif address:
+                print(f"   Address: {address}")
+            else:
+                print(f"   Address: (none)")
+                
+            print(f"   Phone: {company['tel'] if company['tel'] else '(none)'}")
+            print()
+        
+        if args.fuzzy_dedup:
+            from dedup_companies import find_duplicate_clusters, merge_duplicates, write_cluster_report
+            
+            unique_companies = deduplicate_companies(all_companies)
+            with METRICS.stage('fuzzy_dedup'):
+                clusters, matches, stats = find_duplicate_clusters(unique_companies)
+                write_cluster_report(unique_companies, clusters, matches, args.dedup_report, stats['skipped'])
+                all_companies = merge_duplicates(unique_companies, clusters)
+            METRICS.count('fuzzy_dedup.candidate_pairs', stats['candidate_pairs'])
+            METRICS.count('fuzzy_dedup.dropped', len(unique_companies) - len(all_companies))
+            METRICS.count('fuzzy_dedup.split_blocks', stats['split_blocks'])
+            METRICS.count('fuzzy_dedup.skipped_blocks', stats['skipped_blocks'])
+            METRICS.count('fuzzy_dedup.skipped_records', stats['skipped_records'])
+            print(f"\nNear-duplicate detection: {stats['candidate_pairs']} candidate pairs, "
+                  f"{len(clusters)} clusters merged")
+            if stats['skipped_blocks']:
+                print(f"Blocks too large to compare: {stats['skipped_blocks']} "
+                      f"({stats['skipped_records']} companies, listed in the cluster report)")
+            print(f"Cluster report: {args.dedup_report}")
+        
+        if args.load_dsn:
+            # Bulk load into PostgreSQL
+            from load_companies_postgres import load_companies
+            
+            load_started = time.perf_counter()
+            try:
+                with METRICS.stage('postgres.load'):
+                    inserted, skipped = load_companies(all_companies, args.load_dsn)
+            except ImportError:
+                print("Error: --load-dsn requires psycopg2 (pip install psycopg2-binary)")
+                sys.exit(1)
+            
+            print(f"\n{'='*60}")
+            print("DONE!")
+            print(f"Companies inserted: {inserted}")
+            print(f"Companies skipped (slug already exists): {skipped}")
+            print(f"Load time: {time.perf_counter() - load_started:.2f}s")
+            print('='*60)
+            METRICS.count('rows_inserted', inserted)
+            METRICS.count('rows_skipped', skipped)
+            return
+        
+        # Generate SQL file
+        slugs = SlugAllocator.from_file(args.slug_snapshot) if args.slug_snapshot else None
+        output_file = generate_sql_file(all_companies, slugs=slugs, phone_index=phone_index, records_file=args.records,
+                                        geocoder=geocoder)
+        if phone_index is not None:
+            phone_index.save(args.phone_index)
+            METRICS.count('phone_index.merged', len(indexed_variants))
+            print(f"\nPhone index: {len(phone_index)} numbers ({args.phone_index}), "
+                  f"{len(indexed_variants)} companies merged into indexed companies")
+        if geocoder is not None:
+            print_geocode_counts()
+        
+        print(f"\n{'='*60}")
+        print("DONE!")
+        print(f"SQL file created: {output_file}")
+        print('='*60)
+    finally:
+        if isinstance(all_companies, ExternalSortedCompanies):
+            # Delete the sorted runs now rather than at garbage collection
+            all_companies.close()
 
 if __name__ == '__main__':
     main()
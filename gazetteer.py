@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Offline geocoding of company cities and addresses.
+
+The gazetteer is a CSV file of places (cities, quartiers, landmarks) with
+their region, department, city and coordinates; senegal_gazetteer.csv
+ships the cities of the directories and the main quartiers of Dakar, with
+approximate centroids:
+
+    name,kind,region,department,city,lat,lng,aliases
+    Point E,quartier,Dakar,Dakar,Dakar,14.6950,-17.4600,
+
+Place names are normalized (accents, case, punctuation) and stored in a
+character trie. The `ville` of a company is looked up in the trie (a
+truncated name is completed when only one place starts with it), and the
+`adresse` is scanned word by word for the longest place names it contains:
+
+    gazetteer = Gazetteer.load(DEFAULT_GAZETTEER)
+    gazetteer.geocode('Dakar', 'Rue 10, Point E')
+    -> {'region': 'Dakar', 'department': 'Dakar', 'city': 'Dakar',
+        'lat': 14.695, 'lng': -17.46, 'precision': 'quartier'}
+
+Results are cached per (ville, adresse), since the directories repeat the
+same addresses many times.
+"""
+
+import csv
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+from pipeline_metrics import METRICS
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'senegal_gazetteer.csv')
+
+GAZETTEER_COLUMNS = ['name', 'kind', 'region', 'department', 'city', 'lat', 'lng']
+
+# Place kinds, most specific first
+PLACE_KINDS = ['landmark', 'quartier', 'city']
+
+# Shortest truncated ville completed to the only place name starting with it
+PREFIX_MIN_CHARS = 4
+
+# Geocoded (ville, adresse) pairs kept in the cache
+GEOCODE_CACHE_ENTRIES = 100000
+
+Place = namedtuple('Place', ['name', 'kind', 'region', 'department', 'city', 'lat', 'lng'])
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def normalize_place_name(text):
+    """Return text without accents, lowercased, with words separated by single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', stripped.lower()).strip()
+
+class Gazetteer:
+    """Places indexed by normalized name in a character trie"""
+    
+    def __init__(self, places=()):
+        self.places = []
+        self._trie = {}
+        self._cache = {}
+        for place, aliases in places:
+            self.add(place, aliases)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load a gazetteer CSV file.
+        
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If a column is missing or a row is invalid
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            missing = [column for column in GAZETTEER_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+            gazetteer = cls()
+            for line, row in enumerate(reader, 2):
+                if row['kind'] not in PLACE_KINDS:
+                    raise ValueError(f"{path}:{line}: unknown kind {row['kind']!r}")
+                try:
+                    place = Place(row['name'], row['kind'], row['region'], row['department'], row['city'],
+                                  float(row['lat']), float(row['lng']))
+                except ValueError:
+                    raise ValueError(f"{path}:{line}: invalid coordinates") from None
+                aliases = [alias for alias in (row.get('aliases') or '').split('|') if alias.strip()]
+                gazetteer.add(place, aliases)
+        return gazetteer
+    
+    def add(self, place, aliases=()):
+        """Index a place under its name and aliases"""
+        self.places.append(place)
+        for name in [place.name, *aliases]:
+            node = self._trie
+            for char in normalize_place_name(name):
+                node = node.setdefault(char, {})
+            node.setdefault('', []).append(place)
+        self._cache.clear()
+    
+    def lookup(self, name, city=None):
+        """
+        Find a place by name.
+        
+        Args:
+            name: Place name as printed
+            city: Prefer the places of this city when the name is ambiguous
+        
+        Returns:
+            Place, or None. A name that is not in the gazetteer but starts
+            the name of exactly one place (at least PREFIX_MIN_CHARS
+            characters) gives that place.
+        """
+        key = normalize_place_name(name)
+        node = self._trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        if '' in node:
+            return self._pick(node[''], city)
+        if len(key) < PREFIX_MIN_CHARS:
+            return None
+        completions = self._completions(node, 2)
+        return completions[0] if len(completions) == 1 else None
+    
+    def find_in_text(self, text):
+        """
+        Find the place names in a text (e.g. an address).
+        
+        At each word, the longest place name starting there is taken and
+        the scan resumes after it.
+        
+        Returns:
+            list: Lists of the places sharing each name found, in text order
+        """
+        text = normalize_place_name(text)
+        found = []
+        start = 0
+        while start < len(text):
+            node = self._trie
+            match_end = None
+            position = start
+            while position < len(text):
+                node = node.get(text[position])
+                if node is None:
+                    break
+                position += 1
+                if '' in node and (position == len(text) or text[position] == ' '):
+                    match_end = position
+                    places = node['']
+            if match_end is not None:
+                found.append(places)
+                start = match_end + 1
+            else:
+                next_word = text.find(' ', start)
+                start = len(text) if next_word == -1 else next_word + 1
+        return found
+    
+    def geocode(self, ville, adresse=''):
+        """
+        Locate a company from its ville and adresse.
+        
+        The ville gives the city; a landmark, then a quartier of that city
+        named in the adresse gives more precise coordinates. Without a
+        known ville, the first city named in the adresse is used.
+        
+        Returns:
+            dict: region, department, city, lat, lng and precision (the
+            kind of place the coordinates come from), or None
+        """
+        key = (ville, adresse)
+        if key in self._cache:
+            location = self._cache[key]
+            METRICS.count('geocode.cache_hits')
+            METRICS.count(f"geocode.{location['precision'] if location else 'unmatched'}")
+            return location
+        
+        city = self.lookup(ville) if ville else None
+        city_name = city.city if city else None
+        mentioned = [self._pick(places, city_name) for places in self.find_in_text(adresse)] if adresse else []
+        if city is None:
+            city = next((place for place in mentioned if place.kind == 'city'), None)
+            city_name = city.city if city else None
+        
+        best = city
+        for place in mentioned:
+            if place.kind != 'city' and (city_name is None or place.city == city_name):
+                if best is None or PLACE_KINDS.index(place.kind) < PLACE_KINDS.index(best.kind):
+                    best = place
+        
+        location = None
+        if best is not None:
+            location = {
+                'region': best.region,
+                'department': best.department,
+                'city': city_name or best.city,
+                'lat': best.lat,
+                'lng': best.lng,
+                'precision': best.kind,
+            }
+        METRICS.count(f"geocode.{best.kind if best else 'unmatched'}")
+        
+        if len(self._cache) >= GEOCODE_CACHE_ENTRIES:
+            self._cache.clear()
+        self._cache[key] = location
+        return location
+    
+    def _pick(self, places, city):
+        """Return the place of the given city among homonyms (else the first one)"""
+        return next((place for place in places if place.city == city), places[0])
+    
+    def _completions(self, node, limit):
+        """Return up to `limit` places whose names continue from a trie node"""
+        found = []
+        stack = [node]
+        while stack and len(found) < limit:
+            current = stack.pop()
+            for char, child in current.items():
+                if char == '':
+                    found.extend(place for place in child if place not in found)
+                else:
+                    stack.append(child)
+        return found[:limit]
+    
+    def __len__(self):
+        return len(self.places)
+
+def geocode_counts():
+    """
+    Return the number of companies geocoded so far, by precision.
+    
+    Returns:
+        dict: Count by place kind, plus 'unmatched', for the non-zero counts
+    """
+    return {
+        name: METRICS.counters[f'geocode.{name}']
+        for name in [*PLACE_KINDS, 'unmatched']
+        if METRICS.counters[f'geocode.{name}']
+    }
+
+def print_geocode_counts():
+    """Print the geocoding summary"""
+    counts = geocode_counts()
+    total = sum(counts.values())
+    print(f"Geocoded: {total - counts.get('unmatched', 0)} of {total} companies"
+          + (" (" + ', '.join(f"{name} {count}" for name, count in counts.items()) + ")" if counts else ""))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Text extraction backends for the PDF directories.
+
+A backend opens a PDF file and returns the text lines of its pages, one
+page at a time:
+
+    with open_document(pdf_file, 'pdfium') as document:
+        for index in range(document.page_count):
+            lines = document.page_lines(index)
+
+page_fragments(index) returns the positioned text runs of a page
+instead, for the column-geometry parser.
+
+Backends:
+    pypdf2  PyPDF2 extract_text() (default, pure Python)
+    pdfium  PDFium through pypdfium2 (pip install pypdfium2), several
+            times faster and with text in reading order
+
+Both engines split the table rows whose cells wrap on several lines;
+see merge_wrapped_lines() in extract_companies_from_pdfs.py for the
+row reconstruction applied on top of any backend.
+"""
+
+import ctypes
+from importlib.metadata import PackageNotFoundError, version
+
+import PyPDF2
+
+try:
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pypdfium2 = None
+
+DEFAULT_BACKEND = 'pypdf2'
+
+# Text showing operators of a content stream (PDF 32000-1, table 107)
+TEXT_SHOWING_OPERATORS = {b'Tj', b'TJ', b"'", b'"'}
+
+def _concat_matrix(tm, cm):
+    """Return the text matrix tm in page space (tm x cm), as (a, b, c, d, e, f)"""
+    return (
+        tm[0] * cm[0] + tm[1] * cm[2],
+        tm[0] * cm[1] + tm[1] * cm[3],
+        tm[2] * cm[0] + tm[3] * cm[2],
+        tm[2] * cm[1] + tm[3] * cm[3],
+        tm[4] * cm[0] + tm[5] * cm[2] + cm[4],
+        tm[4] * cm[1] + tm[5] * cm[3] + cm[5],
+    )
+
+class PyPDF2Document:
+    """PDF file read with PyPDF2"""
+    
+    name = 'pypdf2'
+    
+    def __init__(self, pdf_file):
+        self._file = open(pdf_file, 'rb')
+        try:
+            self._reader = PyPDF2.PdfReader(self._file)
+            self.page_count = len(self._reader.pages)
+        except Exception:
+            self._file.close()
+            raise
+    
+    def page_lines(self, index):
+        """Return the text lines of a page"""
+        page = self._reader.pages[index]
+        text = page.extract_text()
+        self._release_page(page)
+        return text.split('\n')
+    
+    def page_fragments(self, index):
+        """
+        Return the positioned text runs of a page.
+        
+        PyPDF2 reports the text when it flushes its buffer, with the
+        position reached at that point, so the start of each run is taken
+        from the first text showing operator since the previous flush.
+        
+        Returns:
+            list: (x, y, dx, dy, text) tuples: start of the run in page
+            space, writing direction and text, in content stream order
+        """
+        page = self._reader.pages[index]
+        fragments = []
+        starts = []
+        
+        def before_operator(operator, operands, cm, tm):
+            if operator in TEXT_SHOWING_OPERATORS:
+                starts.append(_concat_matrix(tm, cm))
+        
+        def on_text(text, cm, tm, font_dict, font_size):
+            text = text.strip()
+            if text and starts:
+                a, b, _, _, x, y = starts[0]
+                fragments.append((x, y, a, b, text))
+                starts.clear()
+        
+        page.extract_text(visitor_operand_before=before_operator, visitor_text=on_text)
+        self._release_page(page)
+        return fragments
+    
+    def _release_page(self, page):
+        """Drop the parsed content streams of a page from the reader's object cache"""
+        contents = page.raw_get('/Contents') if '/Contents' in page else None
+        for ref in contents if isinstance(contents, PyPDF2.generic.ArrayObject) else [contents]:
+            if isinstance(ref, PyPDF2.generic.IndirectObject):
+                self._reader.resolved_objects.pop((ref.generation, ref.idnum), None)
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class PdfiumDocument:
+    """PDF file read with PDFium (pypdfium2)"""
+    
+    name = 'pdfium'
+    
+    def __init__(self, pdf_file):
+        if pypdfium2 is None:
+            raise ImportError("the pdfium backend requires pypdfium2 (pip install pypdfium2)")
+        self._pdf = pypdfium2.PdfDocument(pdf_file)
+        self.page_count = len(self._pdf)
+    
+    def page_lines(self, index):
+        """Return the text lines of a page"""
+        page = self._pdf[index]
+        textpage = page.get_textpage()
+        text = textpage.get_text_range()
+        textpage.close()
+        page.close()
+        return text.replace('\r\n', '\n').split('\n')
+    
+    def page_fragments(self, index):
+        """
+        Return the positioned text runs (text objects) of a page.
+        
+        Returns:
+            list: (x, y, dx, dy, text) tuples: start of the run in page
+            space, writing direction and text, in content stream order
+        """
+        page = self._pdf[index]
+        textpage = page.get_textpage()
+        fragments = []
+        for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_TEXT]):
+            size = pdfium_c.FPDFTextObj_GetText(obj.raw, textpage.raw, None, 0)
+            buffer = (ctypes.c_ushort * (size // 2))()
+            pdfium_c.FPDFTextObj_GetText(obj.raw, textpage.raw, buffer, size)
+            text = bytes(buffer).decode('utf-16-le').rstrip('\x00').strip()
+            if text:
+                a, b, _, _, x, y = obj.get_matrix().get()
+                fragments.append((x, y, a, b, text))
+        textpage.close()
+        page.close()
+        return fragments
+    
+    def close(self):
+        self._pdf.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+BACKENDS = {
+    'pypdf2': PyPDF2Document,
+    'pdfium': PdfiumDocument,
+}
+
+def open_document(pdf_file, backend=DEFAULT_BACKEND):
+    """
+    Open a PDF file with a text extraction backend.
+    
+    Args:
+        pdf_file: Path to the PDF file
+        backend: Backend name, a key of BACKENDS
+    
+    Returns:
+        Document with page_count, page_lines(index), page_fragments(index)
+        and close()
+    
+    Raises:
+        ImportError: If the engine of the backend is not installed
+    """
+    return BACKENDS[backend](pdf_file)
+
+def backend_available(backend):
+    """Return True if the engine of a backend is installed"""
+    return backend != 'pdfium' or pypdfium2 is not None
+
+def backend_version(backend):
+    """Return the name and engine version of a backend, e.g. 'pypdf2-3.0.1'"""
+    if backend == 'pypdf2':
+        return f"pypdf2-{PyPDF2.__version__}"
+    try:
+        return f"{backend}-{version('pypdfium2')}"
+    except PackageNotFoundError:
+        return backend
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Phone number normalization and phone -> company index.
+
+The directories print the same number in several ways ("33 821 00 00",
+"338210000", "0 338210000"). normalize_phone() turns them into one
+canonical E.164 form, +221 followed by the 9-digit national number, and
+phone_type() tells landlines (33, 30) from mobiles (7x):
+
+    normalize_phone('0 338210000')   -> '+221338210000'
+    phone_type('+221771234567')      -> 'mobile'
+
+PhoneIndex maps canonical numbers to the companies using them. It is
+saved as a JSON file keyed by number, so the dedup step and the backend
+look a number up in constant time instead of scanning `tel` with LIKE.
+It also lists every company written, with or without a valid number, so
+that a company seen again is recognized as itself:
+
+    {
+      "version": 1,
+      "phones": {
+        "+221338210000": {
+          "type": "landline",
+          "companies": [{"slug": "...", "name": "...", "ville": "..."}]
+        }
+      },
+      "companies": {"<slug>": ["<name>", "<ville>"]}
+    }
+"""
+
+import json
+import os
+import re
+
+COUNTRY_CODE = '221'
+NATIONAL_NUMBER_LENGTH = 9
+
+# First digits of the national number by line type
+LANDLINE_PREFIXES = ('33', '30')
+MOBILE_PREFIXES = ('7',)
+
+INDEX_VERSION = 1
+
+_NON_DIGITS = re.compile(r'\D')
+
+def normalize_phone(tel):
+    """
+    Return the canonical E.164 form of a Senegalese phone number.
+    
+    Separators are dropped, then the international prefix (00221 or 221)
+    or the trunk prefix 0 in front of a 9-digit national number.
+    
+    Args:
+        tel: Phone number as printed
+    
+    Returns:
+        str: '+221' and the 9-digit national number, or '' if tel is not
+        a valid number
+    """
+    digits = _NON_DIGITS.sub('', tel or '')
+    if len(digits) > NATIONAL_NUMBER_LENGTH:
+        for prefix in ('00' + COUNTRY_CODE, COUNTRY_CODE, '0'):
+            if len(digits) == len(prefix) + NATIONAL_NUMBER_LENGTH and digits.startswith(prefix):
+                digits = digits[len(prefix):]
+                break
+    if len(digits) != NATIONAL_NUMBER_LENGTH:
+        return ''
+    return f"+{COUNTRY_CODE}{digits}"
+
+def phone_type(tel):
+    """Return 'landline', 'mobile' or 'other' for a phone number ('' if it is not valid)"""
+    canonical = normalize_phone(tel)
+    if not canonical:
+        return ''
+    national = canonical[1 + len(COUNTRY_CODE):]
+    if national.startswith(LANDLINE_PREFIXES):
+        return 'landline'
+    if national.startswith(MOBILE_PREFIXES):
+        return 'mobile'
+    return 'other'
+
+class PhoneIndex:
+    """Canonical phone number -> companies using it"""
+    
+    def __init__(self, phones=None, companies=None):
+        self.phones = phones if phones is not None else {}
+        self.companies = companies if companies is not None else {}
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index file written by save().
+        
+        Raises:
+            ValueError: If the file is not a phone index of a supported version
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} phone index")
+        return cls(data['phones'], data.get('companies'))
+    
+    def add(self, tel, slug, name, ville):
+        """
+        Index a company under its phone number.
+        
+        The company is listed under its slug even without a valid number.
+        
+        Returns:
+            bool: False if tel is not a valid number (not indexed by number)
+        """
+        self.companies[slug] = [name, ville]
+        canonical = normalize_phone(tel)
+        if not canonical:
+            return False
+        entry = self.phones.get(canonical)
+        if entry is None:
+            entry = self.phones[canonical] = {'type': phone_type(canonical), 'companies': []}
+        if all(company['slug'] != slug for company in entry['companies']):
+            entry['companies'].append({'slug': slug, 'name': name, 'ville': ville})
+        return True
+    
+    def lookup(self, tel):
+        """Return the companies indexed under a phone number, in any printed form"""
+        entry = self.phones.get(normalize_phone(tel))
+        return entry['companies'] if entry else []
+    
+    def save(self, path):
+        """Write the index file (atomically, sorted by number)"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'phones': dict(sorted(self.phones.items())),
+                       'companies': dict(sorted(self.companies.items()))},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    
+    def __len__(self):
+        return len(self.phones)
+    
+    def __contains__(self, tel):
+        return normalize_phone(tel) in self.phones
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Stage timers, counters and run reports for the company import scripts.
+
+extract_companies_from_pdfs.py, categorize_companies.py and
+extract_companies.py record where their time goes in the process-wide
+METRICS collector:
+
+    with METRICS.stage('parse'):
+        ...
+    METRICS.count('lines_rejected.no_city')
+
+and wrap their main() in run_report(), which writes one JSON report per
+run with the stage timings, the counters, the peak RSS and, with
+--profile, the top functions of a cProfile capture.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Directory of the JSON reports when --report is not given
+REPORT_DIR = 'pipeline_reports'
+
+# Number of functions kept from a cProfile capture in the JSON report
+PROFILE_TOP = 25
+
+class Metrics:
+    """Stage timers and counters of one process"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Clear all timers and counters"""
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+    
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code under the given stage name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+            self.calls[name] += 1
+    
+    def add_time(self, name, seconds, calls=1):
+        """Add time measured by the caller to a stage"""
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+    
+    def count(self, name, n=1):
+        """Increment a counter"""
+        self.counters[name] += n
+    
+    def snapshot(self):
+        """Return the timers and counters as plain dicts (picklable, JSON-ready)"""
+        return {
+            'seconds': dict(self.seconds),
+            'calls': dict(self.calls),
+            'counters': dict(self.counters),
+        }
+    
+    def merge(self, snapshot):
+        """Add a snapshot taken in another process (e.g. a worker)"""
+        self.seconds.update(snapshot['seconds'])
+        self.calls.update(snapshot['calls'])
+        self.counters.update(snapshot['counters'])
+
+# Process-wide collector used by the pipeline scripts
+METRICS = Metrics()
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of this process and of its finished
+    child processes, in MB.
+    
+    Returns:
+        dict: {'self': MB, 'children': MB}, or None values where unavailable
+    """
+    if resource is None:
+        return {'self': None, 'children': None}
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+def add_report_arguments(parser):
+    """Add the --report and --profile options to an argparse parser"""
+    parser.add_argument(
+        '--report', metavar='FILE',
+        help=f"JSON run report to write (default: {REPORT_DIR}/<script>_<timestamp>.json)"
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Profile the run with cProfile (<report>.prof plus top functions in the report)"
+    )
+
+def _profile_top(profiler):
+    """Return the top functions of a cProfile capture by cumulative time"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative')
+    top = []
+    for func in stats.fcn_list[:PROFILE_TOP]:
+        calls, primitive_calls, total_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        top.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'tottime': round(total_time, 6),
+            'cumtime': round(cumulative_time, 6),
+        })
+    return top
+
+@contextmanager
+def run_report(script, report_file=None, profile=False, metrics=METRICS):
+    """
+    Collect the metrics of a script run and write them as a JSON report.
+    
+    The report is written when the block exits, including on errors and
+    sys.exit(), and has this shape:
+        {"script", "started_at", "elapsed_seconds", "status",
+         "stages": {name: {"seconds", "calls"}}, "counters": {...},
+         "peak_rss_mb": {"self", "children"}, "profile": [...]}
+    
+    Args:
+        script: Name of the script, stored in the report
+        report_file: Path of the JSON report (default: REPORT_DIR/<script>_<timestamp>.json)
+        profile: Capture a cProfile profile of the block
+        metrics: Metrics collector to report
+    
+    Yields:
+        Metrics: The collector
+    """
+    started_at = datetime.now()
+    if report_file is None:
+        report_file = os.path.join(REPORT_DIR, f"{script}_{started_at.strftime('%Y%m%d_%H%M%S')}.json")
+    
+    metrics.reset()
+    profiler = cProfile.Profile() if profile else None
+    status = 'error'
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+        status = 'ok'
+    except SystemExit as e:
+        status = 'ok' if not e.code else f"exit {e.code}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+        
+        snapshot = metrics.snapshot()
+        report = {
+            'script': script,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed, 6),
+            'status': status,
+            'stages': {
+                name: {'seconds': round(seconds, 6), 'calls': snapshot['calls'].get(name, 0)}
+                for name, seconds in sorted(snapshot['seconds'].items())
+            },
+            'counters': dict(sorted(snapshot['counters'].items())),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if profiler:
+            profile_file = os.path.splitext(report_file)[0] + '.prof'
+            report['profile_file'] = profile_file
+            report['profile'] = _profile_top(profiler)
+        
+        os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+        if profiler:
+            profiler.dump_stats(profile_file)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Run report: {report_file}")
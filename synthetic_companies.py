@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Synthetic company directory generator for benchmarks.
+
+Produces lines in the layout of the directory PDFs:
+
+    Ville Entreprise Activité Adresse Tel
+
+built from the SENEGALESE_CITIES, ADDRESS_KEYWORDS and ACTIVITY_KEYWORDS
+vocabularies of extract_companies_from_pdfs.py, with a share of duplicate
+companies (exact and near-duplicates) and of noise lines (column headers,
+page footers, wrapped lines) so that every stage of the pipeline has
+realistic work to do. The same seed always gives the same lines.
+
+Usage:
+    python synthetic_companies.py --count 100000 --output synthetic_lines.txt
+    python synthetic_companies.py --count 10000 --pdf synthetic_companies.pdf
+"""
+
+import argparse
+import random
+import sys
+import unicodedata
+import zlib
+
+from extract_companies_from_pdfs import ACTIVITY_KEYWORDS, ADDRESS_KEYWORDS, SENEGALESE_CITIES
+
+# Share of the companies located in Dakar (as in the bundled directories)
+DAKAR_SHARE = 0.6
+
+# Share of the companies that repeat an earlier one (exact or near-duplicate)
+DUPLICATE_RATE = 0.05
+
+# Noise lines per company line
+NOISE_RATE = 0.03
+
+# Share of the companies without activity, address or phone
+MISSING_ACTIVITY_RATE = 0.1
+MISSING_ADDRESS_RATE = 0.15
+MISSING_PHONE_RATE = 0.1
+
+# Lines per page when rendering to PDF
+LINES_PER_PAGE = 60
+
+# Company name vocabulary (no address or activity keyword, so that lines
+# split back into the same fields)
+NAME_WORDS = [
+    'Ndiaye', 'Diop', 'Fall', 'Sow', 'Ba', 'Sarr', 'Gueye', 'Thiam', 'Faye', 'Diallo',
+    'Mbaye', 'Cisse', 'Kane', 'Niang', 'Seck', 'Toure', 'Sy', 'Wade', 'Camara', 'Dieng',
+    'Africa', 'Sahel', 'Teranga', 'Baobab', 'Atlantique', 'Prestige', 'Global', 'Espoir',
+    'Horizon', 'Soleil', 'Delta', 'Etoile', 'Lumiere', 'Avenir', 'Elite', 'Excellence',
+    'Société', 'Générale', 'Sénégalaise', 'Entreprise', 'Groupe', 'Cabinet', 'Atelier',
+    'Boulangerie', 'Librairie', 'Quincaillerie', 'Garage', 'Clinique', 'Maison', 'Comptoir',
+    'Freres', 'Fils', 'Associes', 'Partners', 'Technologies', 'Consulting', 'Multi', 'Digital',
+]
+LEGAL_FORMS = ['Sarl', 'Sa', 'Suarl', 'Gie', 'Sas', '- Sarl', '- Sa']
+
+# Activity complements (keyword-free) following an ACTIVITY_KEYWORDS entry
+ACTIVITY_COMPLEMENTS = [
+    'De Produits Pharmaceutiques', 'General', 'De Materiaux', 'Alimentaire', 'De Pieces Detachees',
+    'Informatiques', 'De Marchandises', 'Et Conseil', 'De Vehicules', 'Immobiliere',
+    'De Boissons', 'Maritime', 'De Textiles', 'Et Logistique', 'De Fournitures De Bureau',
+    'Agricole', 'De Batiment', 'Touristique', 'Et Nettoyage', 'De Quincaillerie',
+]
+
+# Street names following an ADDRESS_KEYWORDS entry
+STREET_NAMES = [
+    'Blaise Diagne', 'Lamine Gueye', 'Pompidou', 'Jean Jaures', 'Carnot', 'Malick Sy',
+    'De La Republique', 'Bourguiba', 'Cheikh Anta Diop', 'Des Almadies', 'Mermoz',
+    'Sacre Coeur', 'Liberte 6', 'Hlm Grand Yoff', 'Medina', 'Escale', 'Du Port', 'De Ouakam',
+    'Fann Residence', 'Point E', 'Sicap Baobab', 'Hann Maristes', 'Yoff Virage', 'Pikine',
+]
+
+HEADER_LINE = 'Ville Entreprise Activité Adresse Tel'
+
+def _pick_city(rng):
+    if rng.random() < DAKAR_SHARE:
+        return 'Dakar'
+    return rng.choice(SENEGALESE_CITIES)
+
+def _make_name(rng):
+    words = rng.sample(NAME_WORDS, rng.randint(1, 3))
+    if rng.random() < 0.4:
+        words.append(rng.choice(LEGAL_FORMS))
+    return ' '.join(words)
+
+def _make_phone(rng):
+    if rng.random() < 0.6:
+        return f"33 8{rng.randint(0, 99):02d} {rng.randint(0, 99):02d} {rng.randint(0, 99):02d}"
+    return (f"7{rng.choice('05678')} {rng.randint(0, 999):03d} "
+            f"{rng.randint(0, 99):02d} {rng.randint(0, 99):02d}")
+
+def make_company(rng):
+    """
+    Draw one random company.
+    
+    Args:
+        rng: random.Random instance
+    
+    Returns:
+        dict: Company with ville, name, activite, adresse and tel
+    """
+    activite = ''
+    if rng.random() >= MISSING_ACTIVITY_RATE:
+        activite = f"{rng.choice(ACTIVITY_KEYWORDS)} {rng.choice(ACTIVITY_COMPLEMENTS)}"
+    adresse = ''
+    if rng.random() >= MISSING_ADDRESS_RATE:
+        adresse = f"{rng.choice(ADDRESS_KEYWORDS)} {rng.choice(STREET_NAMES)}"
+    tel = _make_phone(rng) if rng.random() >= MISSING_PHONE_RATE else ''
+    return {
+        'ville': _pick_city(rng),
+        'name': _make_name(rng),
+        'activite': activite,
+        'adresse': adresse,
+        'tel': tel,
+    }
+
+def make_variant(rng, company):
+    """
+    Return a duplicate of a company: the same record, or a copy whose name
+    differs by case, accents or OCR letter spacing.
+    """
+    variant = dict(company)
+    kind = rng.randrange(4)
+    if kind == 1:
+        variant['name'] = company['name'].upper()
+    elif kind == 2:
+        variant['name'] = unicodedata.normalize('NFKD', company['name']).encode('ascii', 'ignore').decode('ascii')
+    elif kind == 3:
+        first, _, rest = company['name'].partition(' ')
+        variant['name'] = ' '.join([' '.join(first)] + ([rest] if rest else []))
+    return variant
+
+def format_company_line(company):
+    """Render a company as one directory line: Ville Entreprise Activité Adresse Tel"""
+    fields = [company['ville'], company['name'], company['activite'], company['adresse'], company['tel']]
+    return ' '.join(field for field in fields if field)
+
+def _noise_line(rng, line_number):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return HEADER_LINE
+    if kind == 1:
+        return f"Page {line_number // LINES_PER_PAGE + 1}"
+    # Activity wrapped onto its own line
+    return f"{rng.choice(ACTIVITY_COMPLEMENTS)} Et {rng.choice(ACTIVITY_COMPLEMENTS)}"
+
+def generate_companies(count, seed=0, duplicate_rate=DUPLICATE_RATE):
+    """
+    Generate synthetic companies.
+    
+    Args:
+        count: Number of companies
+        seed: Random seed
+        duplicate_rate: Share of companies repeating an earlier one
+    
+    Yields:
+        dict: Company with ville, name, activite, adresse and tel
+    """
+    rng = random.Random(seed)
+    # Duplicates are drawn from a bounded pool of recent companies
+    recent = []
+    for _ in range(count):
+        if recent and rng.random() < duplicate_rate:
+            company = make_variant(rng, rng.choice(recent))
+        else:
+            company = make_company(rng)
+            if len(recent) < 1000:
+                recent.append(company)
+            else:
+                recent[rng.randrange(len(recent))] = company
+        yield company
+
+def generate_lines(count, seed=0, duplicate_rate=DUPLICATE_RATE, noise_rate=NOISE_RATE):
+    """
+    Generate synthetic directory lines.
+    
+    Args:
+        count: Number of company lines
+        seed: Random seed
+        duplicate_rate: Share of companies repeating an earlier one
+        noise_rate: Noise lines per company line
+    
+    Yields:
+        str: Directory lines, noise included
+    """
+    noise_rng = random.Random(seed + 1)
+    for line_number, company in enumerate(generate_companies(count, seed, duplicate_rate)):
+        if noise_rng.random() < noise_rate:
+            yield _noise_line(noise_rng, line_number)
+        yield format_company_line(company)
+
+def _pdf_string(text):
+    """Encode text as a PDF literal string in WinAnsiEncoding"""
+    data = text.encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def write_pdf(lines, output_file, lines_per_page=LINES_PER_PAGE):
+    """
+    Render lines to a simple PDF, one text line per directory line.
+    
+    The file is written without any PDF library: Helvetica text with one
+    content stream per page, which PyPDF2 extracts back line by line.
+    
+    Args:
+        lines: Iterable of text lines
+        output_file: Path to the PDF file
+        lines_per_page: Lines per page
+    
+    Returns:
+        int: Number of pages written
+    """
+    # Objects 1-3 are the catalog, the page tree and the font; each page
+    # then takes two objects (page, content stream)
+    offsets = {}
+    page_ids = []
+    
+    with open(output_file, 'wb') as pdf:
+        def write_object(object_id, body):
+            offsets[object_id] = pdf.tell()
+            pdf.write(f"{object_id} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+        
+        pdf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        
+        def write_page(page_lines):
+            page_id = 4 + 2 * len(page_ids)
+            text = [b"BT /F1 8 Tf 10 TL 30 810 Td"]
+            for line in page_lines:
+                text.append(_pdf_string(line) + b" Tj T*")
+            text.append(b"ET")
+            stream = zlib.compress(b"\n".join(text))
+            write_object(page_id + 1, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream)
+                         + stream + b"\nendstream")
+            write_object(page_id, (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                   b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)))
+            page_ids.append(page_id)
+        
+        page_lines = []
+        for line in lines:
+            page_lines.append(line)
+            if len(page_lines) == lines_per_page:
+                write_page(page_lines)
+                page_lines = []
+        if page_lines or not page_ids:
+            write_page(page_lines)
+        
+        kids = b' '.join(b"%d 0 R" % page_id for page_id in page_ids)
+        write_object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        
+        size = max(offsets) + 1
+        xref_offset = pdf.tell()
+        pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for object_id in range(1, size):
+            pdf.write(b"%010d 00000 n \n" % offsets[object_id])
+        pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset))
+    
+    return len(page_ids)
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Generate synthetic company directory lines.")
+    parser.add_argument('--count', type=int, default=10000, help="Number of companies (default: 10000)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        '--duplicate-rate', type=float, default=DUPLICATE_RATE,
+        help=f"Share of duplicate companies (default: {DUPLICATE_RATE})"
+    )
+    parser.add_argument(
+        '--noise-rate', type=float, default=NOISE_RATE,
+        help=f"Noise lines per company line (default: {NOISE_RATE})"
+    )
+    parser.add_argument('--output', help="Text file of the lines (default: standard output)")
+    parser.add_argument('--pdf', metavar='FILE', help="Also render the lines to a PDF file")
+    parser.add_argument(
+        '--lines-per-page', type=int, default=LINES_PER_PAGE,
+        help=f"Lines per PDF page (default: {LINES_PER_PAGE})"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    lines = list(generate_lines(args.count, args.seed, args.duplicate_rate, args.noise_rate))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in lines)
+        print(f"{len(lines)} lines written to {args.output}")
+    elif not args.pdf:
+        sys.stdout.writelines(line + '\n' for line in lines)
+    
+    if args.pdf:
+        pages = write_pdf(lines, args.pdf, args.lines_per_page)
+        print(f"{pages} pages written to {args.pdf}")
+
+if __name__ == '__main__':
+    main()
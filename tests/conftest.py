@@ -0,0 +1,84 @@
+"""Shared fixtures of the import script tests"""
+
+import glob
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The import scripts are top-level modules of the repository
+sys.path.insert(0, REPO_DIR)
+
+@pytest.fixture(scope='session')
+def pdf_files():
+    """The PDF directories bundled with the repository"""
+    pdfs = sorted(glob.glob(os.path.join(REPO_DIR, '*.pdf')))
+    if not pdfs:
+        pytest.skip("no bundled PDF files")
+    return pdfs
+
+@pytest.fixture(scope='session')
+def pdf_companies(pdf_files):
+    """Companies parsed from the bundled PDF files, in file order"""
+    from extract_companies_from_pdfs import extract_companies_from_pdf
+    
+    companies = []
+    for pdf_file in pdf_files:
+        companies.extend(extract_companies_from_pdf(pdf_file))
+    return companies
+
+@pytest.fixture(scope='session')
+def sql_file():
+    """The companies_from_pdfs.sql bundled with the repository"""
+    path = os.path.join(REPO_DIR, 'companies_from_pdfs.sql')
+    if not os.path.exists(path):
+        pytest.skip("no bundled companies_from_pdfs.sql")
+    return path
+
+@pytest.fixture(scope='session')
+def sql_rows(sql_file):
+    """(name, activite) pairs of the bundled companies_from_pdfs.sql"""
+    from benchmark_pipeline import load_sql_rows
+    
+    return load_sql_rows(sql_file)
+
+@pytest.fixture(scope='session')
+def fuzzed_rows():
+    """
+    (name, activite) pairs built from keyword words and their near misses.
+    
+    The words are taken from the built-in keywords and mixed with accents,
+    case changes, plurals, prefixes and punctuation around word boundaries,
+    with a fixed seed.
+    """
+    import random
+    import re
+    
+    from categorize_companies import CATEGORIES
+    
+    rng = random.Random(2024)
+    words = []
+    for category in CATEGORIES.values():
+        for keyword in category['keywords']:
+            words.extend(keyword.replace(r'\b', '').split())
+    words += ['sarl', 'dakar', 'ets', 'et', 'fils', 'de', 'la', 'du', 'import', 'export', '']
+    decorations = [
+        lambda word: word,
+        lambda word: word.upper(),
+        lambda word: word.capitalize(),
+        lambda word: word + 's',
+        lambda word: 'x' + word,
+        lambda word: word[:-1],
+        lambda word: word + '-' + rng.choice(words),
+        lambda word: "l'" + word,
+        lambda word: '(' + word + ')',
+        lambda word: re.sub('[eé]', rng.choice(['e', 'é', 'è', 'É']), word),
+    ]
+    
+    def text():
+        parts = [rng.choice(decorations)(rng.choice(words)) for _ in range(rng.randint(0, 5))]
+        return rng.choice([' ', '  ', ' - ', ', ', '.']).join(parts)
+    
+    return [(text(), text()) for _ in range(20000)]
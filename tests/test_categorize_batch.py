@@ -0,0 +1,70 @@
+"""Batch categorization against the company-by-company categorizer"""
+
+import pytest
+
+import categorize_companies
+from categorize_companies import DEFAULT_CATEGORY, categorize_batch, categorize_company
+from category_rules import builtin_rules, rules_from_rows
+
+# Category tree with nested, multi-word and accented keywords, and an id beyond int8
+RULE_ROWS = [
+    (2, '', 'Restaurants', 'restaurant'),
+    (2, '', 'Restaurants', 'café'),
+    (21, 2, 'Restaurants rapides', 'fast food'),
+    (21, 2, 'Restaurants rapides', 'restaurant rapide'),
+    (5, '', 'Santé', 'pharmacie'),
+    (5, '', 'Santé', 'cabinet'),
+    (51, 5, 'Dentistes', 'cabinet dentaire'),
+    (300, '', 'Transport', 'transport'),
+    (300, '', 'Transport', "l'auto"),
+    (301, 300, 'Transit', 'transit'),
+    (9, '', 'Sans mot-clé', ''),
+]
+
+FIXED_ROWS = [
+    ('Restaurant Rapide Chez Fatou', ''),
+    ('Cabinet Dentaire du Plateau', 'Cabinet'),
+    ('Transports et Transit', 'Fast Food'),
+    ('CAFE DE ROME', 'Pharmacie'),
+    ("Ecole de l'Auto", ''),
+    ('İstanbul Döner', 'restaurant'),
+    ('Garage\x00Moderne', 'Restaurant'),
+    ('', ''),
+]
+
+@pytest.fixture(params=['builtin', 'builtin rules', 'loaded rules'])
+def rules(request):
+    if request.param == 'builtin rules':
+        categorize_companies.use_rules(builtin_rules().prepare(cache_dir=None))
+    elif request.param == 'loaded rules':
+        categorize_companies.use_rules(rules_from_rows(RULE_ROWS, default_category=DEFAULT_CATEGORY)
+                                       .prepare(cache_dir=None))
+    yield request.param
+    categorize_companies.use_rules(None)
+
+def assert_same_categories(rows):
+    names = [name for name, _ in rows]
+    activites = [activite for _, activite in rows]
+    expected = [categorize_company(name, activite) for name, activite in rows]
+    
+    category_ids, evidence = categorize_batch(names, activites)
+    
+    assert [int(category_id) for category_id in category_ids] == expected
+    assert [keyword == '' for keyword in evidence] == [category_id == DEFAULT_CATEGORY for category_id in expected]
+
+def test_fixed_companies(rules):
+    assert_same_categories(FIXED_ROWS)
+
+def test_bundled_companies(rules, sql_rows):
+    assert_same_categories(sql_rows)
+
+def test_fuzzed_companies(rules, fuzzed_rows):
+    assert_same_categories(fuzzed_rows)
+
+def test_category_ids_beyond_int8(rules):
+    category_ids, _ = categorize_batch(['Transit Express'], [''])
+    
+    if rules == 'loaded rules':
+        assert list(category_ids) == [301]
+    else:
+        assert list(category_ids) == [DEFAULT_CATEGORY]
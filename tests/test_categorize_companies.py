@@ -0,0 +1,59 @@
+"""Compiled keyword matcher against the previous one-search-per-keyword categorizer, and SQL line grouping"""
+
+import pytest
+
+from benchmark_pipeline import legacy_categorize_company
+from categorize_companies import categorize_company, iter_sql_lines, process_sql_file, process_sql_file_streaming
+
+@pytest.mark.parametrize('name, activite, category_id', [
+    ('Pharmacie du Rond Point', '', 5),
+    ('Restaurant Le Ngor', 'Hotel', 2),
+    ('Hotel Restaurant Le Lagon', '', 2),
+    ('Clinique', 'Banque', 5),
+    ('Caisse Populaire', 'Credit', 1),
+    ('SENELEC', 'Electricite', 3),
+    ('Barre et Fils', 'Quincaillerie', 6),
+    ('Hôtellerie du Fleuve', '', 4),
+    ('', '', 6),
+])
+def test_fixed_companies(name, activite, category_id):
+    assert legacy_categorize_company(name, activite) == category_id
+    assert categorize_company(name, activite) == category_id
+
+def test_bundled_companies(sql_rows):
+    assert [categorize_company(n, a) for n, a in sql_rows] == [legacy_categorize_company(n, a) for n, a in sql_rows]
+
+def test_fuzzed_companies(fuzzed_rows):
+    assert ([categorize_company(n, a) for n, a in fuzzed_rows]
+            == [legacy_categorize_company(n, a) for n, a in fuzzed_rows])
+
+@pytest.mark.parametrize('lines', [
+    ["INSERT INTO \"Company\" (name) VALUES -- l'import\n", "  ('Chez Tonton'),\n", "  ('Garage');\n"],
+    ["/* l'import\n", "   d'hier */ INSERT INTO \"Company\" (name) VALUES\n", "  ('L''Etoile');\n"],
+    ["  ('Boutique', 'l''entree -- /* ', ''),\n", "  ('Garage', '', '');\n"],
+])
+def test_apostrophes_outside_strings_do_not_join_lines(lines):
+    assert list(iter_sql_lines(lines)) == lines
+
+def test_string_spanning_lines_is_joined():
+    lines = ["  ('Boutique', 'Vente\n", "de tissus -- l''atelier\n", "Marche', ''), -- l'import\n", "  ('Garage');\n"]
+    
+    assert list(iter_sql_lines(lines)) == [''.join(lines[:3]), lines[3]]
+
+def test_streaming_with_apostrophes_in_comments(tmp_path, monkeypatch, sql_file):
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    content = content.replace(' VALUES\n', " VALUES -- l'import\n", 1)
+    # One row at a time, not the rest of the file after the comment
+    assert max(len(chunk) for chunk in iter_sql_lines(content.splitlines(keepends=True))) < 1000
+    source = tmp_path / 'companies.sql'
+    source.write_text(content, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    
+    assert process_sql_file_streaming(str(source), 'streaming.sql') == process_sql_file(str(source), 'in_memory.sql')
+    
+    def content_of(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line for line in f if not line.startswith('-- Generated:')]
+    
+    assert content_of('streaming.sql') == content_of('in_memory.sql')
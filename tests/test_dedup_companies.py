@@ -0,0 +1,95 @@
+"""Near-duplicate detection: blocking, oversized blocks, the audit CSV and the phone index"""
+
+import csv
+import random
+import string
+
+from dedup_companies import MAX_BLOCK_SIZE, find_duplicate_clusters, skip_indexed_variants, write_cluster_report
+from extract_companies_from_pdfs import CompanyRecord, deduplicate_companies, index_company_row, iter_company_values
+from phone_numbers import PhoneIndex
+
+SWITCHBOARD = '33 839 55 00'
+
+def random_name(rng):
+    return ' '.join(''.join(rng.choice(string.ascii_lowercase) for _ in range(8)) for _ in range(2))
+
+def test_oversized_phone_block_is_split_by_ville():
+    rng = random.Random(0)
+    companies = [CompanyRecord('Dakar', random_name(rng), '', '', SWITCHBOARD) for _ in range(60)]
+    companies += [CompanyRecord('Thies', random_name(rng), '', '', SWITCHBOARD) for _ in range(30)]
+    # Similar enough to merge on a shared phone only (0.4 <= similarity < 0.7)
+    companies += [CompanyRecord('Thies', 'Garage Moderne du Cayor', '', '', SWITCHBOARD),
+                  CompanyRecord('Thies', 'Garage Moderne', '', '', SWITCHBOARD)]
+    assert len(companies) > MAX_BLOCK_SIZE
+    
+    clusters, matches, stats = find_duplicate_clusters(companies)
+    
+    assert clusters == [[90, 91]]
+    assert matches[91][0] == 90 and matches[91][2] == 'phone'
+    assert stats['split_blocks'] == 1
+    assert stats['skipped_blocks'] == stats['skipped_records'] == 0
+
+def test_same_name_and_city_merged_at_any_block_size():
+    companies = [CompanyRecord('Dakar', 'Boutique', '', f'Rue {i}', '') for i in range(3 * MAX_BLOCK_SIZE)]
+    
+    clusters, _, stats = find_duplicate_clusters(companies)
+    
+    assert clusters == [list(range(len(companies)))]
+    assert stats['skipped_blocks'] == 0
+
+def test_unsplittable_block_is_counted_and_reported(tmp_path):
+    # Names lost to OCR: nothing to split the switchboard block on
+    companies = [CompanyRecord('Dakar', '-', '', f'Rue {i}', SWITCHBOARD) for i in range(MAX_BLOCK_SIZE + 10)]
+    companies.append(CompanyRecord('Dakar', 'Sonatel', '', '', ''))
+    
+    clusters, matches, stats = find_duplicate_clusters(companies)
+    report = tmp_path / 'clusters.csv'
+    write_cluster_report(companies, clusters, matches, str(report), stats['skipped'])
+    
+    assert clusters == []
+    assert stats['skipped_blocks'] == 1
+    assert stats['skipped_records'] == MAX_BLOCK_SIZE + 10
+    with open(report, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == MAX_BLOCK_SIZE + 10
+    assert {row['cluster'] for row in rows} == {'skipped-1'}
+    assert rows[0]['reason'] == 'phone block too large'
+
+def import_run(companies, index_path):
+    """One import with --phone-index: returns the companies merged into indexed ones"""
+    index = PhoneIndex.load(str(index_path)) if index_path.exists() else PhoneIndex()
+    merged = []
+    kept = list(skip_indexed_variants(companies, index, merged))
+    for row in iter_company_values(deduplicate_companies(kept)):
+        index_company_row(index, row)
+    index.save(str(index_path))
+    return merged
+
+def test_variant_of_an_indexed_company_is_merged(tmp_path):
+    index_path = tmp_path / 'phones.json'
+    import_run([CompanyRecord('Thies', 'Total Clemenceau Thies (Catherine Gomis)', '', '', '33 951 30 71')],
+               index_path)
+    
+    merged = import_run([CompanyRecord('Thies', 'Total Clemenceau (Catherine Gomis)', '', '', '339513071')],
+                        index_path)
+    
+    assert [entry['slug'] for _, entry in merged] == ['total-clemenceau-thies-catherine-gomis']
+
+def test_company_indexed_under_its_own_slug_is_not_a_variant(tmp_path):
+    # Printed twice: the copy kept by the exact dedup has no phone, the
+    # other one has the number of a similar company
+    companies = [
+        CompanyRecord('Thies', 'Total Clemenceau Thies (Binta Mbaye)', '', '', ''),
+        CompanyRecord('Thies', 'Total Clemenceau Thies (Catherine Gomis)', '', '', '33 951 30 71'),
+        CompanyRecord('Thies', 'Total Clemenceau Thies (Binta Mbaye)', '', '', '33 951 30 71'),
+    ]
+    index_path = tmp_path / 'phones.json'
+    
+    assert import_run(companies, index_path) == []
+    assert import_run(companies, index_path) == []
+
+def test_rerun_on_the_same_pdfs_merges_nothing(tmp_path, pdf_companies):
+    index_path = tmp_path / 'phones.json'
+    
+    assert import_run(pdf_companies, index_path) == []
+    assert import_run(pdf_companies, index_path) == []
@@ -0,0 +1,106 @@
+"""External merge sort dedup against the in-memory dedup"""
+
+import os
+import tempfile
+
+import pytest
+
+from benchmark_pipeline import legacy_deduplicate_companies
+from company_pipeline import run_pipeline
+from external_sort import MERGE_FAN_IN
+from extract_companies_from_pdfs import (CompanyRecord, ExternalSortedCompanies, deduplicate_companies,
+                                         generate_sql_file)
+from synthetic_companies import generate_companies
+
+def as_dicts(companies):
+    return [dict(company) for company in companies]
+
+@pytest.fixture(scope='module')
+def synthetic():
+    # 20% repeats, some differing from the first copy by name case only
+    return [CompanyRecord.from_mapping(company) for company in generate_companies(20000, seed=3, duplicate_rate=0.2)]
+
+def test_first_copy_of_each_key_is_kept(tmp_path):
+    companies = [
+        CompanyRecord('Dakar', 'Garage Moderne', '', 'Rue 1', ''),
+        CompanyRecord('Thies', 'Boulangerie', '', '', '33 951 00 00'),
+        CompanyRecord('Dakar', 'GARAGE MODERNE', '', 'Rue 2', ''),
+        CompanyRecord('dakar', 'garage moderne', '', 'Rue 3', ''),
+        CompanyRecord('Dakar', 'Garage', '', '', ''),
+        CompanyRecord('Thies', 'Boulangerie', '', '', ''),
+    ]
+    
+    with ExternalSortedCompanies(companies, sort_buffer=2, work_dir=str(tmp_path)) as external:
+        assert as_dicts(external) == as_dicts(deduplicate_companies(companies))
+        assert [company.adresse for company in external] == ['', 'Rue 1', '']
+        assert len(external) == 3 and external.total == 6
+
+@pytest.mark.parametrize('sort_buffer', [7, 50, 100000])
+def test_synthetic_companies(tmp_path, synthetic, sort_buffer):
+    expected = as_dicts(deduplicate_companies(synthetic))
+    
+    with ExternalSortedCompanies(synthetic, sort_buffer, work_dir=str(tmp_path)) as external:
+        assert as_dicts(external) == expected
+        # Iterating again reads the same runs
+        assert as_dicts(external) == expected
+        assert len(external) == len(expected)
+    assert expected == legacy_deduplicate_companies(as_dicts(synthetic))
+    assert os.listdir(tmp_path) == []
+
+def test_more_runs_than_the_merge_fan_in(tmp_path, synthetic):
+    sort_buffer = len(synthetic) // (3 * MERGE_FAN_IN)
+    
+    with ExternalSortedCompanies(synthetic, sort_buffer, work_dir=str(tmp_path)) as external:
+        assert len(external._runs) <= MERGE_FAN_IN
+        assert as_dicts(external) == as_dicts(deduplicate_companies(synthetic))
+
+def test_bundled_companies(tmp_path, pdf_companies):
+    with ExternalSortedCompanies(pdf_companies, 500, work_dir=str(tmp_path)) as external:
+        assert as_dicts(external) == legacy_deduplicate_companies(as_dicts(pdf_companies))
+
+def test_same_sql_file(tmp_path, pdf_companies):
+    in_memory = tmp_path / 'in_memory.sql'
+    external = tmp_path / 'external.sql'
+    generate_sql_file(pdf_companies, str(in_memory))
+    generate_sql_file(pdf_companies, str(external), sort_buffer=500)
+    
+    def content(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line for line in f if not line.startswith('-- Generated:')]
+    
+    assert content(external) == content(in_memory)
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Default directory of the sorted runs, empty at the start of the test"""
+    path = tmp_path / 'tmp'
+    path.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(path))
+    return path
+
+class FailingSink:
+    name = 'failing'
+    
+    def open(self, total):
+        pass
+    
+    def write(self, row):
+        raise OSError("disk full")
+    
+    def close(self):
+        pass
+
+def test_run_files_deleted_when_the_sql_file_cannot_be_written(tmp_path, temp_dir, synthetic):
+    # The traceback keeps the frames, and the sorted companies, alive
+    with pytest.raises(OSError) as excinfo:
+        generate_sql_file(synthetic[:100], str(tmp_path / 'missing' / 'companies.sql'), sort_buffer=10)
+    
+    assert excinfo.value is not None
+    assert os.listdir(temp_dir) == []
+
+def test_run_files_deleted_when_a_sink_fails(temp_dir, synthetic):
+    with pytest.raises(OSError) as excinfo:
+        run_pipeline(iter(synthetic[:100]), [FailingSink()], sort_buffer=10)
+    
+    assert excinfo.value is not None
+    assert os.listdir(temp_dir) == []
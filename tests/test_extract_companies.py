@@ -0,0 +1,90 @@
+"""SQL VALUES tokenizer against the previous character-by-character parser"""
+
+import re
+
+import pytest
+
+from benchmark_pipeline import legacy_extract_company_data_from_sql
+from categorize_companies import VALUES_ROW_PATTERN
+from extract_companies import extract_company_data_from_sql
+
+INSERT = 'INSERT INTO "Company" (name, ville, tel) VALUES '
+
+# Quoted values, with their parentheses replaced: the previous parser ends a row at the first ')'
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'")
+
+def without_parentheses(sql):
+    sql = QUOTED_PATTERN.sub(lambda match: match.group().replace('(', '[').replace(')', ']'), sql)
+    return sql.replace('NOW()', 'NULL')
+
+def legacy_values(company):
+    """A company as the previous parser returns it: NULL is kept as written"""
+    return {column: 'NULL' if value is None else value for column, value in company.items()}
+
+@pytest.mark.parametrize('sql', [
+    INSERT + "('Boulangerie', 'Dakar', '33 800 00 00'), ('Chez Tonton', 'Thies', '');",
+    INSERT + "('''Le Tonton''', 'Dakar', '');",
+    INSERT + "('Garage', NULL, '');",
+    INSERT + "('Garage',\n  'Dakar',   '')",
+])
+def test_same_rows_as_the_previous_parser(sql):
+    companies = extract_company_data_from_sql(sql)
+    
+    assert companies
+    assert [legacy_values(c) for c in companies] == legacy_extract_company_data_from_sql(sql)
+
+@pytest.mark.parametrize('sql, expected', [
+    # A doubled quote toggled the previous parser out of the string
+    (INSERT + "('Boulangerie L''Etoile', 'Dakar', '33 800 00 00');",
+     [{'name': "Boulangerie L'Etoile", 'ville': 'Dakar', 'tel': '33 800 00 00'}]),
+    (INSERT + "('Boulangerie L''Etoile, Rufisque', 'Dakar', ''), ('Chez Tonton', 'Thies', '');",
+     [{'name': "Boulangerie L'Etoile, Rufisque", 'ville': 'Dakar', 'tel': ''},
+      {'name': 'Chez Tonton', 'ville': 'Thies', 'tel': ''}]),
+    # So did an empty value followed by another one
+    (INSERT + "('Garage', '', '33 800 00 00');",
+     [{'name': 'Garage', 'ville': '', 'tel': '33 800 00 00'}]),
+    # Parentheses inside a value and function calls ended the row early
+    (INSERT + "('Garage (Centre)', 'Dakar', '');",
+     [{'name': 'Garage (Centre)', 'ville': 'Dakar', 'tel': ''}]),
+    ('INSERT INTO "Company" (name, "createdAt") VALUES (\'Garage\', NOW());',
+     [{'name': 'Garage', 'createdAt': 'NOW()'}]),
+])
+def test_rows_the_previous_parser_got_wrong(sql, expected):
+    assert extract_company_data_from_sql(sql) == expected
+    assert legacy_extract_company_data_from_sql(sql) != expected
+
+@pytest.fixture(scope='module')
+def bundled_rows(sql_file):
+    """(header, row line) of every VALUES row of the bundled SQL file"""
+    rows = []
+    header = None
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('INSERT INTO'):
+                header = line.strip()
+            elif header and line.startswith('  ('):
+                rows.append((header, line.strip().rstrip(',;')))
+    return rows
+
+def test_bundled_rows(bundled_rows):
+    # Rows holding '' (empty or escaped quotes) are compared with the row pattern only
+    compared = 0
+    for header, row in bundled_rows:
+        sql = f"{header}\n{row};"
+        companies = extract_company_data_from_sql(sql)
+        fields = VALUES_ROW_PATTERN.fullmatch(row).groups()
+        assert len(companies) == 1
+        assert list(companies[0].values()) == [value.replace("''", "'") for value in fields] + ['NOW()', 'NOW()']
+        if "''" not in row:
+            simplified = without_parentheses(sql)
+            assert [legacy_values(c) for c in extract_company_data_from_sql(simplified)] == \
+                legacy_extract_company_data_from_sql(simplified)
+            compared += 1
+    assert compared
+
+def test_whole_file_in_one_pass(sql_file, bundled_rows):
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        companies = extract_company_data_from_sql(f.read())
+    
+    assert [c['name'] for c in companies] == [VALUES_ROW_PATTERN.fullmatch(row).group(1).replace("''", "'")
+                                              for _, row in bundled_rows]
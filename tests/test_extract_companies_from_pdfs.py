@@ -0,0 +1,121 @@
+"""Precompiled line parser against the previous per-keyword parser, read errors and the cache version"""
+
+import os
+import random
+import re
+
+import pytest
+
+import extract_companies_from_pdfs
+from benchmark_pipeline import legacy_parse_company_line, load_pdf_lines
+from extract_companies_from_pdfs import (ACTIVITY_KEYWORDS, ADDRESS_KEYWORDS, SENEGALESE_CITIES,
+                                         extract_companies_from_pages, iter_extracted_files, parse_company_line,
+                                         parser_version)
+from pdf_backends import PyPDF2Document
+from synthetic_companies import generate_lines, write_pdf
+
+@pytest.fixture(scope='module')
+def pdf_lines(pdf_files):
+    return load_pdf_lines(os.path.dirname(pdf_files[0]))
+
+@pytest.mark.parametrize('line', [
+    'Dakar Pharmacie Guigon Vente De Medicaments Avenue Lamine Gueye 33 823 07 31',
+    'Thies Boulangerie Moderne Rue 12 Cite Ballabey 77 645 12 34',
+    'Saint-Louis Hotel de la Poste Hotel Place Faidherbe 339611118',
+    'Rufisque Ets Diop et Fils Commerce General 0 123456789',
+    'Mbour Garage du Centre - 33 957 12 12',
+    'Kaolack Sarl Import Export Services Face Marche Central',
+    'Ville Entreprise Activité Adresse Tel',
+    'Dakarois Sarl Commerce 33 800 00 00',
+    'Dakar 33 800 00 00',
+    'Dakar',
+])
+def test_fixed_lines(line):
+    assert parse_company_line(line) == legacy_parse_company_line(line)
+
+def test_bundled_pdf_lines(pdf_lines):
+    assert [parse_company_line(line) for line in pdf_lines] == [legacy_parse_company_line(line) for line in pdf_lines]
+
+def fuzzed_lines(count, seed=7):
+    """Lines mixing cities, both keyword lists in any case, names and phone tails"""
+    rng = random.Random(seed)
+    keywords = ADDRESS_KEYWORDS + ACTIVITY_KEYWORDS
+    words = ['Sarl', 'Ets', 'Diop', 'Ndiaye', 'et', 'Fils', 'Du', '-', 'Centre', 'Marche', '12', 'X']
+    phones = ['', '33 823 07 31', '338230731', '77 645 12 34', '7764512345', '70 123 45 67',
+              '12 345 67 89', '0 123456789', '33 82', '1234', '33 823 07 31 77']
+    lines = []
+    for _ in range(count):
+        parts = [rng.choice(SENEGALESE_CITIES + ['Ville', 'Pikine'])]
+        for _ in range(rng.randint(0, 8)):
+            word = rng.choice(keywords) if rng.random() < 0.3 else rng.choice(words)
+            parts.append(rng.choice([word, word.lower(), word.upper(), word + 's', 'x' + word]))
+        parts.append(rng.choice(phones))
+        lines.append(rng.choice([' ', '  ']).join(parts))
+    return lines
+
+def test_fuzzed_lines():
+    lines = fuzzed_lines(20000)
+    
+    assert [parse_company_line(line) for line in lines] == [legacy_parse_company_line(line) for line in lines]
+
+@pytest.fixture
+def broken_pdfs(tmp_path, monkeypatch):
+    """Two synthetic PDFs of 5 pages; page 2 of the first one cannot be read"""
+    pdfs = []
+    for seed, name in enumerate(['broken.pdf', 'sound.pdf']):
+        path = str(tmp_path / name)
+        write_pdf(generate_lines(200, seed=seed, noise_rate=0), path, lines_per_page=40)
+        pdfs.append(path)
+    page_lines = PyPDF2Document.page_lines
+    
+    def failing_page_lines(document, index):
+        if index == 1 and document._file.name == pdfs[0]:
+            raise OSError("injected read error")
+        return page_lines(document, index)
+    
+    # Worker processes are forked and inherit the patch
+    monkeypatch.setattr(PyPDF2Document, 'page_lines', failing_page_lines)
+    return pdfs
+
+def extracted(pdfs, workers, pages_per_task=2, cache_dir=None):
+    return [(pdf_file, list(companies))
+            for pdf_file, companies, _, _, _ in iter_extracted_files(pdfs, workers, pages_per_task, cache_dir)]
+
+def test_failed_page_stops_the_file_in_serial_and_parallel_runs(broken_pdfs):
+    serial = extracted(broken_pdfs, 1)
+    
+    assert serial[0][1] == extract_companies_from_pages(broken_pdfs[0], 0, 1)
+    assert serial[1][1] == extract_companies_from_pages(broken_pdfs[1])
+    assert extracted(broken_pdfs, 2) == serial
+    assert extracted(broken_pdfs, 2, pages_per_task=1) == serial
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_file_with_a_read_error_is_not_cached(tmp_path, monkeypatch, broken_pdfs, workers):
+    cache_dir = str(tmp_path / 'cache')
+    
+    runs = [list(iter_extracted_files(broken_pdfs, workers, 2, cache_dir))]
+    monkeypatch.undo()
+    runs += [list(iter_extracted_files(broken_pdfs, workers, 2, cache_dir)) for _ in range(2)]
+    
+    (broken, partial, _, _, errors), (_, _, _, source, _) = runs[0]
+    assert errors == [(1, "injected read error")]
+    assert runs[0][1][4] == []
+    # Extracted again once the page can be read, then served from the cache
+    assert [run[0][3] for run in runs[1:]] == [source, 'cache']
+    assert [run[1][3] for run in runs[1:]] == ['cache', 'cache']
+    assert runs[1][0][4] == []
+    assert list(runs[2][0][1]) == list(runs[1][0][1]) == extract_companies_from_pages(broken)
+    assert len(runs[1][0][1]) > len(partial)
+
+@pytest.mark.parametrize('name, value', [
+    ('PHONE_PATTERN', re.compile(r'(\d{2} \d{3} \d{2} \d{2})\s*$')),
+    ('CITY_PATTERN', re.compile('(?:Dakar|Thies)(?= )')),
+    ('ADDRESS_PATTERN', extract_companies_from_pdfs.compile_keyword_pattern(['Rue'])),
+    ('TRAILING_DASH_PATTERN', re.compile(r'-$')),
+])
+def test_parser_version_covers_the_compiled_patterns(monkeypatch, name, value):
+    version = parser_version()
+    
+    monkeypatch.setattr(extract_companies_from_pdfs, name, value)
+    
+    assert parser_version() != version
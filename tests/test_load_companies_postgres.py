@@ -0,0 +1,153 @@
+"""
+COPY loader against a throwaway PostgreSQL cluster.
+
+The cluster is created with initdb and started with pg_ctl on a temporary
+directory and port. The binaries are looked up in PG_BIN, then on PATH
+and in `pg_config --bindir`; the tests are skipped when they or psycopg2
+are missing, or when running as root (initdb refuses to).
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from extract_companies_from_pdfs import CompanyRecord, deduplicate_companies
+from load_companies_postgres import COPY_COLUMNS, iter_copy_rows, load_companies
+
+# Company table of the Prisma schema, without the Category foreign key
+CREATE_COMPANY_SQL = '''
+CREATE TABLE "Company" (
+  id SERIAL PRIMARY KEY,
+  name TEXT NOT NULL,
+  slug TEXT UNIQUE NOT NULL,
+  description TEXT,
+  "imageUrl" TEXT,
+  ville TEXT,
+  adresse TEXT,
+  tel TEXT,
+  activite TEXT,
+  "categoryId" INTEGER NOT NULL,
+  "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updatedAt" TIMESTAMP(3) NOT NULL
+)
+'''
+
+SELECT_COMPANIES_SQL = ('SELECT name, slug, description, ville, adresse, tel, activite, "categoryId" '
+                        'FROM "Company" ORDER BY id')
+
+def find_pg_bindir():
+    """Return the directory of initdb and pg_ctl, or None"""
+    candidates = [os.environ.get('PG_BIN')]
+    initdb = shutil.which('initdb')
+    if initdb:
+        candidates.append(os.path.dirname(initdb))
+    if shutil.which('pg_config'):
+        result = subprocess.run(['pg_config', '--bindir'], capture_output=True, text=True)
+        candidates.append(result.stdout.strip())
+    for bindir in candidates:
+        if bindir and all(os.access(os.path.join(bindir, tool), os.X_OK) for tool in ('initdb', 'pg_ctl')):
+            return bindir
+    return None
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(scope='module')
+def postgres_cluster(tmp_path_factory):
+    """Start a PostgreSQL cluster for the module; yields its connection parameters"""
+    bindir = find_pg_bindir()
+    if bindir is None:
+        pytest.skip("initdb/pg_ctl not found (set PG_BIN)")
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        pytest.skip("initdb cannot be run as root")
+    
+    base = tmp_path_factory.mktemp('pg')
+    data_dir = base / 'data'
+    port = free_port()
+    subprocess.run([os.path.join(bindir, 'initdb'), '-D', str(data_dir), '-U', 'postgres', '-A', 'trust',
+                    '-E', 'UTF8', '--no-locale'], check=True, capture_output=True)
+    subprocess.run([os.path.join(bindir, 'pg_ctl'), '-D', str(data_dir), '-l', str(base / 'server.log'), '-w',
+                    '-o', f"-p {port} -k {base} -c listen_addresses=''", 'start'], check=True, capture_output=True)
+    try:
+        yield {'host': str(base), 'port': port, 'user': 'postgres', 'dbname': 'postgres'}
+    finally:
+        subprocess.run([os.path.join(bindir, 'pg_ctl'), '-D', str(data_dir), '-m', 'immediate', 'stop'],
+                       capture_output=True)
+
+@pytest.fixture
+def company_dsn(postgres_cluster):
+    """DSN of the cluster with an empty "Company" table"""
+    dsn = ' '.join(f"{key}={value}" for key, value in postgres_cluster.items())
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute('DROP SCHEMA IF EXISTS importer CASCADE')
+        cursor.execute('DROP TABLE IF EXISTS "Company"')
+        cursor.execute(CREATE_COMPANY_SQL)
+    connection.close()
+    return dsn
+
+def fetch_companies(dsn):
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(SELECT_COMPANIES_SQL)
+            return [list(row) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+def test_second_load_skips_every_company(company_dsn, pdf_companies):
+    unique = len(deduplicate_companies(pdf_companies))
+    
+    assert load_companies(pdf_companies, company_dsn) == (unique, 0)
+    assert load_companies(pdf_companies, company_dsn) == (0, unique)
+    
+    # Same rows and slugs as a load into an empty database, stored once
+    assert fetch_companies(company_dsn) == list(iter_copy_rows(pdf_companies))
+
+def test_quotes_and_slugs_round_trip(company_dsn):
+    companies = [
+        CompanyRecord('Dakar', "Boulangerie L'Etoile", 'Boulangerie', "Rue 3 X Bd De L'Est - Point E", '33 821 00 00'),
+        CompanyRecord('Thies', "Boulangerie L'Etoile", 'Boulangerie', 'Avenue "Lamine" Gueye, \\ 12', ''),
+        CompanyRecord('Mbour', "Chez ''Tonton''", '', '', ''),
+    ]
+    
+    assert load_companies(companies, company_dsn) == (3, 0)
+    rows = {row[3]: dict(zip(COPY_COLUMNS, row)) for row in fetch_companies(company_dsn)}
+    
+    assert sorted(row['slug'] for row in rows.values()) == [
+        'boulangerie-l-etoile', 'boulangerie-l-etoile-1', 'chez-tonton']
+    assert rows['Dakar']['name'] == rows['Thies']['name'] == "Boulangerie L'Etoile"
+    assert rows['Dakar']['adresse'] == "Rue 3 X Bd De L'Est - Point E"
+    assert rows['Thies']['adresse'] == 'Avenue "Lamine" Gueye, \\ 12'
+    assert rows['Mbour']['name'] == "Chez ''Tonton''"
+    # Empty values stay empty strings, not NULL
+    assert rows['Thies']['tel'] == ''
+    
+    # A new company with a taken name gets a free slug; known ones keep theirs
+    companies.append(CompanyRecord('Kaolack', "Boulangerie L'Etoile", 'Boulangerie', '', ''))
+    assert load_companies(companies, company_dsn) == (1, 3)
+    slugs = [row[1] for row in fetch_companies(company_dsn)]
+    assert len(slugs) == len(set(slugs)) == 4
+
+def test_schema_parameter_of_the_backend_url(postgres_cluster, company_dsn):
+    connection = psycopg2.connect(company_dsn)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE SCHEMA importer')
+        cursor.execute('SET search_path TO importer')
+        cursor.execute(CREATE_COMPANY_SQL)
+    connection.close()
+    url = (f"postgresql://postgres@/postgres?host={postgres_cluster['host']}"
+           f"&port={postgres_cluster['port']}&schema=importer")
+    
+    assert load_companies([CompanyRecord('Dakar', 'Sonatel', 'Telecommunications', '', '')], url) == (1, 0)
+    assert fetch_companies(company_dsn) == []
+    assert fetch_companies(company_dsn + ' options=-csearch_path=importer')[0][1] == 'sonatel'